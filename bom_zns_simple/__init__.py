@@ -1,3 +1,11 @@
 # -*- coding: utf-8 -*-
 
-from . import models
\ No newline at end of file
+from . import models
+
+from odoo import api, SUPERUSER_ID
+
+
+def post_init_hook(cr, registry):
+    """Backfill the message statistics rollup once every table exists"""
+    env = api.Environment(cr, SUPERUSER_ID, {})
+    env['zns.message.daily.stat']._rebuild_rollup()
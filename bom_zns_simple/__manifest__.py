@@ -34,6 +34,7 @@ Requirements:
         'contacts', 
         'sale',
         'account',
+        'bus',
     ],
     'external_dependencies': {
         'python': ['requests'],
@@ -45,6 +46,7 @@ Requirements:
         
         # Data
         'data/zns_data.xml',
+        'data/zns_cron.xml',
         
         # Base views
         'views/zns_connection_views.xml',
@@ -78,10 +80,16 @@ Requirements:
         # Menus LAST
         'views/zns_menus.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'bom_zns_simple/static/src/js/zns_dashboard_live.js',
+        ],
+    },
     'demo': [],
     'images': ['static/description/icon.png'],
     'installable': True,
     'auto_install': False,
     'application': True,
     'sequence': 1,
+    'post_init_hook': 'post_init_hook',
 }
\ No newline at end of file
@@ -1,10 +1,15 @@
 from . import zns_connection
 from . import zns_template        # Enhanced with smart template selection
 from . import zns_message
+from . import zns_message_stat
+from . import zns_latency
+from . import zns_negative_cache
 from . import zns_wizard          # Enhanced with smart template selection
 from . import zns_helper
 from . import res_partner         # Enhanced with invoice auto-send
+from . import zns_timeseries
 from . import zns_dashboard
+from . import zns_report_export
 from . import zns_template_mapping
 from . import zns_parameter_help
 from . import zns_configuration
@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 
+import re
 import json
 import logging
 from odoo import models, fields, api, _
@@ -19,6 +20,29 @@ class ResPartner(models.Model):
         for partner in self:
             partner.zns_message_count = len(partner.zns_message_ids)
     
+    @api.model
+    def _normalize_zns_phone(self, phone):
+        """Normalize Vietnamese phone number to +84 format, False if not sendable
+        
+        Single implementation shared by the negative cache keys and the contact ZNS phone.
+        """
+        if not phone:
+            return False
+        
+        digits = re.sub(r'\D', '', phone)
+        
+        # Strip country code or trunk prefix
+        if digits.startswith('84') and len(digits) in (11, 12):
+            digits = digits[2:]
+        elif digits.startswith('0'):
+            digits = digits[1:]
+        
+        # Vietnamese national numbers are 9 (mobile) or 10 (landline) digits
+        if len(digits) not in (9, 10) or digits.startswith('0'):
+            return False
+        
+        return '+84' + digits
+    
     def action_send_zns(self):
         """Open ZNS send wizard"""
         return {
@@ -52,27 +76,30 @@ class SaleOrder(models.Model):
     @api.depends('partner_id', 'amount_total', 'order_line', 'state')
     def _compute_best_template_info(self):
         """Show which template would be auto-selected"""
-        for order in self:
-            try:
-                # Check if we have zns configuration
-                if 'zns.configuration' in self.env:
-                    config = self.env['zns.configuration'].get_default_config()
-                    template = config.get_template_for_document('sale.order', order)
+        try:
+            # Check if we have zns configuration
+            if 'zns.configuration' in self.env:
+                config = self.env['zns.configuration'].get_default_config()
+                templates = config.get_templates_for_documents('sale.order', self)
+                for order in self:
+                    template = templates.get(order.id)
                     if template:
                         order.zns_best_template_info = f"{template.name} (via configuration)"
                     else:
                         order.zns_best_template_info = "❌ No template configured"
-                else:
-                    # Fallback: try to find any active template
-                    any_template = self.env['zns.template'].search([
-                        ('active', '=', True),
-                        ('connection_id.active', '=', True)
-                    ], limit=1)
+            else:
+                # Fallback: try to find any active template
+                any_template = self.env['zns.template'].search([
+                    ('active', '=', True),
+                    ('connection_id.active', '=', True)
+                ], limit=1)
+                for order in self:
                     if any_template:
                         order.zns_best_template_info = f"{any_template.name} (fallback)"
                     else:
                         order.zns_best_template_info = "❌ No active templates found"
-            except Exception as e:
+        except Exception as e:
+            for order in self:
                 order.zns_best_template_info = f"Error: {str(e)}"
     
     def action_confirm(self):
@@ -368,31 +395,35 @@ class AccountMove(models.Model):
     @api.depends('partner_id', 'amount_total', 'move_type', 'state')
     def _compute_best_template_info(self):
         """Show which template would be auto-selected"""
-        for invoice in self:
-            if invoice.move_type not in ['out_invoice', 'out_refund']:
-                invoice.zns_best_template_info = False
-                continue
-                
-            try:
-                # Check if we have zns configuration
-                if 'zns.configuration' in self.env:
-                    config = self.env['zns.configuration'].get_default_config()
-                    template = config.get_template_for_document('account.move', invoice)
+        customer_invoices = self.filtered(lambda move: move.move_type in ['out_invoice', 'out_refund'])
+        (self - customer_invoices).zns_best_template_info = False
+        if not customer_invoices:
+            return
+        
+        try:
+            # Check if we have zns configuration
+            if 'zns.configuration' in self.env:
+                config = self.env['zns.configuration'].get_default_config()
+                templates = config.get_templates_for_documents('account.move', customer_invoices)
+                for invoice in customer_invoices:
+                    template = templates.get(invoice.id)
                     if template:
                         invoice.zns_best_template_info = f"{template.name} (via configuration)"
                     else:
                         invoice.zns_best_template_info = "❌ No template configured"
-                else:
-                    # Fallback: try to find any active template
-                    any_template = self.env['zns.template'].search([
-                        ('active', '=', True),
-                        ('connection_id.active', '=', True)
-                    ], limit=1)
+            else:
+                # Fallback: try to find any active template
+                any_template = self.env['zns.template'].search([
+                    ('active', '=', True),
+                    ('connection_id.active', '=', True)
+                ], limit=1)
+                for invoice in customer_invoices:
                     if any_template:
                         invoice.zns_best_template_info = f"{any_template.name} (fallback)"
                     else:
                         invoice.zns_best_template_info = "❌ No active templates found"
-            except Exception as e:
+        except Exception as e:
+            for invoice in customer_invoices:
                 invoice.zns_best_template_info = f"Error: {str(e)}"
 
     def action_post(self):
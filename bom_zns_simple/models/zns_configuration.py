@@ -131,6 +131,71 @@ class ZnsConfiguration(models.Model):
             except Exception as e:
                 _logger.warning(f"Template mapping failed: {e}")
         
+        return self._get_fallback_template(document_type)
+    
+    def get_templates_for_documents(self, document_type, documents):
+        """Get the best template for many documents, resolving each distinct case once (preview, no usage stats)"""
+        results = {}
+        if not documents:
+            return results
+        
+        mappings = self.env['zns.template.mapping']
+        if self.use_template_mappings:
+            mappings = mappings.search([('model', '=', document_type), ('active', '=', True)], order='priority, id')
+        
+        # Without mappings every document resolves to the same template
+        if not mappings:
+            template = self._get_fallback_template(document_type)
+            return {document.id: template for document in documents}
+        
+        # Group documents by the outcome of each condition _matches_conditions tests
+        use_record_key = any(mappings.mapped('condition_code'))
+        partner_sets = [set(mapping.partner_ids.ids) for mapping in mappings if mapping.partner_ids]
+        partner_category_ids = set(mappings.mapped('partner_category_ids').ids)
+        amount_mins = sorted(set(mapping.amount_min for mapping in mappings if mapping.amount_min))
+        amount_maxs = sorted(set(mapping.amount_max for mapping in mappings if mapping.amount_max))
+        product_category_ids = set(mappings.mapped('product_category_ids').ids)
+        use_categories = bool(product_category_ids) and 'order_line' in documents._fields
+        groups = {}
+        for document in documents:
+            if use_record_key:
+                key = document.id
+            else:
+                amount = getattr(document, 'amount_total', 0)
+                partner_id = document.partner_id.id
+                key = (
+                    tuple(partner_id in partner_set for partner_set in partner_sets),
+                    frozenset(partner_category_ids.intersection(document.partner_id.category_id.ids)),
+                    tuple(amount < amount_min for amount_min in amount_mins),
+                    tuple(amount > amount_max for amount_max in amount_maxs),
+                    frozenset(product_category_ids.intersection(
+                        document.order_line.mapped('product_id.categ_id').ids
+                    )) if use_categories else None,
+                )
+            groups.setdefault(key, []).append(document)
+        
+        fallback = None
+        for key, group in groups.items():
+            template = False
+            try:
+                mapping = next((mapping for mapping in mappings if mapping._matches_conditions(group[0])), False)
+                template = mapping.template_id if mapping else False
+            except Exception as e:
+                _logger.warning(f"Template mapping failed: {e}")
+            
+            if not template:
+                if fallback is None:
+                    fallback = self._get_fallback_template(document_type)
+                template = fallback
+            
+            for document in group:
+                results[document.id] = template
+        
+        _logger.debug(f"Resolved templates for {len(documents)} {document_type} in {len(groups)} groups")
+        return results
+    
+    def _get_fallback_template(self, document_type):
+        """Get the template used when no mapping matches"""
         # Step 2: Use default template for document type
         if self.fallback_to_default:
             default_template = None
@@ -24,6 +24,14 @@ class ZnsConnection(models.Model):
     active = fields.Boolean('Active', default=True)
     last_sync = fields.Datetime('Last Sync', readonly=True)
     last_error = fields.Text('Last Error', readonly=True)
+    template_sync_duration = fields.Float('Last Template Sync Duration (s)', readonly=True)
+    template_sync_changed = fields.Integer('Templates Changed at Last Sync', readonly=True)
+    
+    # Sending quota shared by transactional and marketing traffic
+    hourly_quota = fields.Integer('Hourly Quota', default=0, help='Messages per hour allowed on this connection (0 = unlimited)')
+    transactional_reserve = fields.Integer('Transactional Reserve %', default=20,
+                                           help='Share of the hourly quota kept free for order/invoice messages, '
+                                                'bulk marketing only uses what is left')
     
     # Add auth_method field that the view expects
     auth_method = fields.Selection([
@@ -652,4 +660,21 @@ Include your account email and this error message.
                 'type': 'info',
                 'sticky': False,
             }
-        }
\ No newline at end of file
+        }
+    
+    @api.model
+    def get_hourly_usage(self, connection_ids=None):
+        """Get transactional messages sent per connection over the last hour"""
+        self.env['zns.message'].flush(['connection_id', 'status', 'create_date'])
+        conditions = "create_date >= %s AND status = 'sent'"
+        params = [fields.Datetime.now() - timedelta(hours=1)]
+        if connection_ids:
+            conditions += " AND connection_id IN %s"
+            params.append(tuple(connection_ids))
+        self.env.cr.execute(f"""
+            SELECT connection_id, COUNT(*)
+            FROM zns_message
+            WHERE {conditions}
+            GROUP BY connection_id
+        """, params)
+        return dict(self.env.cr.fetchall())
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+# Shared constants, kept free of model imports so any module can use them
+
+# Fields of zns.message that move a message to another rollup bucket
+ROLLUP_KEY_FIELDS = ['create_date', 'template_id', 'connection_id', 'status', 'sale_order_id', 'invoice_id', 'partner_id']
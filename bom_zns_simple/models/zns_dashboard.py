@@ -1,11 +1,14 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
 import logging
-from datetime import datetime, timedelta
+import pytz
+from datetime import date, datetime, time as dt_time, timedelta
 from dateutil.relativedelta import relativedelta
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from .zns_message_stat import LIVE_CHANNEL
 
 _logger = logging.getLogger(__name__)
 
@@ -15,9 +18,9 @@ class ZnsDashboard(models.Model):
     _description = 'ZNS Dashboard'
     _auto = False
 
-    def get_dashboard_data(self, period='month'):
+    def get_dashboard_data(self, period='month', extra_domain=None):
         """Get comprehensive dashboard data"""
-        domain = []
+        domain = list(extra_domain or [])
         
         # Date filtering based on period
         today = datetime.now().date()
@@ -33,17 +36,19 @@ class ZnsDashboard(models.Model):
             year_start = today.replace(month=1, day=1)
             domain.append(('create_date', '>=', year_start))
         
-        # Get basic statistics
-        total_messages = self.env['zns.message'].search_count(domain)
-        sent_messages = self.env['zns.message'].search_count(domain + [('status', '=', 'sent')])
-        failed_messages = self.env['zns.message'].search_count(domain + [('status', '=', 'failed')])
-        draft_messages = self.env['zns.message'].search_count(domain + [('status', '=', 'draft')])
+        # Summary, status and per-template/source/connection breakdowns in one pass
+        aggregates = self._get_message_aggregates(domain)
+        summary = aggregates['summary']
+        total_messages = summary['total']
+        sent_messages = summary['sent']
+        failed_messages = summary['failed']
+        draft_messages = summary['draft']
         
         # Success rate
         success_rate = (sent_messages / total_messages * 100) if total_messages > 0 else 0
         
         # Get template usage statistics
-        template_stats = self._get_template_statistics(domain)
+        template_stats = aggregates['template_stats']
         
         # Get daily/weekly/monthly trends
         trend_data = self._get_trend_data(period)
@@ -56,13 +61,16 @@ class ZnsDashboard(models.Model):
         ]
         
         # Get recent messages
-        recent_messages = self._get_recent_messages(limit=20)
+        recent_messages = self._get_recent_messages(limit=20, domain=extra_domain)
         
         # Get source statistics (Contact/Sales/Invoice)
-        source_stats = self._get_source_statistics(domain)
+        source_stats = aggregates['source_stats']
         
         # Get connection usage
-        connection_stats = self._get_connection_statistics(domain)
+        connection_stats = aggregates['connection_stats']
+        
+        # Get send latency percentiles from the histogram
+        latency_stats = self._get_latency_stats(domain)
         
         return {
             'summary': {
@@ -78,172 +86,195 @@ class ZnsDashboard(models.Model):
             'recent_messages': recent_messages,
             'source_stats': source_stats,
             'connection_stats': connection_stats,
+            'latency_stats': latency_stats,
         }
     
-    def _get_template_statistics(self, domain):
-        """Get template usage statistics"""
-        query = """
-            SELECT t.name, t.template_type, COUNT(m.id) as usage_count,
-                   SUM(CASE WHEN m.status = 'sent' THEN 1 ELSE 0 END) as sent_count,
-                   SUM(CASE WHEN m.status = 'failed' THEN 1 ELSE 0 END) as failed_count
-            FROM zns_message m
-            JOIN zns_template t ON m.template_id = t.id
-            WHERE m.create_date >= %s
-            GROUP BY t.id, t.name, t.template_type
-            ORDER BY usage_count DESC
+    def _get_latency_stats(self, domain):
+        """Get p50/p95/p99 send latencies per connection, template and hour
+        
+        The histogram is keyed by send hour, connection and template, so only the cells
+        where messages matching domain were sent are read.
         """
+        from_clause, where_clause, params = self._compile_message_domain(domain)
+        cells = (f"""
+            SELECT DISTINCT date_trunc('hour', COALESCE("zns_message".sent_date, "zns_message".write_date)),
+                   "zns_message".connection_id, "zns_message".template_id
+            FROM {from_clause}
+            WHERE {where_clause}
+        """, params)
+        histogram = self.env['zns.latency.histogram']
+        
+        by_connection = histogram.get_percentiles('http', group_by=('connection_id',), cells=cells)
+        connection_names = dict(self.env['zns.connection'].browse(
+            [row['connection_id'] for row in by_connection if row['connection_id']]).mapped(lambda c: (c.id, c.name)))
+        for row in by_connection:
+            row['name'] = connection_names.get(row['connection_id'], 'Unknown')
+        
+        by_template = histogram.get_percentiles('http', group_by=('template_id',), cells=cells)
+        template_names = dict(self.env['zns.template'].browse(
+            [row['template_id'] for row in by_template if row['template_id']]).mapped(lambda t: (t.id, t.name)))
+        for row in by_template:
+            row['name'] = template_names.get(row['template_id'], 'Unknown')
+        
+        by_hour = histogram.get_percentiles('http', group_by=('hour',), cells=cells)
+        for row in by_hour:
+            row['hour'] = row['hour'].strftime('%Y-%m-%d %H:00')
+        
+        overall = {metric: (histogram.get_percentiles(metric, group_by=(), cells=cells) or [{}])[0]
+                   for metric in ('http', 'queue')}
         
-        # Extract date from domain
-        date_filter = datetime.now().date().replace(day=1)  # Default to current month
-        for condition in domain:
-            if condition[0] == 'create_date' and condition[1] == '>=':
-                date_filter = condition[2]
-                break
-        
-        self.env.cr.execute(query, (date_filter,))
-        results = self.env.cr.dictfetchall()
-        
-        return [{
-            'name': row['name'],
-            'type': row['template_type'],
-            'total': row['usage_count'],
-            'sent': row['sent_count'],
-            'failed': row['failed_count'],
-            'success_rate': round((row['sent_count'] / row['usage_count'] * 100) if row['usage_count'] > 0 else 0, 2)
-        } for row in results]
+        return {
+            'overall': overall,
+            'by_connection': by_connection,
+            'by_template': by_template,
+            'by_hour': by_hour,
+        }
     
-    def _get_trend_data(self, period):
-        """Get trend data for charts"""
-        if period == 'today':
-            return self._get_hourly_trend()
-        elif period == 'week':
-            return self._get_daily_trend(7)
-        elif period == 'month':
-            return self._get_daily_trend(30)
-        else:  # year
-            return self._get_monthly_trend()
+    @api.model
+    def get_real_time_stats(self):
+        """Get live counters, also pushed on the bus as messages change"""
+        return dict(self.env['zns.message.daily.stat'].get_live_counters(), live_channel=LIVE_CHANNEL)
     
-    def _get_hourly_trend(self):
-        """Get hourly trend for today"""
-        today = datetime.now().date()
-        query = """
-            SELECT EXTRACT(hour FROM create_date) as hour,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) as sent,
-                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM zns_message
-            WHERE DATE(create_date) = %s
-            GROUP BY EXTRACT(hour FROM create_date)
-            ORDER BY hour
+    def _get_message_aggregates(self, domain):
+        """Get summary and template/source/connection breakdowns with one scan of zns_message"""
+        from_clause, where_clause, params = self._compile_message_domain(domain)
+        
+        query = f"""
+            SELECT GROUPING(m.template_id) AS g_template,
+                   GROUPING(m.connection_id) AS g_connection,
+                   GROUPING(m.source) AS g_source,
+                   m.template_id, m.connection_id, m.source,
+                   COUNT(*) AS total,
+                   COUNT(*) FILTER (WHERE m.status = 'sent') AS sent,
+                   COUNT(*) FILTER (WHERE m.status = 'failed') AS failed,
+                   COUNT(*) FILTER (WHERE m.status = 'draft') AS draft
+            FROM (
+                SELECT "zns_message".template_id, "zns_message".connection_id, "zns_message".status,
+                       CASE
+                           WHEN "zns_message".sale_order_id IS NOT NULL THEN 'Sales Order'
+                           WHEN "zns_message".invoice_id IS NOT NULL THEN 'Invoice'
+                           WHEN "zns_message".partner_id IS NOT NULL THEN 'Contact'
+                           ELSE 'Manual'
+                       END AS source
+                FROM {from_clause}
+                WHERE {where_clause}
+            ) m
+            GROUP BY GROUPING SETS ((), (m.template_id), (m.connection_id), (m.source))
         """
-        self.env.cr.execute(query, (today,))
-        results = self.env.cr.dictfetchall()
-        
-        # Fill missing hours with 0
-        trend_data = []
-        for hour in range(24):
-            found = next((r for r in results if int(r['hour']) == hour), None)
-            if found:
-                trend_data.append({
-                    'label': f"{hour:02d}:00",
-                    'total': found['total'],
-                    'sent': found['sent'],
-                    'failed': found['failed']
-                })
+        self.env.cr.execute(query, params)
+        rows = self.env.cr.dictfetchall()
+        
+        summary = {'total': 0, 'sent': 0, 'failed': 0, 'draft': 0}
+        template_rows, connection_rows, source_rows = [], [], []
+        for row in rows:
+            if row['g_template'] and row['g_connection'] and row['g_source']:
+                summary = {key: row[key] for key in summary}
+            elif not row['g_template']:
+                template_rows.append(row)
+            elif not row['g_connection']:
+                connection_rows.append(row)
             else:
-                trend_data.append({
-                    'label': f"{hour:02d}:00",
-                    'total': 0,
-                    'sent': 0,
-                    'failed': 0
-                })
-        
-        return trend_data
+                source_rows.append(row)
+        
+        def rate(row):
+            return round((row['sent'] / row['total'] * 100) if row['total'] > 0 else 0, 2)
+        
+        # Resolve names once per breakdown
+        templates = {
+            template['id']: template for template in
+            self.env['zns.template'].browse([row['template_id'] for row in template_rows if row['template_id']])
+            .with_context(active_test=False).read(['name', 'template_type'])
+        }
+        connections = {
+            connection['id']: connection for connection in
+            self.env['zns.connection'].browse([row['connection_id'] for row in connection_rows if row['connection_id']])
+            .with_context(active_test=False).read(['name'])
+        }
+        
+        template_stats = [{
+            'name': templates[row['template_id']]['name'],
+            'type': templates[row['template_id']]['template_type'],
+            'total': row['total'],
+            'sent': row['sent'],
+            'failed': row['failed'],
+            'success_rate': rate(row)
+        } for row in template_rows if row['template_id'] in templates]
+        
+        source_stats = [{
+            'source': row['source'],
+            'total': row['total'],
+            'sent': row['sent'],
+            'success_rate': rate(row)
+        } for row in source_rows]
+        
+        connection_stats = [{
+            'connection': connections[row['connection_id']]['name'],
+            'total': row['total'],
+            'sent': row['sent'],
+            'success_rate': rate(row)
+        } for row in connection_rows if row['connection_id'] in connections]
+        
+        return {
+            'summary': summary,
+            'template_stats': sorted(template_stats, key=lambda stat: stat['total'], reverse=True),
+            'source_stats': sorted(source_stats, key=lambda stat: stat['total'], reverse=True),
+            'connection_stats': sorted(connection_stats, key=lambda stat: stat['total'], reverse=True),
+        }
     
-    def _get_daily_trend(self, days):
-        """Get daily trend for specified number of days"""
-        end_date = datetime.now().date()
-        start_date = end_date - timedelta(days=days-1)
-        
-        query = """
-            SELECT DATE(create_date) as date,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) as sent,
-                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM zns_message
-            WHERE DATE(create_date) BETWEEN %s AND %s
-            GROUP BY DATE(create_date)
-            ORDER BY date
-        """
-        self.env.cr.execute(query, (start_date, end_date))
-        results = self.env.cr.dictfetchall()
-        
-        # Fill missing dates with 0
-        trend_data = []
-        current_date = start_date
-        while current_date <= end_date:
-            found = next((r for r in results if r['date'] == current_date), None)
-            if found:
-                trend_data.append({
-                    'label': current_date.strftime('%m/%d'),
-                    'total': found['total'],
-                    'sent': found['sent'],
-                    'failed': found['failed']
-                })
-            else:
-                trend_data.append({
-                    'label': current_date.strftime('%m/%d'),
-                    'total': 0,
-                    'sent': 0,
-                    'failed': 0
-                })
-            current_date += timedelta(days=1)
-        
-        return trend_data
+    def _compile_message_domain(self, domain):
+        """Compile a zns.message domain to SQL (from, where, params), applying record rules"""
+        Message = self.env['zns.message']
+        Message.check_access_rights('read')
+        Message.flush()
+        
+        query = Message._where_calc(domain or [])
+        Message._apply_ir_rules(query, 'read')
+        from_clause, where_clause, params = query.get_sql()
+        return from_clause, where_clause or 'TRUE', params
     
-    def _get_monthly_trend(self):
-        """Get monthly trend for current year"""
-        current_year = datetime.now().year
-        query = """
-            SELECT EXTRACT(month FROM create_date) as month,
-                   COUNT(*) as total,
-                   SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) as sent,
-                   SUM(CASE WHEN status = 'failed' THEN 1 ELSE 0 END) as failed
-            FROM zns_message
-            WHERE EXTRACT(year FROM create_date) = %s
-            GROUP BY EXTRACT(month FROM create_date)
-            ORDER BY month
-        """
-        self.env.cr.execute(query, (current_year,))
-        results = self.env.cr.dictfetchall()
-        
-        # Fill missing months with 0
-        trend_data = []
-        for month in range(1, 13):
-            found = next((r for r in results if int(r['month']) == month), None)
-            month_name = datetime(current_year, month, 1).strftime('%b')
-            if found:
-                trend_data.append({
-                    'label': month_name,
-                    'total': found['total'],
-                    'sent': found['sent'],
-                    'failed': found['failed']
-                })
-            else:
-                trend_data.append({
-                    'label': month_name,
-                    'total': 0,
-                    'sent': 0,
-                    'failed': 0
-                })
-        
-        return trend_data
+    @api.model
+    def benchmark_dashboard_data(self, period='year', runs=5):
+        """Time get_dashboard_data over the current zns_message table"""
+        self.env.cr.execute("SELECT COUNT(*) FROM zns_message")
+        row_count = self.env.cr.fetchone()[0]
+        
+        timings = []
+        for _run in range(runs):
+            start = time.perf_counter()
+            self.get_dashboard_data(period)
+            timings.append(time.perf_counter() - start)
+        
+        timings.sort()
+        result = {
+            'period': period,
+            'rows': row_count,
+            'runs': runs,
+            'min_ms': round(timings[0] * 1000, 2),
+            'median_ms': round(timings[len(timings) // 2] * 1000, 2),
+            'max_ms': round(timings[-1] * 1000, 2),
+        }
+        _logger.info(f"📊 Dashboard benchmark: {result}")
+        return result
+    
+    def _get_trend_data(self, period):
+        """Get gap-filled trend arrays for charts in the user's timezone"""
+        timeseries = self.env['zns.timeseries']
+        date_from, date_to, granularity = timeseries.get_period_range(period)
+        return timeseries.get_series(
+            'zns_message_daily_stat s', 's.period_start',
+            {
+                'total': "SUM(s.message_count)",
+                'sent': "SUM(s.message_count) FILTER (WHERE s.status = 'sent')",
+                'failed': "SUM(s.message_count) FILTER (WHERE s.status = 'failed')",
+            },
+            date_from, date_to, granularity,
+        )
     
-    def _get_recent_messages(self, limit=20):
+    def _get_recent_messages(self, limit=20, domain=None):
         """Get recent messages for activity feed"""
         messages = self.env['zns.message'].search([
             ('status', '!=', 'draft')
-        ], order='create_date desc', limit=limit)
+        ] + list(domain or []), order='create_date desc', limit=limit)
         
         recent_data = []
         for msg in messages:
@@ -271,70 +302,6 @@ class ZnsDashboard(models.Model):
             return f"Contact: {message.partner_id.name}"
         else:
             return "Manual"
-    
-    def _get_source_statistics(self, domain):
-        """Get statistics by source (Contact/Sales/Invoice)"""
-        query = """
-            SELECT 
-                CASE 
-                    WHEN sale_order_id IS NOT NULL THEN 'Sales Order'
-                    WHEN invoice_id IS NOT NULL THEN 'Invoice'
-                    WHEN partner_id IS NOT NULL THEN 'Contact'
-                    ELSE 'Manual'
-                END as source,
-                COUNT(*) as count,
-                SUM(CASE WHEN status = 'sent' THEN 1 ELSE 0 END) as sent
-            FROM zns_message
-            WHERE create_date >= %s
-            GROUP BY source
-            ORDER BY count DESC
-        """
-        
-        # Extract date from domain
-        date_filter = datetime.now().date().replace(day=1)
-        for condition in domain:
-            if condition[0] == 'create_date' and condition[1] == '>=':
-                date_filter = condition[2]
-                break
-        
-        self.env.cr.execute(query, (date_filter,))
-        results = self.env.cr.dictfetchall()
-        
-        return [{
-            'source': row['source'],
-            'total': row['count'],
-            'sent': row['sent'],
-            'success_rate': round((row['sent'] / row['count'] * 100) if row['count'] > 0 else 0, 2)
-        } for row in results]
-    
-    def _get_connection_statistics(self, domain):
-        """Get statistics by connection"""
-        query = """
-            SELECT c.name, COUNT(m.id) as count,
-                   SUM(CASE WHEN m.status = 'sent' THEN 1 ELSE 0 END) as sent
-            FROM zns_message m
-            JOIN zns_connection c ON m.connection_id = c.id
-            WHERE m.create_date >= %s
-            GROUP BY c.id, c.name
-            ORDER BY count DESC
-        """
-        
-        # Extract date from domain
-        date_filter = datetime.now().date().replace(day=1)
-        for condition in domain:
-            if condition[0] == 'create_date' and condition[1] == '>=':
-                date_filter = condition[2]
-                break
-        
-        self.env.cr.execute(query, (date_filter,))
-        results = self.env.cr.dictfetchall()
-        
-        return [{
-            'connection': row['name'],
-            'total': row['count'],
-            'sent': row['sent'],
-            'success_rate': round((row['sent'] / row['count'] * 100) if row['count'] > 0 else 0, 2)
-        } for row in results]
 
 
 class ZnsReportWizard(models.TransientModel):
@@ -357,12 +324,28 @@ class ZnsReportWizard(models.TransientModel):
         ('template_analysis', 'Template Analysis'),
         ('trend_analysis', 'Trend Analysis')
     ], string='Report Type', default='summary')
+    export_format = fields.Selection([
+        ('screen', 'Show on Screen'),
+        ('csv', 'CSV File'),
+        ('xlsx', 'Excel (XLSX) File')
+    ], string='Output', default='screen', help='Detailed reports can be streamed to a file')
+    run_in_background = fields.Boolean('Run in Background',
+                                       help='Build the file in a background job and notify me when it is ready')
 
+    def _get_date_range(self):
+        """Get the wizard dates as a half-open UTC range [start, end) of the user's local days"""
+        tz = pytz.timezone(self.env['zns.timeseries']._get_tz_name())
+        start = tz.localize(datetime.combine(self.date_from, dt_time.min))
+        end = tz.localize(datetime.combine(self.date_to + timedelta(days=1), dt_time.min))
+        return (start.astimezone(pytz.utc).replace(tzinfo=None),
+                end.astimezone(pytz.utc).replace(tzinfo=None))
+    
     def generate_report(self):
         """Generate the requested report"""
+        start, end = self._get_date_range()
         domain = [
-            ('create_date', '>=', self.date_from),
-            ('create_date', '<=', self.date_to)
+            ('create_date', '>=', start),
+            ('create_date', '<', end)
         ]
         
         if self.template_ids:
@@ -385,8 +368,6 @@ class ZnsReportWizard(models.TransientModel):
     
     def _generate_summary_report(self, domain):
         """Generate summary report"""
-        messages = self.env['zns.message'].search(domain)
-        
         return {
             'type': 'ir.actions.act_window',
             'name': 'ZNS Summary Report',
@@ -398,6 +379,9 @@ class ZnsReportWizard(models.TransientModel):
     
     def _generate_detailed_report(self, domain):
         """Generate detailed report"""
+        if self.export_format in ('csv', 'xlsx'):
+            return self._export_detailed_report(domain)
+        
         return {
             'type': 'ir.actions.act_window',
             'name': 'ZNS Detailed Report',
@@ -406,16 +390,48 @@ class ZnsReportWizard(models.TransientModel):
             'domain': domain,
         }
     
+    def _export_detailed_report(self, domain):
+        """Stream detailed report to a file, now or in a background job"""
+        # Store the domain with plain values so the job can evaluate it later
+        stored_domain = [
+            (field, operator, fields.Datetime.to_string(value) if isinstance(value, datetime)
+             else fields.Date.to_string(value) if isinstance(value, date) else value)
+            for field, operator, value in domain
+        ]
+        export = self.env['zns.report.export'].create({
+            'name': f"ZNS Detailed Report {self.date_from} - {self.date_to}",
+            'domain': repr(stored_domain),
+            'export_format': self.export_format,
+        })
+        
+        if self.run_in_background:
+            self.env.ref('bom_zns_simple.cron_report_export_queue')._trigger()
+            return {
+                'type': 'ir.actions.client',
+                'tag': 'display_notification',
+                'params': {
+                    'title': 'Report Queued',
+                    'message': "Your report is being generated. You will be notified when it is ready.",
+                    'type': 'info',
+                    'sticky': False,
+                }
+            }
+        
+        export.run_export()
+        if export.state != 'done':
+            raise UserError(f"❌ Export failed: {export.error_message}")
+        return export.action_download()
+    
     def _generate_template_analysis(self, domain):
         """Generate template analysis report"""
         return {
             'type': 'ir.actions.act_window',
             'name': 'ZNS Template Analysis',
-            'res_model': 'zns.message',
+            'res_model': 'zns.message.daily.stat',
             'view_mode': 'pivot,graph',
-            'domain': domain,
+            'domain': self._get_rollup_domain(),
             'context': {
-                'pivot_measures': ['__count__'],
+                'pivot_measures': ['message_count'],
                 'pivot_column_groupby': ['status'],
                 'pivot_row_groupby': ['template_id'],
             }
@@ -426,12 +442,32 @@ class ZnsReportWizard(models.TransientModel):
         return {
             'type': 'ir.actions.act_window',
             'name': 'ZNS Trend Analysis',
-            'res_model': 'zns.message',
-            'view_mode': 'graph',
-            'domain': domain,
+            'res_model': 'zns.message.daily.stat',
+            'view_mode': 'graph,pivot',
+            'domain': self._get_rollup_domain(),
             'context': {
                 'graph_mode': 'line',
-                'graph_measure': '__count__',
-                'graph_groupbys': ['create_date:day'],
+                'graph_measure': 'message_count',
+                'graph_groupbys': ['period_start:day'],
             }
-        }
\ No newline at end of file
+        }
+    
+    def _get_rollup_domain(self):
+        """Get the wizard filters as a domain on the statistics rollup"""
+        # Same UTC range as the detailed report, hourly buckets line up with local days
+        start, end = self._get_date_range()
+        domain = [
+            ('period_start', '>=', start),
+            ('period_start', '<', end)
+        ]
+        
+        if self.template_ids:
+            domain.append(('template_id', 'in', self.template_ids.ids))
+        
+        if self.connection_ids:
+            domain.append(('connection_id', 'in', self.connection_ids.ids))
+        
+        if self.status != 'all':
+            domain.append(('status', '=', self.status))
+        
+        return domain
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+
+import math
+import logging
+from collections import defaultdict
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+# Log-scale buckets: 4 per power of two (~19% resolution), bucket 0 holds everything under 1 ms
+BUCKETS_PER_OCTAVE = 4
+
+
+def latency_bucket(milliseconds):
+    """Get the histogram bucket index of a latency in milliseconds"""
+    if milliseconds is None or milliseconds < 1:
+        return 0
+    return int(math.floor(BUCKETS_PER_OCTAVE * math.log2(milliseconds))) + 1
+
+
+def bucket_upper_bound(bucket):
+    """Get the upper latency bound in milliseconds of a histogram bucket"""
+    return 2 ** (bucket / BUCKETS_PER_OCTAVE)
+
+
+class ZnsLatencyHistogram(models.Model):
+    _name = 'zns.latency.histogram'
+    _description = 'ZNS Send Latency Histogram'
+    _order = 'hour desc'
+    _log_access = False
+
+    hour = fields.Datetime('Hour', required=True, index=True, readonly=True)
+    metric = fields.Selection([
+        ('http', 'BOM API Call'),
+        ('queue', 'Created to Sent'),
+        ('campaign_queue', 'Campaign Queued to Sent')
+    ], string='Metric', required=True, readonly=True)
+    connection_id = fields.Many2one('zns.connection', string='Connection', readonly=True, ondelete='cascade')
+    template_id = fields.Many2one('zns.template', string='Template', readonly=True, ondelete='cascade')
+    bucket = fields.Integer('Bucket', required=True, readonly=True)
+    sample_count = fields.Integer('Samples', readonly=True)
+
+    def init(self):
+        # Unique bucket per key, NULL connection/template count as one key
+        self.env.cr.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS zns_latency_histogram_key_index
+            ON zns_latency_histogram (hour, metric, (COALESCE(connection_id, 0)), (COALESCE(template_id, 0)), bucket)
+        """)
+
+    @api.model
+    def record_samples(self, samples):
+        """Add latency samples: list of (metric, connection_id, template_id, milliseconds)"""
+        counts = defaultdict(int)
+        hour = fields.Datetime.now().replace(minute=0, second=0, microsecond=0)
+        for metric, connection_id, template_id, milliseconds in samples:
+            if milliseconds is None or milliseconds < 0:
+                continue
+            counts[(metric, connection_id or None, template_id or None, latency_bucket(milliseconds))] += 1
+        if not counts:
+            return
+
+        rows = [(hour, metric, connection_id, template_id, bucket, count)
+                for (metric, connection_id, template_id, bucket), count in counts.items()]
+        values_sql = ", ".join(["(%s, %s, %s, %s, %s, %s)"] * len(rows))
+        self.env.cr.execute(f"""
+            INSERT INTO zns_latency_histogram (hour, metric, connection_id, template_id, bucket, sample_count)
+            VALUES {values_sql}
+            ON CONFLICT (hour, metric, (COALESCE(connection_id, 0)), (COALESCE(template_id, 0)), bucket) DO UPDATE
+            SET sample_count = zns_latency_histogram.sample_count + EXCLUDED.sample_count
+        """, [item for row in rows for item in row])
+
+    @api.model
+    def get_percentiles(self, metric='http', date_from=None, date_to=None, group_by=('connection_id',),
+                        percentiles=(50, 95, 99), cells=None):
+        """Get latency percentiles (ms) per group from the histogram
+
+        group_by is a subset of ('connection_id', 'template_id', 'hour').
+        cells optionally restricts to a (sql, params) query yielding (hour, connection_id, template_id) rows.
+        """
+        group_columns = [column for column in group_by if column in ('connection_id', 'template_id', 'hour')]
+        conditions = ["metric = %s"]
+        params = [metric]
+        if date_from:
+            conditions.append("hour >= %s")
+            params.append(date_from)
+        if date_to:
+            conditions.append("hour < %s")
+            params.append(date_to)
+        if cells:
+            cells_sql, cells_params = cells
+            conditions.append(f"""EXISTS (
+                SELECT 1 FROM ({cells_sql}) cell (hour, connection_id, template_id)
+                WHERE cell.hour = zns_latency_histogram.hour
+                  AND cell.connection_id IS NOT DISTINCT FROM zns_latency_histogram.connection_id
+                  AND cell.template_id IS NOT DISTINCT FROM zns_latency_histogram.template_id
+            )""")
+            params.extend(cells_params)
+
+        select_columns = ", ".join(group_columns + ['bucket'])
+        self.env.cr.execute(f"""
+            SELECT {select_columns}, SUM(sample_count)
+            FROM zns_latency_histogram
+            WHERE {' AND '.join(conditions)}
+            GROUP BY {select_columns}
+            ORDER BY {select_columns}
+        """, params)
+
+        histograms = defaultdict(list)
+        for row in self.env.cr.fetchall():
+            histograms[tuple(row[:len(group_columns)])].append((row[-2], row[-1]))
+
+        results = []
+        for key, buckets in histograms.items():
+            total = sum(count for _bucket, count in buckets)
+            result = dict(zip(group_columns, key), samples=total)
+            for percentile in percentiles:
+                # Smallest bucket whose cumulative count reaches the rank
+                rank = math.ceil(total * percentile / 100.0)
+                cumulative = 0
+                for bucket, count in buckets:
+                    cumulative += count
+                    if cumulative >= rank:
+                        result[f'p{percentile}'] = round(bucket_upper_bound(bucket), 1)
+                        break
+            results.append(result)
+        return results
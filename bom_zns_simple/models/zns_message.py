@@ -1,10 +1,12 @@
 # -*- coding: utf-8 -*-
 
 import json
+import time
 import logging
 import requests
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
+from .zns_constants import ROLLUP_KEY_FIELDS
 
 _logger = logging.getLogger(__name__)
 
@@ -28,12 +30,47 @@ class ZnsMessage(models.Model):
     ], string='Status', default='draft')
     error_message = fields.Text('Error Message')
     sent_date = fields.Datetime('Sent Date', readonly=True)
+    http_latency_ms = fields.Integer('API Latency (ms)', readonly=True, group_operator='avg',
+                                     help='Duration of the BOM API call')
+    queue_latency_ms = fields.Integer('Queue Latency (ms)', readonly=True, group_operator='avg',
+                                      help='Time from message creation until BOM accepted it')
     
     # Relations
     partner_id = fields.Many2one('res.partner', string='Contact')
     sale_order_id = fields.Many2one('sale.order', string='Sale Order')
     invoice_id = fields.Many2one('account.move', string='Invoice')
     
+    def init(self):
+        # Dashboard and report queries filter on create_date
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS zns_message_create_date_index
+            ON zns_message (create_date)
+        """)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        messages = super().create(vals_list)
+        messages.flush(ROLLUP_KEY_FIELDS)
+        self.env['zns.message.daily.stat']._apply_message_delta(messages.ids, 1)
+        return messages
+    
+    def write(self, vals):
+        # Move messages between rollup buckets only when a key field changes
+        rollup_changed = any(field in vals for field in ROLLUP_KEY_FIELDS)
+        if rollup_changed:
+            self.flush(ROLLUP_KEY_FIELDS)
+            self.env['zns.message.daily.stat']._apply_message_delta(self.ids, -1)
+        result = super().write(vals)
+        if rollup_changed:
+            self.flush(ROLLUP_KEY_FIELDS)
+            self.env['zns.message.daily.stat']._apply_message_delta(self.ids, 1)
+        return result
+    
+    def unlink(self):
+        self.flush(ROLLUP_KEY_FIELDS)
+        self.env['zns.message.daily.stat']._apply_message_delta(self.ids, -1)
+        return super().unlink()
+    
     @api.depends('template_id', 'phone', 'create_date')
     def _compute_display_name(self):
         for record in self:
@@ -54,6 +91,19 @@ class ZnsMessage(models.Model):
         if not connection.api_key:
             raise UserError("No API key configured")
         
+        # Skip phones BOM already rejected as unreachable, looked up on its own cursor
+        # so the hit and lookup counters are kept although the send raises
+        with self.pool.cursor() as cr:
+            cached = self.env(cr=cr)['zns.negative.cache'].check_phone(self.phone)
+            cached_error = cached and f"{cached.error_code}: {cached.error_message}"
+        if cached_error:
+            error_msg = f"Skipped: phone previously rejected by BOM ({cached_error})"
+            self.write({
+                'status': 'failed',
+                'error_message': error_msg
+            })
+            raise UserError(f"❌ {error_msg}")
+        
         _logger.info(f"=== SENDING ZNS MESSAGE ID {self.id} ===")
         _logger.info(f"Template: {self.template_id.name} ({self.template_id.template_id})")
         _logger.info(f"Phone: {self.phone}")
@@ -111,7 +161,9 @@ class ZnsMessage(models.Model):
             _logger.info(f"Headers: {headers}")
             _logger.info(f"Data: {data}")
             
+            started = time.perf_counter()
             response = requests.post(url, headers=headers, json=data, timeout=30)
+            http_latency_ms = int((time.perf_counter() - started) * 1000)
             
             _logger.info(f"📨 Response received:")
             _logger.info(f"Status: {response.status_code}")
@@ -124,13 +176,18 @@ class ZnsMessage(models.Model):
             if result.get('error') == 0 or result.get('error') == '0':
                 message_data = result.get('data', {})
                 message_id = message_data.get('message_id', str(response.status_code))
+                sent_date = fields.Datetime.now()
+                queue_latency_ms = int((sent_date - self.create_date).total_seconds() * 1000) if self.create_date else None
                 
                 self.write({
                     'status': 'sent',
                     'message_id': message_id,
-                    'sent_date': fields.Datetime.now(),
-                    'error_message': False
+                    'sent_date': sent_date,
+                    'error_message': False,
+                    'http_latency_ms': http_latency_ms,
+                    'queue_latency_ms': queue_latency_ms,
                 })
+                self._record_latency(http_latency_ms, queue_latency_ms)
                 
                 _logger.info(f"✅ ZNS message sent successfully! Message ID: {message_id}")
                 
@@ -151,10 +208,16 @@ class ZnsMessage(models.Model):
                 
                 _logger.error(f"❌ {full_error}")
                 
+                # Remember phones BOM cannot deliver to, on its own cursor so it survives the raise below
+                with self.pool.cursor() as cr:
+                    self.env(cr=cr)['zns.negative.cache'].record_rejection(self.phone, error_code, error_msg)
+                
                 self.write({
                     'status': 'failed',
-                    'error_message': full_error
+                    'error_message': full_error,
+                    'http_latency_ms': http_latency_ms,
                 })
+                self._record_latency(http_latency_ms)
                 raise UserError(f"❌ Send failed: {full_error}")
                 
         except requests.exceptions.RequestException as e:
@@ -174,6 +237,14 @@ class ZnsMessage(models.Model):
             })
             raise UserError(f"❌ Send failed: {error_msg}")
     
+    def _record_latency(self, http_latency_ms, queue_latency_ms=None):
+        """Add this send's latencies to the latency histogram"""
+        self.ensure_one()
+        samples = [('http', self.connection_id.id, self.template_id.id, http_latency_ms)]
+        if queue_latency_ms is not None:
+            samples.append(('queue', self.connection_id.id, self.template_id.id, queue_latency_ms))
+        self.env['zns.latency.histogram'].sudo().record_samples(samples)
+    
     def test_send_dummy(self):
         """Test send functionality with dummy data"""
         # Create dummy parameters based on Postman collection example
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import re
+import logging
+from collections import Counter
+from datetime import timedelta
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+# BOM / Zalo error codes meaning the phone itself cannot receive ZNS
+BOM_PHONE_ERROR_CODES = {
+    '-108': 'invalid_phone',
+    '-118': 'not_on_zalo',
+    '-119': 'not_on_zalo',
+}
+
+# Fallback keywords when BOM only returns a message
+BOM_PHONE_ERROR_KEYWORDS = [
+    ('not_on_zalo', ('not a zalo user', 'zalo account not exist', 'user not exist', 'khong ton tai', 'không tồn tại')),
+    ('invalid_phone', ('invalid phone', 'phone number is invalid', 'so dien thoai khong hop le', 'số điện thoại không hợp lệ')),
+]
+
+
+class ZnsNegativeCache(models.Model):
+    _name = 'zns.negative.cache'
+    _description = 'ZNS Rejected Phone Cache'
+    _order = 'expires_at desc'
+    _rec_name = 'phone'
+
+    phone = fields.Char('Phone', required=True, index=True, help='Phone in +84 format, same key as the contact ZNS phone')
+    error_class = fields.Selection([
+        ('not_on_zalo', 'Not on Zalo'),
+        ('invalid_phone', 'Invalid Phone')
+    ], string='Error Class', required=True)
+    error_code = fields.Char('BOM Error Code')
+    error_message = fields.Text('Error Message')
+    expires_at = fields.Datetime('Expires At', required=True, index=True)
+    hit_count = fields.Integer('Calls Saved', default=0, readonly=True)
+
+    _sql_constraints = [
+        ('phone_unique', 'unique(phone)', 'Phone already cached'),
+    ]
+
+    @api.model
+    def _get_ttl_days(self):
+        """Get cache TTL in days from system parameters"""
+        ttl = self.env['ir.config_parameter'].sudo().get_param('bom_zns_simple.negative_cache_ttl_days', '30')
+        try:
+            return max(int(ttl), 0)
+        except ValueError:
+            return 30
+
+    @api.model
+    def classify_error(self, error_code, error_message):
+        """Return error class if the BOM error is about the phone itself, else False"""
+        if error_code is None:
+            # Recover the code from "API Error <code>: ..." messages
+            match = re.search(r'API Error (-?\d+)', error_message or '')
+            error_code = match.group(1) if match else None
+
+        error_class = BOM_PHONE_ERROR_CODES.get(str(error_code))
+        if error_class:
+            return error_class
+
+        message = (error_message or '').lower()
+        for error_class, keywords in BOM_PHONE_ERROR_KEYWORDS:
+            if any(keyword in message for keyword in keywords):
+                return error_class
+        return False
+
+    @api.model
+    def check_phone(self, phone):
+        """Get the live cache entry for phone, counting hits and misses"""
+        key = self.env['res.partner']._normalize_zns_phone(phone)
+        entry = self.browse()
+        if key:
+            entry = self.sudo().search([
+                ('phone', '=', key),
+                ('expires_at', '>', fields.Datetime.now())
+            ], limit=1)
+
+        if entry:
+            self.env.cr.execute(
+                "UPDATE zns_negative_cache SET hit_count = hit_count + 1 WHERE id = %s", (entry.id,)
+            )
+            entry.invalidate_cache(['hit_count'])
+            _logger.info(f"🚫 Negative cache hit for {phone}: {entry.error_class}")
+        self.env['zns.negative.cache.stat'].add_lookup(hit=bool(entry))
+        return entry
+
+    @api.model
+    def record_rejection(self, phone, error_code, error_message):
+        """Cache a BOM rejection if it is phone related, return the error class"""
+        error_class = self.classify_error(error_code, error_message)
+        key = self.env['res.partner']._normalize_zns_phone(phone)
+        ttl_days = self._get_ttl_days()
+        if not error_class or not key or not ttl_days:
+            return False
+
+        expires_at = fields.Datetime.now() + timedelta(days=ttl_days)
+        self.env.cr.execute("""
+            INSERT INTO zns_negative_cache
+                (phone, error_class, error_code, error_message, expires_at, hit_count,
+                 create_uid, create_date, write_uid, write_date)
+            VALUES (%s, %s, %s, %s, %s, 0, %s, (now() at time zone 'UTC'), %s, (now() at time zone 'UTC'))
+            ON CONFLICT (phone) DO UPDATE SET
+                error_class = EXCLUDED.error_class,
+                error_code = EXCLUDED.error_code,
+                error_message = EXCLUDED.error_message,
+                expires_at = EXCLUDED.expires_at,
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, (key, error_class, str(error_code), error_message, expires_at, self.env.uid, self.env.uid))
+        self.invalidate_cache()
+
+        _logger.info(f"📝 Cached BOM rejection for {phone}: {error_class} (expires {expires_at})")
+        return error_class
+
+    @api.model
+    def get_cache_statistics(self):
+        """Get negative cache statistics"""
+        now = fields.Datetime.now()
+        self.env.cr.execute("""
+            SELECT COUNT(*) FILTER (WHERE expires_at > %s),
+                   COUNT(*) FILTER (WHERE expires_at > %s AND error_class = 'not_on_zalo'),
+                   COALESCE(SUM(hit_count), 0)
+            FROM zns_negative_cache
+        """, (now, now))
+        active, not_on_zalo, calls_saved = self.env.cr.fetchone()
+
+        hits, misses = self.env['zns.negative.cache.stat'].get_lookup_totals(days=30)
+        lookups = hits + misses
+        return {
+            'active_entries': active,
+            'not_on_zalo_entries': not_on_zalo,
+            'invalid_phone_entries': active - not_on_zalo,
+            'calls_saved': calls_saved,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / lookups * 100, 2) if lookups else 0.0,
+        }
+
+    @api.model
+    def cleanup_expired(self):
+        """Cron job: Remove expired cache entries"""
+        expired = self.sudo().search([('expires_at', '<=', fields.Datetime.now())])
+        count = len(expired)
+        expired.unlink()
+        _logger.info(f"🧹 Removed {count} expired negative cache entries")
+        return count
+
+
+class ZnsNegativeCacheStat(models.Model):
+    _name = 'zns.negative.cache.stat'
+    _description = 'ZNS Rejected Phone Cache Lookups'
+    _order = 'day desc'
+    _log_access = False
+
+    day = fields.Date('Day', required=True, readonly=True)
+    hits = fields.Integer('Hits', readonly=True)
+    misses = fields.Integer('Misses', readonly=True)
+
+    _sql_constraints = [
+        ('day_unique', 'unique(day)', 'Only one lookup counter per day is allowed'),
+    ]
+
+    @api.model
+    def add_lookup(self, hit):
+        """Count a cache lookup, written once when the transaction commits"""
+        data = self.env.cr.precommit.data
+        pending = data.get('zns.negative_cache_lookups')
+        if pending is None:
+            pending = data['zns.negative_cache_lookups'] = Counter()
+            self.env.cr.precommit.add(self._flush_lookups)
+        pending['hits' if hit else 'misses'] += 1
+
+    def _flush_lookups(self):
+        """Add the transaction's lookups to today's counters in one statement"""
+        pending = self.env.cr.precommit.data.pop('zns.negative_cache_lookups', None)
+        if not pending:
+            return
+        self.env.cr.execute("""
+            INSERT INTO zns_negative_cache_stat (day, hits, misses)
+            VALUES (%s, %s, %s)
+            ON CONFLICT (day) DO UPDATE
+            SET hits = zns_negative_cache_stat.hits + EXCLUDED.hits,
+                misses = zns_negative_cache_stat.misses + EXCLUDED.misses
+        """, (fields.Date.today(), pending['hits'], pending['misses']))
+
+    @api.model
+    def get_lookup_totals(self, days=30):
+        """Get (hits, misses) over the last days, shared by all workers"""
+        self.env.cr.execute("""
+            SELECT COALESCE(SUM(hits), 0), COALESCE(SUM(misses), 0)
+            FROM zns_negative_cache_stat
+            WHERE day > %s
+        """, (fields.Date.today() - timedelta(days=days),))
+        return self.env.cr.fetchone()
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+
+import csv
+import io
+import logging
+import mimetypes
+import tempfile
+import threading
+from odoo import models, fields, api, _
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+# Columns of the detailed report (header, SQL expression)
+DETAILED_REPORT_COLUMNS = [
+    ('ID', '"zns_message".id'),
+    ('Created', '"zns_message".create_date'),
+    ('Sent', '"zns_message".sent_date'),
+    ('Template', 'zns_report_template.name'),
+    ('Connection', 'zns_report_connection.name'),
+    ('Phone', '"zns_message".phone'),
+    ('Contact', 'zns_report_partner.name'),
+    ('Sales Order', 'zns_report_order.name'),
+    ('Invoice', 'zns_report_invoice.name'),
+    ('Status', '"zns_message".status'),
+    ('BOM Message ID', '"zns_message".message_id'),
+    ('Error', '"zns_message".error_message'),
+]
+
+# XLSX sheets hold at most 1,048,576 rows including the header
+XLSX_MAX_ROWS = 1048575
+
+
+class ZnsReportExport(models.Model):
+    _name = 'zns.report.export'
+    _description = 'ZNS Report Export'
+    _order = 'create_date desc'
+
+    name = fields.Char('Name', required=True)
+    domain = fields.Text('Domain', required=True, default='[]')
+    export_format = fields.Selection([
+        ('csv', 'CSV'),
+        ('xlsx', 'Excel (XLSX)')
+    ], string='Format', required=True, default='csv')
+    state = fields.Selection([
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed')
+    ], string='Status', default='queued', required=True, index=True)
+    row_count = fields.Integer('Rows', readonly=True)
+    attachment_id = fields.Many2one('ir.attachment', string='File', readonly=True)
+    error_message = fields.Text('Error Message', readonly=True)
+
+    @api.model
+    def _get_chunk_size(self):
+        """Get number of rows fetched per round trip"""
+        chunk_size = self.env['ir.config_parameter'].sudo().get_param('bom_zns_simple.export_chunk_size', '5000')
+        try:
+            return max(int(chunk_size), 100)
+        except ValueError:
+            return 5000
+
+    def action_download(self):
+        """Download the exported file"""
+        self.ensure_one()
+        return {
+            'type': 'ir.actions.act_url',
+            'url': f'/web/content/{self.attachment_id.id}?download=true',
+            'target': 'self',
+        }
+
+    def run_export(self):
+        """Stream matching messages into the export file"""
+        for job in self:
+            job.write({'state': 'running', 'error_message': False})
+            try:
+                # Apply the requester's record rules, not the cron user's
+                job_as_owner = job.with_user(job.create_uid)
+                domain = safe_eval(job.domain)
+                with tempfile.TemporaryFile() as output:
+                    if job.export_format == 'xlsx':
+                        row_count = job_as_owner._write_xlsx(domain, output)
+                    else:
+                        row_count = job_as_owner._write_csv(domain, output)
+                    attachment = job._attach_file(f"{job.name}.{job.export_format}", output)
+                job.write({'state': 'done', 'row_count': row_count, 'attachment_id': attachment.id})
+                _logger.info(f"✅ ZNS report export {job.name}: {row_count} rows")
+            except Exception as e:
+                _logger.error(f"❌ ZNS report export {job.name} failed: {e}", exc_info=True)
+                job.write({'state': 'failed', 'error_message': str(e)})
+
+    def _attach_file(self, filename, output):
+        """Create the export attachment from the finished file"""
+        self.ensure_one()
+        Attachment = self.env['ir.attachment']
+        vals = {
+            'name': filename,
+            'res_model': self._name,
+            'res_id': self.id,
+            'mimetype': mimetypes.guess_type(filename)[0] or 'application/octet-stream',
+        }
+        # Rows were streamed to a temporary file, only the finished file is read back
+        output.seek(0)
+        return Attachment.create(dict(vals, raw=output.read()))
+
+    def _iter_rows(self, domain):
+        """Yield chunks of report rows, paging on message id"""
+        from_clause, where_clause, params = self.env['zns.dashboard']._compile_message_domain(domain)
+        columns = ", ".join(expression for _header, expression in DETAILED_REPORT_COLUMNS)
+        query = f"""
+            SELECT {columns}
+            FROM {from_clause}
+            LEFT JOIN zns_template zns_report_template ON zns_report_template.id = "zns_message".template_id
+            LEFT JOIN zns_connection zns_report_connection ON zns_report_connection.id = "zns_message".connection_id
+            LEFT JOIN res_partner zns_report_partner ON zns_report_partner.id = "zns_message".partner_id
+            LEFT JOIN sale_order zns_report_order ON zns_report_order.id = "zns_message".sale_order_id
+            LEFT JOIN account_move zns_report_invoice ON zns_report_invoice.id = "zns_message".invoice_id
+            WHERE ({where_clause}) AND "zns_message".id > %s
+            ORDER BY "zns_message".id
+            LIMIT %s
+        """
+        chunk_size = self._get_chunk_size()
+
+        # Keyset paging on the id index, only one chunk is held in memory
+        last_id = 0
+        while True:
+            self.env.cr.execute(query, list(params) + [last_id, chunk_size])
+            rows = self.env.cr.fetchall()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            yield rows
+
+    def _write_csv(self, domain, output):
+        """Write report rows as CSV, return row count"""
+        text_output = io.TextIOWrapper(output, encoding='utf-8-sig', newline='')
+        writer = csv.writer(text_output)
+        writer.writerow([header for header, _expression in DETAILED_REPORT_COLUMNS])
+
+        row_count = 0
+        for rows in self._iter_rows(domain):
+            writer.writerows(rows)
+            row_count += len(rows)
+        text_output.flush()
+        text_output.detach()
+        return row_count
+
+    def _write_xlsx(self, domain, output):
+        """Write report rows as XLSX in constant memory mode, return row count"""
+        import xlsxwriter
+
+        workbook = xlsxwriter.Workbook(output, {'constant_memory': True, 'default_date_format': 'yyyy-mm-dd hh:mm:ss'})
+        headers = [header for header, _expression in DETAILED_REPORT_COLUMNS]
+        sheet = None
+        sheet_row = XLSX_MAX_ROWS
+        row_count = 0
+        for rows in self._iter_rows(domain):
+            for row in rows:
+                # Start a new sheet when the current one is full
+                if sheet_row >= XLSX_MAX_ROWS:
+                    sheet = workbook.add_worksheet(f"Messages {len(workbook.worksheets()) + 1}")
+                    sheet.write_row(0, 0, headers)
+                    sheet_row = 0
+                sheet_row += 1
+                sheet.write_row(sheet_row, 0, row)
+            row_count += len(rows)
+        if sheet is None:
+            workbook.add_worksheet('Messages 1').write_row(0, 0, headers)
+        workbook.close()
+        return row_count
+
+    def _notify_requester(self):
+        """Notify the requester that the export finished"""
+        if 'bus.bus' not in self.env:
+            return
+        for job in self:
+            if job.state == 'done':
+                message = _("%s is ready (%s rows). Open Reports > Exports to download it.") % (job.name, job.row_count)
+            else:
+                message = _("%s failed: %s") % (job.name, job.error_message)
+            self.env['bus.bus']._sendone(job.create_uid.partner_id, 'simple_notification', {
+                'title': _('ZNS Report Export'),
+                'message': message,
+                'sticky': True,
+                'warning': job.state != 'done',
+            })
+
+    @api.model
+    def process_export_queue(self):
+        """Cron job: Run queued exports one at a time, committing after each"""
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        jobs = self.search([('state', '=', 'queued')], order='id')
+        for job in jobs:
+            job.run_export()
+            job._notify_requester()
+            if auto_commit:
+                self.env.cr.commit()
+        return len(jobs)
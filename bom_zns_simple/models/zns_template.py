@@ -1,13 +1,32 @@
 # -*- coding: utf-8 -*-
 
+import json
+import time
+import hashlib
 import requests
 import logging
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
 from odoo import models, fields, api, _
 from odoo.exceptions import UserError
 
 _logger = logging.getLogger(__name__)
 
 
+def _fetch_template_params(url, headers, template_id):
+    """Fetch parameter definitions of one BOM template (HTTP only, safe to run in threads)"""
+    try:
+        response = requests.post(url, headers=headers, json={'template_id': template_id}, timeout=30)
+        if response.status_code != 200:
+            return template_id, None, f"HTTP {response.status_code}: {response.text}"
+        result = response.json()
+        if result.get('error') == '0' or result.get('error') == 0:
+            return template_id, result.get('data', []), None
+        return template_id, None, result.get('message', 'Unknown API error')
+    except Exception as e:
+        return template_id, None, str(e)
+
+
 class ZnsTemplate(models.Model):
     _name = 'zns.template'
     _description = 'ZNS Template'
@@ -41,6 +60,13 @@ class ZnsTemplate(models.Model):
     parameters_synced = fields.Boolean('Parameters Synced', default=False, readonly=True, 
                                      help="True if template parameters have been synced from BOM")
     
+    # BOM definition fingerprint for incremental sync
+    bom_status = fields.Char('BOM Status', readonly=True)
+    bom_fingerprint = fields.Char('BOM Fingerprint', readonly=True, copy=False,
+                                  help='Hash of the BOM definition (parameters, type, status) at last sync')
+    bom_list_fingerprint = fields.Char('BOM List Fingerprint', readonly=True, copy=False,
+                                       help='Hash of the template list entry (type, status, last update) at last sync')
+    
     def sync_template_params(self):
         """Sync template parameters from BOM API - UPDATED: Don't clear existing parameters"""
         connection = self.connection_id
@@ -68,26 +94,9 @@ class ZnsTemplate(models.Model):
             if result.get('error') == '0' or result.get('error') == 0:
                 params_data = result.get('data', [])
                 
-                # UPDATED: Only clear parameters if none exist or forced
+                # UPDATED: Only rewrite parameters if none exist or forced
                 if not self.parameter_ids or self.env.context.get('force_sync'):
-                    # Clear existing parameters only if forced or none exist
-                    self.parameter_ids.unlink()
-                    
-                    # Create new parameters
-                    created_params = []
-                    for param in params_data:
-                        param_name = param.get('name') or param.get('key')
-                        if param_name:
-                            param_record = self.env['zns.template.parameter'].create({
-                                'template_id': self.id,
-                                'name': param_name,
-                                'title': param.get('title') or param_name,
-                                'param_type': self._map_param_type(param.get('type', 'string')),
-                                'required': param.get('require', False),
-                                'default_value': param.get('default_value', ''),
-                                'description': param.get('description', '')
-                            })
-                            created_params.append(param_name)
+                    created_params = self._upsert_parameters(params_data)
                     
                     success_msg = f"Successfully synced {len(created_params)} parameters: {', '.join(created_params)}"
                     self.write({
@@ -135,9 +144,68 @@ class ZnsTemplate(models.Model):
             raise UserError(error_msg)
     
     def force_refresh_params(self):
-        """Force refresh parameters from BOM (will clear existing mappings)"""
+        """Force refresh parameters from BOM (mappings kept for parameters that still exist)"""
         return self.with_context(force_sync=True).sync_template_params()
     
+    def _upsert_parameters(self, params_data):
+        """Upsert parameters from BOM data in bulk, keeping mappings of existing parameters"""
+        self.ensure_one()
+        existing = {param.name: param for param in self.parameter_ids}
+        
+        vals_list = []
+        synced_names = []
+        for param in params_data:
+            param_name = param.get('name') or param.get('key')
+            if not param_name or param_name in synced_names:
+                continue
+            synced_names.append(param_name)
+            
+            vals = {
+                'title': param.get('title') or param_name,
+                'param_type': self._map_param_type(param.get('type', 'string')),
+                'required': bool(param.get('require', False)),
+                'default_value': param.get('default_value', '') or '',
+                'description': param.get('description', '') or '',
+            }
+            current = existing.pop(param_name, None)
+            if current:
+                # Only write fields that actually changed
+                changed = {key: value for key, value in vals.items() if (current[key] or type(value)()) != value}
+                if changed:
+                    current.write(changed)
+            else:
+                vals.update({'template_id': self.id, 'name': param_name})
+                vals_list.append(vals)
+        
+        if vals_list:
+            self.env['zns.template.parameter'].create(vals_list)
+        
+        # Parameters no longer defined on BOM
+        if existing:
+            self.env['zns.template.parameter'].browse([param.id for param in existing.values()]).unlink()
+        
+        return synced_names
+    
+    @api.model
+    def _fetch_params_concurrently(self, connection, access_token, template_ids):
+        """Fetch parameter definitions for many templates with bounded parallelism"""
+        if not template_ids:
+            return {}
+        
+        max_workers = self.env['ir.config_parameter'].sudo().get_param('bom_zns_simple.sync_max_workers', '8')
+        try:
+            max_workers = max(1, min(int(max_workers), len(template_ids)))
+        except ValueError:
+            max_workers = min(8, len(template_ids))
+        
+        # Read everything needed from the ORM before starting threads
+        url = f"{connection.api_base_url}/get-param-zns-template"
+        headers = {'Authorization': f'Bearer {access_token}'}
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(lambda tid: _fetch_template_params(url, headers, tid), template_ids)
+            return {template_id: (params_data, error) for template_id, params_data, error in results}
+    
     @api.model
     def sync_all_templates_from_bom(self):
         """Sync ALL templates from BOM API - UPDATED: Use template_id as primary key, no duplicates"""
@@ -194,54 +262,67 @@ class ZnsTemplate(models.Model):
             error_count = 0
             errors = []
             
+            # Prefetch existing templates of this connection in one query
+            existing_templates = {
+                template.template_id: template
+                for template in self.with_context(active_test=False).search([('connection_id', '=', connection.id)])
+            }
+            
+            new_vals_list = []
+            bom_data_by_id = {}
             for template_data in templates_data:
-                try:
-                    template_id = template_data.get('id') or template_data.get('template_id')
-                    template_name = template_data.get('name') or template_data.get('title') or f"Template {template_id}"
-                    template_type = template_data.get('type', 'transaction').lower()
-                    
-                    if not template_id:
-                        _logger.warning(f"Skipping template without ID: {template_data}")
-                        continue
-                    
-                    # UPDATED: Check by template_id only (primary key logic)
-                    existing_template = self.search([
-                        ('template_id', '=', str(template_id)),
-                        ('connection_id', '=', connection.id)
-                    ], limit=1)
-                    
-                    if existing_template:
-                        # UPDATED: Skip existing templates completely (no updates to preserve mappings)
-                        skipped_count += 1
-                        _logger.info(f"⏭️ Skipped existing template: {template_name} (BOM ID: {template_id})")
-                        continue
-                    else:
-                        # UPDATED: Create new template with 'pending' apply_to and active=True
-                        new_template = self.create({
-                            'name': template_name,
-                            'template_id': str(template_id),
-                            'template_type': self._map_template_type(template_type),
-                            'connection_id': connection.id,
-                            'active': True,  # Active by default
-                            'apply_to': 'pending'  # Pending by default
-                        })
-                        
-                        # Sync parameters for new template only
-                        try:
-                            new_template.sync_template_params()
-                            synced_count += 1
-                            _logger.info(f"✅ Created NEW template: {template_name} (BOM ID: {template_id})")
-                        except Exception as param_error:
-                            _logger.warning(f"Failed to sync parameters for new {template_name}: {param_error}")
-                            errors.append(f"{template_name}: Parameter sync failed")
-                            error_count += 1
-                            
-                except Exception as e:
+                template_id = template_data.get('id') or template_data.get('template_id')
+                template_name = template_data.get('name') or template_data.get('title') or f"Template {template_id}"
+                template_type = template_data.get('type', 'transaction').lower()
+                
+                if not template_id:
+                    _logger.warning(f"Skipping template without ID: {template_data}")
+                    continue
+                
+                if str(template_id) in existing_templates:
+                    # UPDATED: Skip existing templates completely (no updates to preserve mappings)
+                    skipped_count += 1
+                    continue
+                
+                # UPDATED: Create new template with 'pending' apply_to and active=True
+                existing_templates[str(template_id)] = False
+                bom_data_by_id[str(template_id)] = template_data
+                new_vals_list.append({
+                    'name': template_name,
+                    'template_id': str(template_id),
+                    'template_type': self._map_template_type(template_type),
+                    'connection_id': connection.id,
+                    'active': True,  # Active by default
+                    'apply_to': 'pending'  # Pending by default
+                })
+            
+            _logger.info(f"⏭️ Skipped {skipped_count} existing templates")
+            new_templates = self.create(new_vals_list) if new_vals_list else self.browse()
+            
+            # Fetch parameters for new templates concurrently, then write them in bulk
+            fetched = self._fetch_params_concurrently(connection, access_token, new_templates.mapped('template_id'))
+            now = fields.Datetime.now()
+            for new_template in new_templates:
+                params_data, fetch_error = fetched.get(new_template.template_id, (None, 'Not fetched'))
+                if fetch_error:
+                    _logger.warning(f"Failed to sync parameters for new {new_template.name}: {fetch_error}")
+                    new_template.write({'sync_status': f"Sync failed: {fetch_error}"})
+                    errors.append(f"{new_template.name}: Parameter sync failed")
                     error_count += 1
-                    template_name = template_data.get('name', 'Unknown')
-                    error_msg = f"{template_name}: {str(e)}"
-                    errors.append(error_msg)
-                    _logger.error(f"Failed to process template {template_name}: {e}")
+                    continue
+                
+                synced_params = new_template._upsert_parameters(params_data)
+                template_data = bom_data_by_id.get(new_template.template_id, {})
+                new_template.write({
+                    'last_sync': now,
+                    'sync_status': f"Successfully synced {len(synced_params)} parameters: {', '.join(synced_params)}",
+                    'parameters_synced': True,
+                    'bom_status': self._get_bom_status(template_data),
+                    'bom_fingerprint': self._compute_bom_fingerprint(template_data, params_data),
+                    'bom_list_fingerprint': self._compute_list_fingerprint(template_data)
+                })
+                synced_count += 1
+                _logger.info(f"✅ Created NEW template: {new_template.name} (BOM ID: {new_template.template_id})")
             
             # Build success message
             result_msg = f"🎉 Auto Template Sync Completed!\n\n"
@@ -278,6 +359,158 @@ class ZnsTemplate(models.Model):
             _logger.error(f"Template auto sync error: {e}", exc_info=True)
             raise UserError(f"❌ {error_msg}")
     
+    @api.model
+    def sync_templates_incremental(self):
+        """Cron job: Resync only templates whose BOM definition fingerprint changed"""
+        results = []
+        for connection in self.env['zns.connection'].search([('active', '=', True)]):
+            try:
+                results.append(self._sync_connection_incremental(connection))
+            except Exception as e:
+                _logger.error(f"❌ Incremental template sync failed for {connection.name}: {e}")
+                connection.write({'last_error': f"Incremental template sync failed: {str(e)}"})
+        return results
+    
+    def _sync_connection_incremental(self, connection):
+        """Fetch the BOM definitions of a connection and rewrite changed templates only"""
+        start = time.time()
+        access_token = connection._get_access_token()
+        headers = {'Authorization': f'Bearer {access_token}'}
+        
+        response = requests.post(f"{connection.api_base_url}/get-list-all-template", headers=headers, json={}, timeout=30)
+        response.raise_for_status()
+        result = response.json()
+        if result.get('error') != '0' and result.get('error') != 0:
+            raise UserError(f"❌ API Error: {result.get('message', 'Failed to get template list')}")
+        
+        templates_data = {
+            str(data.get('id') or data.get('template_id')): data
+            for data in result.get('data', []) if data.get('id') or data.get('template_id')
+        }
+        existing_templates = {
+            template.template_id: template
+            for template in self.with_context(active_test=False).search([('connection_id', '=', connection.id)])
+        }
+        
+        # Create templates that appeared on BOM since the last sync
+        new_vals_list = [{
+            'name': data.get('name') or data.get('title') or f"Template {template_id}",
+            'template_id': template_id,
+            'template_type': self._map_template_type(str(data.get('type') or 'transaction').lower()),
+            'connection_id': connection.id,
+            'active': True,
+            'apply_to': 'pending'
+        } for template_id, data in templates_data.items() if template_id not in existing_templates]
+        for template in (self.create(new_vals_list) if new_vals_list else self.browse()):
+            existing_templates[template.template_id] = template
+        
+        # Only fetch parameters of templates whose list entry changed, or not refreshed for too long
+        now = fields.Datetime.now()
+        refresh_before = now - timedelta(days=self._get_full_refresh_days())
+        list_fingerprints = {template_id: self._compute_list_fingerprint(data) for template_id, data in templates_data.items()}
+        to_fetch = [
+            template_id for template_id, template in existing_templates.items()
+            if template_id in templates_data and (
+                list_fingerprints[template_id] != template.bom_list_fingerprint
+                or not template.bom_fingerprint
+                or not template.last_sync or template.last_sync < refresh_before
+            )
+        ]
+        fetched = self._fetch_params_concurrently(connection, access_token, to_fetch)
+        
+        changed_count = 0
+        error_count = 0
+        for template_id in to_fetch:
+            template = existing_templates[template_id]
+            data = templates_data[template_id]
+            params_data, fetch_error = fetched.get(template_id, (None, 'Not fetched'))
+            if fetch_error:
+                error_count += 1
+                _logger.warning(f"Failed to fetch parameters for {template.name}: {fetch_error}")
+                continue
+            
+            fingerprint = self._compute_bom_fingerprint(data, params_data)
+            if fingerprint == template.bom_fingerprint:
+                template.write({'bom_list_fingerprint': list_fingerprints[template_id], 'last_sync': now})
+                continue
+            
+            synced_params = template._upsert_parameters(params_data)
+            template.write({
+                'template_type': self._map_template_type(str(data.get('type') or 'transaction').lower()),
+                'bom_status': self._get_bom_status(data),
+                'bom_fingerprint': fingerprint,
+                'bom_list_fingerprint': list_fingerprints[template_id],
+                'last_sync': now,
+                'sync_status': f"Definition changed on BOM, synced {len(synced_params)} parameters: {', '.join(synced_params)}",
+                'parameters_synced': True
+            })
+            changed_count += 1
+        
+        duration = time.time() - start
+        connection.write({
+            'last_sync': now,
+            'template_sync_duration': duration,
+            'template_sync_changed': changed_count
+        })
+        _logger.info(f"🔄 Incremental template sync for {connection.name}: {len(templates_data)} checked, "
+                     f"{len(to_fetch)} fetched, {changed_count} changed, {len(new_vals_list)} new, "
+                     f"{error_count} errors in {duration:.2f}s")
+        
+        return {
+            'connection_id': connection.id,
+            'checked': len(templates_data),
+            'fetched': len(to_fetch),
+            'changed': changed_count,
+            'created': len(new_vals_list),
+            'errors': error_count,
+            'duration': duration,
+        }
+    
+    @api.model
+    def _get_full_refresh_days(self):
+        """Get days after which template parameters are refetched even if the list entry is unchanged"""
+        days = self.env['ir.config_parameter'].sudo().get_param('bom_zns_simple.template_full_refresh_days', '7')
+        try:
+            return max(int(days), 1)
+        except ValueError:
+            return 7
+    
+    @api.model
+    def _compute_list_fingerprint(self, template_data):
+        """Hash the template list entry (type, status, last update), available without per-template calls"""
+        definition = {
+            'type': str(template_data.get('type') or '').lower(),
+            'status': self._get_bom_status(template_data),
+            'updated': template_data.get('updated_at') or template_data.get('updated') or template_data.get('update_time'),
+        }
+        return hashlib.sha1(json.dumps(definition, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
+    @api.model
+    def _get_bom_status(self, template_data):
+        """Get template status from BOM list data"""
+        return str(template_data.get('status') or template_data.get('status_name') or '') or False
+    
+    @api.model
+    def _compute_bom_fingerprint(self, template_data, params_data):
+        """Hash the BOM definition of a template (parameters, type, status)"""
+        params = sorted(
+            [{
+                'name': param.get('name') or param.get('key'),
+                'title': param.get('title'),
+                'type': param.get('type'),
+                'require': bool(param.get('require', False)),
+                'default_value': param.get('default_value'),
+                'description': param.get('description'),
+            } for param in params_data or []],
+            key=lambda param: str(param['name'])
+        )
+        definition = {
+            'type': str(template_data.get('type', '')).lower(),
+            'status': self._get_bom_status(template_data),
+            'params': params,
+        }
+        return hashlib.sha1(json.dumps(definition, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
     def _map_template_type(self, bom_type):
         """Map BOM template type to Odoo selection"""
         type_mapping = {
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from datetime import datetime, time, timedelta
+import pytz
+from dateutil.relativedelta import relativedelta
+from odoo import models, api, _
+from odoo.exceptions import UserError
+
+_logger = logging.getLogger(__name__)
+
+# Supported bucket units and their chart label formats
+GRANULARITY_LABELS = {
+    'hour': '%H:%M',
+    'day': '%m/%d',
+    'week': '%m/%d',
+    'month': '%b',
+    'year': '%Y',
+}
+
+
+class ZnsTimeseries(models.AbstractModel):
+    _name = 'zns.timeseries'
+    _description = 'ZNS Time Series Queries'
+
+    @api.model
+    def get_series(self, table, time_column, measures, date_from, date_to, granularity='day', step=1,
+                   tz=None, where=None, where_params=None):
+        """Bucket and gap-fill rows of table in SQL, return labels and one array per measure
+
+        table, time_column, measures and where are SQL snippets from code (never user input),
+        time_column holds naive UTC timestamps, date_from/date_to are local datetimes in tz.
+        """
+        if granularity not in GRANULARITY_LABELS:
+            raise UserError(_("Unsupported time series granularity: %s") % granularity)
+        step = max(int(step), 1)
+        tz_name = self._get_tz_name(tz)
+
+        measure_sql = ",\n                   ".join(
+            f"COALESCE({expression}, 0) AS {name}" for name, expression in measures.items()
+        )
+        extra_where = f"AND ({where})" if where else ""
+
+        # Buckets are generated in local time and mapped back to UTC to range-join the data
+        query = f"""
+            SELECT b.bucket,
+                   {measure_sql}
+            FROM generate_series(
+                date_trunc(%(grain)s, %(date_from)s::timestamp),
+                %(date_to)s::timestamp,
+                %(step)s::interval
+            ) AS b(bucket)
+            LEFT JOIN {table} ON {time_column} >= ((b.bucket AT TIME ZONE %(tz)s) AT TIME ZONE 'UTC')
+                             AND {time_column} < (((b.bucket + %(step)s::interval) AT TIME ZONE %(tz)s) AT TIME ZONE 'UTC')
+                             {extra_where}
+            GROUP BY b.bucket
+            ORDER BY b.bucket
+        """
+        params = {
+            'grain': granularity,
+            'date_from': date_from,
+            'date_to': date_to,
+            'step': f"{step} {granularity}",
+            'tz': tz_name,
+        }
+        # Extra condition uses named %(...)s parameters
+        params.update(where_params or {})
+        self.env.cr.execute(query, params)
+        rows = self.env.cr.fetchall()
+
+        label_format = GRANULARITY_LABELS[granularity]
+        result = {
+            'labels': [row[0].strftime(label_format) for row in rows],
+            'buckets': [row[0].isoformat() for row in rows],
+            'granularity': granularity,
+            'tz': tz_name,
+        }
+        for index, name in enumerate(measures, start=1):
+            result[name] = [row[index] for row in rows]
+        return result
+
+    @api.model
+    def _get_tz_name(self, tz=None):
+        """Get a valid timezone name, defaulting to the user's timezone"""
+        tz_name = tz or self.env.context.get('tz') or self.env.user.tz or 'UTC'
+        return tz_name if tz_name in pytz.all_timezones_set else 'UTC'
+
+    @api.model
+    def get_period_range(self, period, tz=None):
+        """Get local (date_from, date_to, granularity) for a dashboard period"""
+        tz_name = self._get_tz_name(tz)
+        today = datetime.now(pytz.timezone(tz_name)).date()
+
+        if period == 'today':
+            start = datetime.combine(today, time.min)
+            return start, start + timedelta(hours=23), 'hour'
+        elif period == 'week':
+            start = datetime.combine(today - timedelta(days=6), time.min)
+            return start, datetime.combine(today, time.min), 'day'
+        elif period == 'month':
+            start = datetime.combine(today - timedelta(days=29), time.min)
+            return start, datetime.combine(today, time.min), 'day'
+        else:  # year
+            start = datetime.combine(today.replace(month=1, day=1), time.min)
+            return start, start + relativedelta(months=11), 'month'
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_message_stat
+from . import test_report_export
+from . import test_negative_cache
+from . import test_template_sync
+from . import test_template_mapping
+from . import test_dashboard_latency
+from . import test_timeseries
+from . import test_dashboard_aggregates
+from . import test_latency
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class ZnsTestCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.connection = cls.env['zns.connection'].create({
+            'name': 'Test Connection',
+            'api_key': 'test-key',
+        })
+        cls.template = cls.env['zns.template'].create({
+            'name': 'Test Template',
+            'template_id': 'TPL-TEST',
+            'connection_id': cls.connection.id,
+        })
+        cls.partner = cls.env['res.partner'].create({
+            'name': 'Test Contact',
+            'mobile': '0912345678',
+        })
+
+    def _create_message(self, **vals):
+        return self.env['zns.message'].create(dict({
+            'template_id': self.template.id,
+            'connection_id': self.connection.id,
+            'phone': '0912345678',
+        }, **vals))
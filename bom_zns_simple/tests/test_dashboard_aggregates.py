@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestDashboardAggregates(ZnsTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.other_connection = cls.env['zns.connection'].create({'name': 'Other Connection', 'api_key': 'other-key'})
+        cls.messages = cls.env['zns.message']
+        for status, connection in (('sent', cls.connection), ('sent', cls.connection),
+                                   ('failed', cls.connection), ('sent', cls.other_connection)):
+            cls.messages |= cls.env['zns.message'].create({
+                'template_id': cls.template.id,
+                'connection_id': connection.id,
+                'phone': '0912345678',
+                'status': status,
+            })
+
+    def test_aggregates_follow_domain(self):
+        aggregates = self.env['zns.dashboard']._get_message_aggregates([('connection_id', '=', self.connection.id)])
+        self.assertEqual(aggregates['summary'], {'total': 3, 'sent': 2, 'failed': 1, 'draft': 0})
+        self.assertEqual([(stat['connection'], stat['total']) for stat in aggregates['connection_stats']],
+                         [('Test Connection', 3)])
+        self.assertEqual(aggregates['template_stats'][0]['total'], 3)
+
+    def test_aggregates_apply_record_rules(self):
+        user = self.env['res.users'].create({
+            'name': 'ZNS Rule User',
+            'login': 'zns_rule_user',
+            'groups_id': [(6, 0, [self.env.ref('bom_zns_simple.group_zns_user').id])],
+        })
+        self.env['ir.rule'].create({
+            'name': 'Only the other connection',
+            'model_id': self.env.ref('bom_zns_simple.model_zns_message').id,
+            'domain_force': f"[('connection_id', '=', {self.other_connection.id})]",
+            'groups': [(6, 0, [self.env.ref('bom_zns_simple.group_zns_user').id])],
+        })
+        aggregates = self.env['zns.dashboard'].with_user(user)._get_message_aggregates(
+            [('template_id', '=', self.template.id)])
+        self.assertEqual(aggregates['summary']['total'], 1)
@@ -0,0 +1,28 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestDashboardLatency(ZnsTestCommon):
+
+    def test_latency_follows_full_domain(self):
+        """Only histogram cells of messages matching the whole domain are read"""
+        other_connection = self.env['zns.connection'].create({'name': 'Other Connection', 'api_key': 'other-key'})
+        now = fields.Datetime.now()
+        self._create_message(status='sent', sent_date=now)
+        self._create_message(connection_id=other_connection.id, status='sent', sent_date=now)
+        self.env['zns.latency.histogram'].record_samples([
+            ('http', self.connection.id, self.template.id, 100),
+            ('http', other_connection.id, self.template.id, 5000),
+        ])
+
+        stats = self.env['zns.dashboard']._get_latency_stats([('connection_id', '=', self.connection.id)])
+        self.assertEqual([row['connection_id'] for row in stats['by_connection']], [self.connection.id])
+        self.assertEqual(stats['overall']['http']['samples'], 1)
+
+        stats = self.env['zns.dashboard']._get_latency_stats([('status', '=', 'failed')])
+        self.assertFalse(stats['by_connection'])
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from odoo.addons.bom_zns_simple.models.zns_latency import bucket_upper_bound, latency_bucket
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLatency(ZnsTestCommon):
+
+    def test_bucket_bounds(self):
+        self.assertEqual(latency_bucket(0.5), 0)
+        for milliseconds in (7, 250, 12000):
+            bucket = latency_bucket(milliseconds)
+            self.assertLessEqual(milliseconds, bucket_upper_bound(bucket))
+            self.assertGreaterEqual(milliseconds, bucket_upper_bound(bucket - 1))
+
+    def test_percentiles_per_connection(self):
+        Histogram = self.env['zns.latency.histogram']
+        samples = [('http', self.connection.id, self.template.id, ms) for ms in [100] * 90 + [1000] * 10]
+        Histogram.record_samples(samples)
+        # Samples recorded twice in the same hour land in the same buckets
+        Histogram.record_samples([('http', self.connection.id, self.template.id, 5000)])
+
+        rows = Histogram.get_percentiles('http', group_by=('connection_id',))
+        row = next(row for row in rows if row['connection_id'] == self.connection.id)
+        self.assertEqual(row['samples'], 101)
+        self.assertEqual(row['p50'], round(bucket_upper_bound(latency_bucket(100)), 1))
+        self.assertEqual(row['p95'], round(bucket_upper_bound(latency_bucket(1000)), 1))
+        self.assertEqual(row['p99'], round(bucket_upper_bound(latency_bucket(1000)), 1))
+        self.assertEqual(Histogram.search_count([('connection_id', '=', self.connection.id)]), 3)
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.addons.bom_zns_simple.models.zns_message_stat import LIVE_CHANNEL
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestMessageStat(ZnsTestCommon):
+
+    def _rollup_counts(self):
+        Stat = self.env['zns.message.daily.stat']
+        Stat.invalidate_cache()
+        stats = Stat.search([('template_id', '=', self.template.id)])
+        counts = {}
+        for stat in stats:
+            counts[stat.status] = counts.get(stat.status, 0) + stat.message_count
+        return {status: count for status, count in counts.items() if count}
+
+    def test_rollup_follows_messages(self):
+        """Creating, moving and deleting messages keeps the rollup in step"""
+        first = self._create_message()
+        second = self._create_message(partner_id=self.partner.id)
+        self.assertEqual(self._rollup_counts(), {'draft': 2})
+
+        first.write({'status': 'sent'})
+        self.assertEqual(self._rollup_counts(), {'draft': 1, 'sent': 1})
+
+        second.unlink()
+        self.assertEqual(self._rollup_counts(), {'sent': 1})
+
+    def test_rebuild_matches_incremental(self):
+        """The install backfill produces the same buckets as the incremental deltas"""
+        self._create_message()
+        self._create_message(status='failed')
+        incremental = self._rollup_counts()
+
+        self.env['zns.message.daily.stat']._rebuild_rollup()
+        self.assertEqual(self._rollup_counts(), incremental)
+
+    def test_live_counters_pushed_once_per_transaction(self):
+        """Several message changes push a single bus notification on commit"""
+        self.env.cr.precommit.run()
+        first = self._create_message()
+        self._create_message()
+        first.write({'status': 'sent'})
+
+        with patch.object(type(self.env['bus.bus']), '_sendone') as sendone:
+            self.env.cr.precommit.run()
+        sendone.assert_called_once()
+        self.assertEqual(sendone.call_args[0][0], LIVE_CHANNEL)
+
+    def test_report_ranges_match(self):
+        """Detailed and rollup reports share the same half-open local-day range"""
+        wizard = self.env['zns.report.wizard'].with_context(tz='Asia/Ho_Chi_Minh').create({
+            'date_from': date(2024, 3, 1),
+            'date_to': date(2024, 3, 1),
+        })
+        start, end = wizard._get_date_range()
+        # Local midnight in UTC+7 is 17:00 UTC the previous day, the last day is included
+        self.assertEqual(start, datetime(2024, 2, 29, 17, 0))
+        self.assertEqual(end, datetime(2024, 3, 1, 17, 0))
+
+        rollup_domain = wizard._get_rollup_domain()
+        self.assertIn(('period_start', '>=', start), rollup_domain)
+        self.assertIn(('period_start', '<', end), rollup_domain)
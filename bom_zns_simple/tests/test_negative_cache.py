@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from odoo import fields
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestNegativeCache(ZnsTestCommon):
+
+    def test_cache_key_matches_contact_phone(self):
+        """0xxx, 84xxx and +84xxx spellings of a number share one cache entry"""
+        Cache = self.env['zns.negative.cache']
+        self.assertEqual(Cache.record_rejection('0912 345 678', '-118', 'Not a Zalo user'), 'not_on_zalo')
+        entry = Cache.check_phone('+84912345678')
+        self.assertTrue(entry)
+        self.assertEqual(entry.phone, self.env['res.partner']._normalize_zns_phone('84912345678'))
+
+    def test_cached_phone_raises(self):
+        """A cache hit fails the send loudly without calling BOM"""
+        self.env['zns.negative.cache'].record_rejection(self.partner.mobile, '-118', 'Not a Zalo user')
+        message = self._create_message()
+
+        with patch('odoo.addons.bom_zns_simple.models.zns_message.requests.post') as post, \
+                self.assertRaises(UserError):
+            message.send_zns_message()
+        post.assert_not_called()
+        self.env['zns.negative.cache'].invalidate_cache()
+        self.assertEqual(self.env['zns.negative.cache'].search([]).hit_count, 1)
+
+    def test_rejection_cached_before_raising(self):
+        """A BOM rejection is cached on its own cursor and the send still raises"""
+        message = self._create_message()
+        self.connection.write({
+            'access_token': 'test-token',
+            'token_expires_at': fields.Datetime.now() + timedelta(days=1),
+        })
+        response = MagicMock(status_code=200, text='')
+        response.json.return_value = {'error': -118, 'message': 'Not a Zalo user'}
+
+        with patch('odoo.addons.bom_zns_simple.models.zns_message.requests.post', return_value=response), \
+                self.assertRaises(UserError):
+            message.send_zns_message()
+        self.assertTrue(self.env['zns.negative.cache'].check_phone(message.phone))
+
+    def test_lookup_counters_are_stored(self):
+        """Hits and misses are written to the database when the transaction commits"""
+        Stat = self.env['zns.negative.cache.stat']
+        hits_before, misses_before = Stat.get_lookup_totals()
+        self.env['zns.negative.cache'].record_rejection('0912000009', '-118', 'Not a Zalo user')
+        self.env['zns.negative.cache'].check_phone('0912000009')
+        self.env['zns.negative.cache'].check_phone('0912000008')
+        self.env.cr.precommit.run()
+
+        self.assertEqual(Stat.get_lookup_totals(), (hits_before + 1, misses_before + 1))
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import csv
+import io
+
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestReportExport(ZnsTestCommon):
+
+    def test_csv_export_streams_every_row(self):
+        """The CSV export pages through all matching messages into one attachment"""
+        messages = self.env['zns.message']
+        for index in range(3):
+            messages |= self._create_message(phone=f'091234567{index}')
+
+        export = self.env['zns.report.export'].create({
+            'name': 'Test Export',
+            'domain': repr([('id', 'in', messages.ids)]),
+            'export_format': 'csv',
+        })
+        export.run_export()
+
+        self.assertEqual(export.state, 'done', export.error_message)
+        self.assertEqual(export.row_count, 3)
+        content = base64.b64decode(export.attachment_id.datas).decode('utf-8-sig')
+        rows = list(csv.reader(io.StringIO(content)))
+        self.assertEqual(len(rows), 4)
+        self.assertEqual([int(row[0]) for row in rows[1:]], sorted(messages.ids))
+        self.assertEqual(export.attachment_id.file_size, len(base64.b64decode(export.attachment_id.datas)))
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestTemplateMapping(ZnsTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.big_template = cls.env['zns.template'].create({
+            'name': 'Big Order Template',
+            'template_id': 'TPL-BIG',
+            'connection_id': cls.connection.id,
+        })
+        cls.config = cls.env['zns.configuration'].create({
+            'name': 'Test Configuration',
+            'use_template_mappings': True,
+            'fallback_to_default': True,
+            'default_so_template_id': cls.template.id,
+        })
+        cls.env['zns.template.mapping'].search([('model', '=', 'sale.order')]).write({'active': False})
+        cls.env['zns.template.mapping'].create({
+            'name': 'Big Orders',
+            'model': 'sale.order',
+            'template_id': cls.big_template.id,
+            'amount_min': 1000,
+        })
+        cls.product = cls.env['product.product'].create({'name': 'Test Product', 'taxes_id': [(5, 0, 0)]})
+        cls.other_partner = cls.env['res.partner'].create({'name': 'Other Contact', 'mobile': '0912345679'})
+
+    def _create_order(self, partner, price):
+        return self.env['sale.order'].create({
+            'partner_id': partner.id,
+            'order_line': [(0, 0, {'product_id': self.product.id, 'product_uom_qty': 1, 'price_unit': price})],
+        })
+
+    def test_documents_grouped_by_condition_outcome(self):
+        """Documents in the same amount band share one evaluation whatever the exact amount or partner"""
+        small = self._create_order(self.partner, 10) | self._create_order(self.other_partner, 20)
+        big = self._create_order(self.partner, 1500) | self._create_order(self.other_partner, 2500)
+        orders = small | big
+
+        Mapping = type(self.env['zns.template.mapping'])
+        original = Mapping._matches_conditions
+        with patch.object(Mapping, '_matches_conditions', autospec=True, side_effect=original) as matches:
+            results = self.config.get_templates_for_documents('sale.order', orders)
+
+        self.assertEqual(matches.call_count, 2)
+        for order in small:
+            self.assertEqual(results[order.id], self.template)
+        for order in big:
+            self.assertEqual(results[order.id], self.big_template)
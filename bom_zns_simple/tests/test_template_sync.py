@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+from unittest.mock import MagicMock, patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestTemplateSync(ZnsTestCommon):
+
+    def setUp(self):
+        super().setUp()
+        self.connection.write({
+            'access_token': 'test-token',
+            'token_expires_at': fields.Datetime.now() + timedelta(days=1),
+        })
+        self.bom_templates = [
+            {'id': 'BOM-1', 'name': 'Order', 'type': 'Transaction', 'status': 'ENABLE'},
+            {'id': 'BOM-2', 'name': 'Promo', 'type': 'Promotion', 'status': 'ENABLE'},
+        ]
+        self.param_calls = []
+
+    def _fake_post(self, url, headers=None, json=None, timeout=None):
+        response = MagicMock(status_code=200)
+        if url.endswith('/get-list-all-template'):
+            response.json.return_value = {'error': 0, 'data': self.bom_templates}
+        else:
+            self.param_calls.append(json['template_id'])
+            response.json.return_value = {'error': 0, 'data': [{'name': 'customer_name', 'type': 'string'}]}
+        return response
+
+    def _sync(self):
+        self.param_calls = []
+        with patch('odoo.addons.bom_zns_simple.models.zns_template.requests.post', self._fake_post):
+            return self.env['zns.template']._sync_connection_incremental(self.connection)
+
+    def test_unchanged_templates_are_not_fetched(self):
+        """Parameters are fetched only for new templates and list entries that changed"""
+        first = self._sync()
+        self.assertEqual(sorted(self.param_calls), ['BOM-1', 'BOM-2'])
+        self.assertEqual(first['created'], 2)
+        promo = self.env['zns.template'].search([('template_id', '=', 'BOM-2')])
+        self.assertEqual(promo.template_type, 'promotion')
+
+        second = self._sync()
+        self.assertEqual(self.param_calls, [])
+        self.assertEqual(second['fetched'], 0)
+
+        self.bom_templates[1]['status'] = 'DISABLE'
+        third = self._sync()
+        self.assertEqual(self.param_calls, ['BOM-2'])
+        self.assertEqual(third['changed'], 1)
+
+    def test_upsert_parameters_keeps_existing_rows(self):
+        """Existing parameters are updated in place, new ones created and stale ones removed"""
+        Parameter = self.env['zns.template.parameter']
+        kept = Parameter.create({'template_id': self.template.id, 'name': 'customer_name', 'title': 'Old Title'})
+        stale = Parameter.create({'template_id': self.template.id, 'name': 'old_param', 'title': 'Old Param'})
+
+        synced = self.template._upsert_parameters([
+            {'name': 'customer_name', 'title': 'Customer Name', 'type': 'string', 'require': True},
+            {'name': 'order_code', 'type': 'string'},
+            {'name': 'order_code', 'type': 'number'},
+        ])
+        self.assertEqual(synced, ['customer_name', 'order_code'])
+        self.assertTrue(kept.exists())
+        self.assertEqual((kept.title, kept.required), ('Customer Name', True))
+        self.assertFalse(stale.exists())
+        self.assertEqual(sorted(self.template.parameter_ids.mapped('name')), ['customer_name', 'order_code'])
+
+    def test_concurrent_fetch_reports_errors_per_template(self):
+        def fake_post(url, headers=None, json=None, timeout=None):
+            if json['template_id'] == 'BOM-BAD':
+                return MagicMock(status_code=500, text='boom')
+            response = MagicMock(status_code=200)
+            response.json.return_value = {'error': 0, 'data': [{'name': json['template_id'].lower()}]}
+            return response
+
+        with patch('odoo.addons.bom_zns_simple.models.zns_template.requests.post', fake_post):
+            results = self.env['zns.template']._fetch_params_concurrently(
+                self.connection, 'test-token', ['BOM-1', 'BOM-BAD', 'BOM-2'])
+        self.assertEqual(results['BOM-1'], ([{'name': 'bom-1'}], None))
+        self.assertEqual(results['BOM-2'], ([{'name': 'bom-2'}], None))
+        self.assertIsNone(results['BOM-BAD'][0])
+        self.assertIn('HTTP 500', results['BOM-BAD'][1])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+from datetime import datetime
+
+from odoo.tests import tagged
+
+from .common import ZnsTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestTimeseries(ZnsTestCommon):
+
+    def _series(self, date_from, date_to, granularity='day'):
+        return self.env['zns.timeseries'].get_series(
+            'zns_message m', 'm.create_date', {'total': "COUNT(m.id)"},
+            date_from, date_to, granularity, tz='Asia/Ho_Chi_Minh',
+            where="m.template_id = %(template_id)s", where_params={'template_id': self.template.id},
+        )
+
+    def test_buckets_are_gap_filled_in_local_time(self):
+        message = self._create_message()
+        self.env.cr.execute("UPDATE zns_message SET create_date = %s WHERE id = %s",
+                            (datetime(2026, 3, 1, 18, 0), message.id))
+
+        # 18:00 UTC on March 1st is 01:00 on March 2nd in Ho Chi Minh City
+        series = self._series(datetime(2026, 3, 1), datetime(2026, 3, 3))
+        self.assertEqual(series['labels'], ['03/01', '03/02', '03/03'])
+        self.assertEqual(series['total'], [0, 1, 0])
+        self.assertEqual(series['tz'], 'Asia/Ho_Chi_Minh')
+
+    def test_period_range(self):
+        Timeseries = self.env['zns.timeseries']
+        date_from, date_to, granularity = Timeseries.get_period_range('month', tz='UTC')
+        self.assertEqual(granularity, 'day')
+        self.assertEqual((date_to - date_from).days, 29)
+        self.assertEqual(Timeseries.get_period_range('year', tz='UTC')[2], 'month')
+        self.assertEqual(Timeseries._get_tz_name('Not/AZone'), 'UTC')
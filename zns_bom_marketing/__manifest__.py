@@ -8,7 +8,7 @@
 ZNS BOM Marketing Module
 ========================
 
-Advanced marketing automation system that optionally integrates with bom_zns_simple module to provide:
+Advanced marketing automation system built on the bom_zns_simple module to provide:
 
 * Contact List Management (Static, Dynamic, Auto-Birthday)
 * Campaign Management (Promotion, Birthday, Notification, Recurring)
@@ -30,9 +30,7 @@ Features:
 
 Note:
 -----
-* This module can be installed independently
-* For full ZNS functionality, install bom_zns_simple module
-* Templates and connections will be available once BOM ZNS Simple is installed
+* Requires bom_zns_simple, which provides connections, templates and the contact ZNS phone normalization
     """,
     'author': 'Your Company',
     'website': 'https://www.yourcompany.com',
@@ -40,7 +38,8 @@ Note:
         'base',
         'contacts',
         'mail',
-        # 'bom_zns_simple'  # Optional dependency - commented out for standalone installation
+        'bus',
+        'bom_zns_simple',
     ],
     'external_dependencies': {
         'python': [],
@@ -63,6 +62,11 @@ Note:
         'views/zns_bom_marketing_dashboard_views.xml',
         'views/zns_bom_marketing_menus.xml',
     ],
+    'assets': {
+        'web.assets_backend': [
+            'zns_bom_marketing/static/src/js/zns_bom_marketing_live.js',
+        ],
+    },
     'demo': [],
     'images': ['static/description/icon.png'],
     'license': 'LGPL-3',
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 
+from . import res_partner
 from . import zns_bom_marketing_contact_list
 from . import zns_bom_marketing_campaign
 from . import zns_bom_marketing_message
 from . import zns_bom_marketing_opt_out
+from . import zns_bom_marketing_live
 from . import zns_bom_marketing_dashboard
 from . import zns_bom_marketing_scheduler
-from . import zns_bom_marketing_analytics
\ No newline at end of file
+from . import zns_bom_marketing_analytics
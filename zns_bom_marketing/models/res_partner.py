@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+
+import calendar
+import logging
+from datetime import timedelta
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+
+class ResPartner(models.Model):
+    _inherit = 'res.partner'
+
+    # ZNS Send Eligibility (maintained on phone/mobile change)
+    zns_phone_normalized = fields.Char('ZNS Phone', compute='_compute_zns_phone', store=True, index=True,
+                                       help='Mobile or phone normalized to +84 format, used for ZNS sending')
+    zns_phone_state = fields.Selection([
+        ('valid', 'Valid'),
+        ('invalid', 'Invalid'),
+        ('not_on_zalo', 'Not on Zalo')
+    ], string='ZNS Phone Status', compute='_compute_zns_phone', store=True, index=True,
+       help='Whether this contact can receive ZNS messages')
+    zns_not_on_zalo_phone = fields.Char('Phone Not on Zalo', readonly=True, copy=False,
+                                        help='Normalized number BOM rejected as not registered on Zalo')
+
+    birthday = fields.Date('Birthday')
+
+    # Birthday month/day as MMDD (e.g. 1231), indexed for birthday range lookups
+    zns_birthday_key = fields.Integer('Birthday Key', compute='_compute_zns_birthday_key', store=True, index=True)
+
+    @api.depends('mobile', 'phone', 'zns_not_on_zalo_phone')
+    def _compute_zns_phone(self):
+        for partner in self:
+            # Prefer mobile, fall back to phone if mobile cannot be used (normalizer from bom_zns_simple)
+            normalized = self._normalize_zns_phone(partner.mobile) or self._normalize_zns_phone(partner.phone)
+            partner.zns_phone_normalized = normalized
+            if not normalized:
+                partner.zns_phone_state = 'invalid'
+            elif normalized == partner.zns_not_on_zalo_phone:
+                # Rejected number stays flagged until the contact gets another one
+                partner.zns_phone_state = 'not_on_zalo'
+            else:
+                partner.zns_phone_state = 'valid'
+
+    @api.depends('birthday')
+    def _compute_zns_birthday_key(self):
+        for partner in self:
+            birthday = partner.birthday
+            partner.zns_birthday_key = birthday.month * 100 + birthday.day if birthday else 0
+
+    @api.model
+    def _get_birthday_domain(self, date_from, days=1):
+        """Get domain of partners with a birthday in [date_from, date_from + days), wrapping over year end"""
+        days = min(max(days, 1), 366)
+        date_to = date_from + timedelta(days=days - 1)
+        start = date_from.month * 100 + date_from.day
+        end = date_to.month * 100 + date_to.day
+        # Feb 29 birthdays are celebrated on Feb 28 in non-leap years
+        if date_to.month == 2 and date_to.day == 28 and not calendar.isleap(date_to.year):
+            end = 229
+        if days >= 366 or (days > 1 and start == end):
+            return [('zns_birthday_key', '>', 0)]
+        if start <= end:
+            return [('zns_birthday_key', '>=', start), ('zns_birthday_key', '<=', end)]
+        return ['|', ('zns_birthday_key', '>=', start), '&', ('zns_birthday_key', '>', 0), ('zns_birthday_key', '<=', end)]
+
+    @api.model
+    def _get_birthday_month_domain(self, month):
+        """Get domain of partners with a birthday in month (1-12)"""
+        return [('zns_birthday_key', '>=', month * 100 + 1), ('zns_birthday_key', '<=', month * 100 + 31)]
+
+    def _mark_zns_not_on_zalo(self):
+        """Flag contacts whose number was rejected by BOM as not reachable on Zalo"""
+        partners = self.filtered(lambda p: p.zns_phone_state == 'valid')
+        for partner in partners:
+            partner.zns_not_on_zalo_phone = partner.zns_phone_normalized
+        if partners:
+            _logger.info(f"Marked {len(partners)} contacts as not on Zalo")
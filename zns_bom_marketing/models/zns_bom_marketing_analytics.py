@@ -61,7 +61,7 @@ class ZnsBomMarketingAnalytics(models.Model):
     # Template Information
     template_id = fields.Many2one('bom.zns.template', string='Template')
     template_name = fields.Char('Template Name')
-    connection_id = fields.Many2one('bom.zns.connection', string='Connection')
+    connection_id = fields.Many2one('zns.connection', string='Connection')
     
     def init(self):
         """Initialize the view - skip completely during installation"""
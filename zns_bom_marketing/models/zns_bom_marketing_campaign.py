@@ -2,12 +2,32 @@
 
 import json
 import logging
+import threading
+from collections import Counter, defaultdict
+from time import perf_counter
 from datetime import datetime, timedelta, time
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
+from odoo.tools import split_every
+from .zns_bom_marketing_message import QUEUE_LANES
 
 _logger = logging.getLogger(__name__)
 
+# Campaign counters maintained from message deltas
+CAMPAIGN_COUNTER_FIELDS = ['messages_total', 'messages_queued', 'messages_sent', 'messages_delivered',
+                           'messages_failed', 'total_cost']
+CAMPAIGN_RATE_FIELDS = ['progress_percentage', 'delivery_rate', 'failure_rate']
+
+# First key of the advisory lock held while fanning out a campaign (second key is the campaign id)
+FANOUT_LOCK_NAMESPACE = 0x5A4E5346
+
+# Winner order among recipients sharing a phone, per dedup policy
+PHONE_DEDUP_ORDER = {
+    'oldest': "partner.id",
+    'person': "partner.is_company, partner.id",
+    'recent': "partner.write_date DESC NULLS LAST, partner.id",
+}
+
 
 class ZnsBomMarketingCampaign(models.Model):
     _name = 'zns.bom.marketing.campaign'
@@ -45,8 +65,8 @@ class ZnsBomMarketingCampaign(models.Model):
     # BOM ZNS Integration
     bom_zns_template_id = fields.Many2one('bom.zns.template', string='ZNS Template',
                                          help='Select ZNS template from BOM ZNS Simple module')
-    bom_zns_connection_id = fields.Many2one('bom.zns.connection', string='ZNS Connection', 
-                                           help='ZNS Connection used for this campaign')
+    bom_zns_connection_id = fields.Many2one('zns.connection', string='ZNS Connection', 
+                                           help='ZNS Connection used for this campaign (quota and reserve apply to it)')
     
     # Target Audience
     contact_list_ids = fields.Many2many(
@@ -115,24 +135,72 @@ class ZnsBomMarketingCampaign(models.Model):
     enable_retry = fields.Boolean('Enable Retry', default=True)
     max_retry_attempts = fields.Integer('Max Retry Attempts', default=3)
     max_send_per_hour = fields.Integer('Max Send per Hour', default=1000)
+    phone_dedup_policy = fields.Selection([
+        ('none', 'No Deduplication'),
+        ('oldest', 'Oldest Contact Wins'),
+        ('person', 'Individual over Company'),
+        ('recent', 'Most Recently Updated Wins')
+    ], string='Duplicate Phones', default='none', required=True,
+       help='Which contact gets the message when several recipients share the same phone number')
+    queue_lane = fields.Selection(QUEUE_LANES, string='Dispatch Lane', compute='_compute_queue_lane',
+                                  store=True, readonly=False,
+                                  help='Priority messages are dispatched ahead of bulk ones on the same connection')
     
     # Messages
     message_ids = fields.One2many('zns.bom.marketing.message', 'campaign_id', string='Messages')
     
-    # Statistics (computed fields)
+    # Fan-out checkpoint (persisted after every chunk)
+    fanout_state = fields.Selection([
+        ('idle', 'Not Started'),
+        ('running', 'In Progress'),
+        ('done', 'Done')
+    ], string='Fan-out Status', default='idle', readonly=True, copy=False)
+    fanout_last_contact_id = fields.Integer('Last Contact Processed', readonly=True, copy=False)
+    fanout_last_phone = fields.Char('Last Phone Processed', readonly=True, copy=False)
+    fanout_messages_created = fields.Integer('Messages Created', readonly=True, copy=False)
+    fanout_checkpoint_date = fields.Datetime('Last Checkpoint', readonly=True, copy=False)
+    fanout_duplicates_skipped = fields.Integer('Duplicate Phones Skipped', readonly=True, copy=False)
+    fanout_cost_saved = fields.Float('Cost Saved by Deduplication', readonly=True, copy=False)
+    
+    # Statistics (maintained by message deltas, see _add_counter_deltas)
     total_recipients = fields.Integer('Total Recipients', compute='_compute_recipients', store=True)
-    messages_total = fields.Integer('Total Messages', compute='_compute_progress', store=True)
-    messages_sent = fields.Integer('Messages Sent', compute='_compute_progress', store=True)
-    messages_delivered = fields.Integer('Messages Delivered', compute='_compute_progress', store=True)
-    messages_failed = fields.Integer('Messages Failed', compute='_compute_progress', store=True)
-    messages_queued = fields.Integer('Messages Queued', compute='_compute_progress', store=True)
+    messages_total = fields.Integer('Total Messages', default=0, readonly=True, copy=False)
+    messages_sent = fields.Integer('Messages Sent', default=0, readonly=True, copy=False)
+    messages_delivered = fields.Integer('Messages Delivered', default=0, readonly=True, copy=False)
+    messages_failed = fields.Integer('Messages Failed', default=0, readonly=True, copy=False)
+    messages_queued = fields.Integer('Messages Queued', default=0, readonly=True, copy=False)
     
-    progress_percentage = fields.Float('Progress %', compute='_compute_progress', store=True)
-    delivery_rate = fields.Float('Delivery Rate %', compute='_compute_analytics', store=True)
-    failure_rate = fields.Float('Failure Rate %', compute='_compute_analytics', store=True)
+    progress_percentage = fields.Float('Progress %', default=0.0, readonly=True, copy=False)
+    delivery_rate = fields.Float('Delivery Rate %', default=0.0, readonly=True, copy=False)
+    failure_rate = fields.Float('Failure Rate %', default=0.0, readonly=True, copy=False)
     
     # Cost Tracking
-    total_cost = fields.Float('Total Cost', compute='_compute_analytics', store=True)
+    total_cost = fields.Float('Total Cost', default=0.0, readonly=True, copy=False)
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        campaigns = super().create(vals_list)
+        self.env['zns.bom.marketing.live.counter'].add_deltas({
+            'active_campaigns': len(campaigns.filtered(lambda c: c.status == 'running'))
+        })
+        return campaigns
+    
+    def write(self, vals):
+        if 'status' not in vals:
+            return super().write(vals)
+        
+        was_running = len(self.filtered(lambda c: c.status == 'running'))
+        result = super().write(vals)
+        self.env['zns.bom.marketing.live.counter'].add_deltas({
+            'active_campaigns': (len(self) if vals['status'] == 'running' else 0) - was_running
+        })
+        return result
+    
+    def unlink(self):
+        was_running = len(self.filtered(lambda c: c.status == 'running'))
+        result = super().unlink()
+        self.env['zns.bom.marketing.live.counter'].add_deltas({'active_campaigns': -was_running})
+        return result
     
     @api.onchange('bom_zns_template_id')
     def _onchange_bom_zns_template_id(self):
@@ -154,56 +222,164 @@ class ZnsBomMarketingCampaign(models.Model):
         else:
             self.bom_zns_connection_id = False
     
-    @api.depends('contact_list_ids', 'contact_list_ids.contact_ids', 'excluded_contact_ids')
+    @api.depends('campaign_type')
+    def _compute_queue_lane(self):
+        for record in self:
+            # Time-sensitive campaigns go ahead of bulk promotions
+            record.queue_lane = 'priority' if record.campaign_type in ('notification', 'birthday') else 'bulk'
+    
+    @api.depends('campaign_type', 'contact_list_ids', 'contact_list_ids.contact_ids', 'excluded_contact_ids')
     def _compute_recipients(self):
+        list_counts, birthday_counts = self._get_recipient_counts()
+        
         for record in self:
-            if record.campaign_type == 'birthday':
+            if not isinstance(record.id, int):
+                # Unsaved campaign (onchange) - count from the selection in the form
+                if record.campaign_type == 'birthday':
+                    record.total_recipients = self.env['res.partner'].search_count([
+                        ('birthday', '!=', False), ('id', 'not in', record.excluded_contact_ids.ids)
+                    ])
+                else:
+                    record.total_recipients = len(record.contact_list_ids.contact_ids - record.excluded_contact_ids)
+            elif record.campaign_type == 'birthday':
                 # For birthday campaigns, count all contacts with birthdays
-                all_contacts = self.env['res.partner'].search([('birthday', '!=', False)])
-                excluded = record.excluded_contact_ids
-                record.total_recipients = len(all_contacts - excluded)
+                record.total_recipients = birthday_counts.get(record.id, 0)
             else:
                 # Regular campaigns use contact lists
-                all_contacts = self.env['res.partner']
-                for contact_list in record.contact_list_ids:
-                    all_contacts |= contact_list.contact_ids
-                
-                excluded = record.excluded_contact_ids
-                record.total_recipients = len(all_contacts - excluded)
-    
-    @api.depends('message_ids', 'message_ids.status')
-    def _compute_progress(self):
-        for record in self:
-            messages = record.message_ids
-            record.messages_total = len(messages)
-            record.messages_sent = len(messages.filtered(lambda m: m.status in ['sent', 'delivered']))
-            record.messages_delivered = len(messages.filtered(lambda m: m.status == 'delivered'))
-            record.messages_failed = len(messages.filtered(lambda m: m.status == 'failed'))
-            record.messages_queued = len(messages.filtered(lambda m: m.status == 'queued'))
-            
-            if record.messages_total > 0:
-                completed = record.messages_sent + record.messages_failed
-                record.progress_percentage = (completed / record.messages_total) * 100
-            else:
-                record.progress_percentage = 0.0
-    
-    @api.depends('message_ids', 'message_ids.status', 'message_ids.message_cost')
-    def _compute_analytics(self):
-        for record in self:
-            messages = record.message_ids
-            total = len(messages)
-            
-            if total > 0:
-                delivered = len(messages.filtered(lambda m: m.status == 'delivered'))
-                failed = len(messages.filtered(lambda m: m.status == 'failed'))
-                
-                record.delivery_rate = (delivered / total) * 100
-                record.failure_rate = (failed / total) * 100
-                record.total_cost = sum(messages.mapped('message_cost'))
-            else:
-                record.delivery_rate = 0.0
-                record.failure_rate = 0.0
-                record.total_cost = 0.0
+                record.total_recipients = list_counts.get(record.id, 0)
+    
+    def _get_recipient_counts(self):
+        """Get distinct list recipients and birthday recipients per campaign, minus exclusions"""
+        campaign_ids = tuple(rid for rid in self.ids if isinstance(rid, int))
+        if not campaign_ids:
+            return {}, {}
+        
+        self.env['res.partner'].flush(['active'])
+        self.env['zns.bom.marketing.contact.list'].flush(['contact_ids'])
+        self.flush(['contact_list_ids', 'excluded_contact_ids'])
+        
+        self.env.cr.execute("""
+            SELECT campaign_list.campaign_id, COUNT(DISTINCT rel.contact_id)
+            FROM zns_bom_marketing_campaign_list_rel campaign_list
+            JOIN zns_bom_marketing_list_contact_rel rel ON rel.list_id = campaign_list.list_id
+            JOIN res_partner partner ON partner.id = rel.contact_id AND partner.active
+            WHERE campaign_list.campaign_id IN %s
+              AND NOT EXISTS (
+                  SELECT 1 FROM zns_bom_marketing_campaign_excluded_rel excluded
+                  WHERE excluded.campaign_id = campaign_list.campaign_id AND excluded.contact_id = rel.contact_id
+              )
+            GROUP BY campaign_list.campaign_id
+        """, (campaign_ids,))
+        list_counts = dict(self.env.cr.fetchall())
+        
+        birthday_counts = {}
+        birthday_ids = tuple(record.id for record in self if record.campaign_type == 'birthday' and isinstance(record.id, int))
+        if birthday_ids:
+            self.env['res.partner'].flush(['birthday'])
+            self.env.cr.execute("""
+                SELECT COUNT(*) FROM res_partner WHERE birthday IS NOT NULL AND active
+            """)
+            birthday_total = self.env.cr.fetchone()[0]
+            self.env.cr.execute("""
+                SELECT excluded.campaign_id, COUNT(*)
+                FROM zns_bom_marketing_campaign_excluded_rel excluded
+                JOIN res_partner partner ON partner.id = excluded.contact_id
+                WHERE excluded.campaign_id IN %s AND partner.birthday IS NOT NULL AND partner.active
+                GROUP BY excluded.campaign_id
+            """, (birthday_ids,))
+            excluded_counts = dict(self.env.cr.fetchall())
+            birthday_counts = {campaign_id: birthday_total - excluded_counts.get(campaign_id, 0)
+                               for campaign_id in birthday_ids}
+        
+        return list_counts, birthday_counts
+    
+    @api.model
+    def _add_counter_deltas(self, deltas):
+        """Queue {campaign_id: {counter: delta}}, applied once when the transaction commits
+        
+        Updating the campaign row on every message write would hold its lock until commit,
+        including across BOM calls, and serialize every worker sending for the campaign.
+        """
+        data = self.env.cr.precommit.data
+        pending = data.get('zns_bom_marketing.campaign_deltas')
+        if pending is None:
+            pending = data['zns_bom_marketing.campaign_deltas'] = defaultdict(Counter)
+            self.env.cr.precommit.add(self._flush_counter_deltas)
+        for campaign_id, values in deltas.items():
+            if campaign_id:
+                pending[campaign_id].update(values)
+    
+    def _flush_counter_deltas(self):
+        """Apply queued counter deltas in one statement"""
+        pending = self.env.cr.precommit.data.pop('zns_bom_marketing.campaign_deltas', None)
+        if pending:
+            self._apply_counter_deltas(pending)
+    
+    @api.model
+    def _apply_counter_deltas(self, deltas):
+        """Add {campaign_id: {counter: delta}} to the stored counters and refresh the rates"""
+        rows = [(campaign_id,) + tuple(values.get(field, 0) for field in CAMPAIGN_COUNTER_FIELDS)
+                for campaign_id, values in deltas.items()
+                if campaign_id and any(values.get(field) for field in CAMPAIGN_COUNTER_FIELDS)]
+        if not rows:
+            return
+        
+        self.flush(CAMPAIGN_COUNTER_FIELDS + CAMPAIGN_RATE_FIELDS)
+        set_sql = ", ".join(f"{field} = COALESCE(c.{field}, 0) + d.{field}" for field in CAMPAIGN_COUNTER_FIELDS)
+        values_sql = ", ".join(["(%s)" % ", ".join(["%s"] * len(rows[0]))] * len(rows))
+        self.env.cr.execute(f"""
+            UPDATE zns_bom_marketing_campaign c
+            SET {set_sql}
+            FROM (VALUES {values_sql}) AS d(id, {", ".join(CAMPAIGN_COUNTER_FIELDS)})
+            WHERE c.id = d.id
+        """, [item for row in rows for item in row])
+        
+        campaign_ids = tuple(row[0] for row in rows)
+        self.env.cr.execute("""
+            UPDATE zns_bom_marketing_campaign
+            SET progress_percentage = CASE WHEN messages_total > 0
+                    THEN (messages_sent + messages_failed) * 100.0 / messages_total ELSE 0 END,
+                delivery_rate = CASE WHEN messages_total > 0 THEN messages_delivered * 100.0 / messages_total ELSE 0 END,
+                failure_rate = CASE WHEN messages_total > 0 THEN messages_failed * 100.0 / messages_total ELSE 0 END
+            WHERE id IN %s
+        """, (campaign_ids,))
+        self.invalidate_cache(CAMPAIGN_COUNTER_FIELDS + CAMPAIGN_RATE_FIELDS, list(campaign_ids))
+    
+    @api.model
+    def _reconcile_counters(self):
+        """Check stored counters against a grouped count of messages and correct any drift"""
+        self._flush_counter_deltas()
+        self.env['zns.bom.marketing.message'].flush(['campaign_id', 'status', 'message_cost'])
+        self.flush(CAMPAIGN_COUNTER_FIELDS)
+        self.env.cr.execute("""
+            SELECT c.id,
+                   COUNT(m.id),
+                   COUNT(m.id) FILTER (WHERE m.status = 'queued'),
+                   COUNT(m.id) FILTER (WHERE m.status IN ('sent', 'delivered')),
+                   COUNT(m.id) FILTER (WHERE m.status = 'delivered'),
+                   COUNT(m.id) FILTER (WHERE m.status = 'failed'),
+                   COALESCE(SUM(m.message_cost), 0),
+                   COALESCE(c.messages_total, 0), COALESCE(c.messages_queued, 0), COALESCE(c.messages_sent, 0),
+                   COALESCE(c.messages_delivered, 0), COALESCE(c.messages_failed, 0), COALESCE(c.total_cost, 0)
+            FROM zns_bom_marketing_campaign c
+            LEFT JOIN zns_bom_marketing_message m ON m.campaign_id = c.id
+            GROUP BY c.id
+        """)
+        
+        deltas = {}
+        field_count = len(CAMPAIGN_COUNTER_FIELDS)
+        for row in self.env.cr.fetchall():
+            actual, stored = row[1:1 + field_count], row[1 + field_count:]
+            drift = {field: actual_value - stored_value
+                     for field, actual_value, stored_value in zip(CAMPAIGN_COUNTER_FIELDS, actual, stored)
+                     if abs(actual_value - stored_value) > 0.0001}
+            if drift:
+                deltas[row[0]] = drift
+        
+        if deltas:
+            _logger.warning(f"Campaign counters drifted on {len(deltas)} campaigns, correcting: {deltas}")
+            self._apply_counter_deltas(deltas)
+        return len(deltas)
     
     def _get_timezone_list(self):
         """Get list of timezones"""
@@ -301,121 +477,275 @@ class ZnsBomMarketingCampaign(models.Model):
             'context': {'default_campaign_id': self.id}
         }
     
-    def _execute_campaign(self):
-        """Execute the campaign"""
+    def _execute_campaign(self, auto_commit=False):
+        """Execute the campaign: fan out queued messages in checkpointed chunks
+        
+        With auto_commit (cron runs only) each chunk is committed, so a large campaign is not
+        one giant transaction; an interactive start stays in the request's transaction.
+        """
         if self.campaign_type == 'birthday':
             # Birthday campaigns are handled by scheduler
             return
         
-        # Get target contacts
-        target_contacts = self._get_target_contacts()
+        auto_commit = auto_commit and not getattr(threading.current_thread(), 'testing', False)
+        chunk_size = self._get_fanout_chunk_size()
+        Message = self.env['zns.bom.marketing.message']
         
-        # Create messages for each contact
-        for contact in target_contacts:
-            self._create_campaign_message(contact)
-        
-        # Update progress
-        self._compute_progress()
-        
-        if self.messages_total > 0:
-            _logger.info(f"Campaign '{self.name}' executed: {self.messages_total} messages created")
-    
-    def _get_target_contacts(self):
-        """Get target contacts for campaign"""
-        target_contacts = self.env['res.partner']
-        
-        # Collect contacts from lists
-        for contact_list in self.contact_list_ids:
-            target_contacts |= contact_list.contact_ids
-        
-        # Remove excluded contacts
-        target_contacts -= self.excluded_contact_ids
-        
-        # Filter valid contacts
-        valid_contacts = self.env['res.partner']
-        for contact in target_contacts:
-            if self._is_valid_contact(contact):
-                valid_contacts |= contact
-        
-        return valid_contacts
-    
-    def _is_valid_contact(self, contact):
-        """Check if contact is valid for sending"""
-        # Check phone number
-        phone = contact.mobile or contact.phone
-        if not phone:
-            return False
+        # Another worker is creating a chunk of this campaign right now
+        checkpoint = self._lock_fanout_checkpoint()
+        if checkpoint is None:
+            _logger.info(f"⏭️ Campaign '{self.name}' fan-out is held by another worker, skipping")
+            return
         
-        # Check opt-out status
+        # Start a new run unless resuming an interrupted one
+        resuming = self.fanout_state == 'running'
+        if not resuming:
+            self.write({
+                'fanout_state': 'running',
+                'fanout_last_contact_id': 0,
+                'fanout_last_phone': False,
+                'fanout_messages_created': 0,
+                'fanout_duplicates_skipped': 0,
+                'fanout_cost_saved': 0.0,
+                'fanout_checkpoint_date': fields.Datetime.now(),
+            })
+            if auto_commit:
+                self.env.cr.commit()
+        else:
+            _logger.info(f"🔁 Resuming campaign '{self.name}' after contact {self.fanout_last_contact_id} "
+                         f"({self.fanout_messages_created} messages already created)")
+        
+        checkpoint = ('running', self.fanout_last_contact_id, self.fanout_last_phone or '')
+        after_id, after_phone = checkpoint[1:]
+        
+        started = perf_counter()
+        created = 0
+        recipients = self._get_target_contacts(after_id=after_id, after_phone=after_phone, batch_size=chunk_size)
+        for contact_ids in split_every(chunk_size, recipients):
+            # Hold the fan-out lock while creating the chunk, stop if another worker moved the checkpoint
+            if self._lock_fanout_checkpoint() != checkpoint:
+                _logger.warning(f"⚠️ Campaign '{self.name}' fan-out taken over by another worker, stopping")
+                return
+            
+            # A resumed run may meet contacts an earlier run already messaged
+            new_contact_ids = self._filter_unmessaged(contact_ids) if resuming else list(contact_ids)
+            vals_list = self._prepare_message_vals(new_contact_ids)
+            if vals_list:
+                Message.create(vals_list)
+                created += len(vals_list)
+            
+            # Checkpoint commits together with the chunk, so a resume never duplicates
+            checkpoint = ('running', contact_ids[-1],
+                          self.env['res.partner'].browse(contact_ids[-1]).zns_phone_normalized or '')
+            self.write({
+                'fanout_last_contact_id': checkpoint[1],
+                'fanout_last_phone': checkpoint[2],
+                'fanout_messages_created': self.fanout_messages_created + len(vals_list),
+                'fanout_checkpoint_date': fields.Datetime.now(),
+            })
+            if auto_commit:
+                self.env.cr.commit()
+            # Keep the cache from growing with every chunk
+            self.invalidate_cache()
+            
+            # Stop at a chunk boundary when paused or cancelled meanwhile
+            if self.status != 'running':
+                _logger.info(f"⏸️ Campaign '{self.name}' fan-out stopped at contact {contact_ids[-1]} ({self.status})")
+                return
+        
+        # Report recipients skipped for sharing a phone with the contact that got the message
+        duplicates = self._count_duplicate_phones()
+        unit_cost = float(self.env['ir.config_parameter'].sudo().get_param('zns_bom_marketing.message_unit_cost', '0'))
+        self.write({
+            'fanout_state': 'done',
+            'fanout_duplicates_skipped': duplicates,
+            'fanout_cost_saved': duplicates * unit_cost,
+        })
+        elapsed = perf_counter() - started
+        rate = created / elapsed if elapsed > 0 else 0
+        _logger.info(f"🚀 Campaign '{self.name}' executed: {created} messages created in {elapsed:.1f}s ({rate:.0f} rows/s), "
+                     f"{duplicates} duplicate phones skipped")
+    
+    def _lock_fanout_checkpoint(self, stale_before=None):
+        """Take the fan-out lock, return (fanout_state, last contact, last phone) or None if held elsewhere
+        
+        The lock is a transaction-level advisory lock rather than the campaign row, which
+        counter updates and message writes also lock. With stale_before, also None unless
+        the checkpoint is older than that.
+        """
+        self.ensure_one()
+        self.env.cr.execute("SELECT pg_try_advisory_xact_lock(%s, %s)", (FANOUT_LOCK_NAMESPACE, self.id))
+        if not self.env.cr.fetchone()[0]:
+            return None
+        
+        self.flush(['fanout_state', 'fanout_last_contact_id', 'fanout_last_phone', 'fanout_checkpoint_date'])
+        condition = ""
+        params = [self.id]
+        if stale_before:
+            condition = "AND fanout_state = 'running' AND fanout_checkpoint_date < %s"
+            params.append(stale_before)
+        self.env.cr.execute(f"""
+            SELECT fanout_state, COALESCE(fanout_last_contact_id, 0), COALESCE(fanout_last_phone, '')
+            FROM zns_bom_marketing_campaign
+            WHERE id = %s {condition}
+        """, params)
+        row = self.env.cr.fetchone()
+        self.invalidate_cache(['fanout_state', 'fanout_last_contact_id', 'fanout_last_phone',
+                               'fanout_messages_created', 'fanout_checkpoint_date'], self.ids)
+        return row
+    
+    def _filter_unmessaged(self, contact_ids):
+        """Get contact_ids without a message in this campaign yet, keeping their order"""
+        self.env['zns.bom.marketing.message'].flush(['campaign_id', 'contact_id'])
+        self.env.cr.execute("""
+            SELECT contact_id FROM zns_bom_marketing_message
+            WHERE campaign_id = %s AND contact_id IN %s
+        """, (self.id, tuple(contact_ids)))
+        messaged = {row[0] for row in self.env.cr.fetchall()}
+        return [contact_id for contact_id in contact_ids if contact_id not in messaged]
+    
+    @api.model
+    def _get_fanout_chunk_size(self):
+        """Get number of messages created per chunk"""
+        chunk_size = self.env['ir.config_parameter'].sudo().get_param('zns_bom_marketing.fanout_chunk_size', '1000')
+        try:
+            return max(int(chunk_size), 1)
+        except ValueError:
+            return 1000
+    
+    def _prepare_message_vals(self, contact_ids):
+        """Build queued message values for a batch of contacts from one read"""
+        values_list = self.env['res.partner'].browse(contact_ids).read(self._get_parameter_fields())
+        return [{
+            'campaign_id': self.id,
+            'contact_id': values['id'],
+            'phone_number': values['zns_phone_normalized'],
+            'message_parameters': json.dumps(self._build_parameters_from_values(values)),
+            'status': 'queued'
+        } for values in values_list if values['zns_phone_normalized']]
+    
+    def _get_recipient_where(self):
+        """Get the SQL condition (on alias partner) and params selecting eligible recipients
+        
+        Eligible: on a target list, valid phone, not excluded and, when opt-outs are
+        respected, without an active global or campaign-type opt-out.
+        """
+        self.env['res.partner'].flush(['zns_phone_state', 'zns_phone_normalized', 'active', 'is_company'])
+        self.env['zns.bom.marketing.opt.out'].flush(['contact_id', 'active', 'global_opt_out', 'campaign_types'])
+        self.flush(['contact_list_ids', 'excluded_contact_ids'])
+        self.contact_list_ids.flush(['contact_ids'])
+        
+        where = """
+            partner.active
+            AND partner.zns_phone_state = 'valid'
+            AND EXISTS (
+                SELECT 1 FROM zns_bom_marketing_list_contact_rel rel
+                WHERE rel.contact_id = partner.id AND rel.list_id IN %(list_ids)s
+            )
+            AND NOT EXISTS (
+                SELECT 1 FROM zns_bom_marketing_campaign_excluded_rel excluded
+                WHERE excluded.campaign_id = %(campaign_id)s AND excluded.contact_id = partner.id
+            )"""
         if self.respect_opt_out:
-            opt_out = self.env['zns.bom.marketing.opt.out'].search([
-                ('contact_id', '=', contact.id),
-                ('active', '=', True),
-                '|',
-                ('global_opt_out', '=', True),
-                ('campaign_types', '=', self.campaign_type)
-            ], limit=1)
-            if opt_out:
-                return False
+            where += """
+            AND NOT EXISTS (
+                SELECT 1 FROM zns_bom_marketing_opt_out opt_out
+                WHERE opt_out.contact_id = partner.id
+                  AND opt_out.active
+                  AND (opt_out.global_opt_out OR opt_out.campaign_types = %(campaign_type)s)
+            )"""
+        params = {
+            'list_ids': tuple(self.contact_list_ids.ids),
+            'campaign_id': self.id,
+            'campaign_type': self.campaign_type,
+        }
+        return where, params
+    
+    def _get_target_contacts(self, after_id=0, after_phone='', batch_size=None):
+        """Yield ids of eligible recipients in phone order, one keyset page per query
         
-        return True
+        With a dedup policy only one contact per normalized phone is yielded, chosen by the policy.
+        """
+        self.ensure_one()
+        if not self.contact_list_ids:
+            return
+        batch_size = batch_size or self._get_fanout_chunk_size()
+        where, params = self._get_recipient_where()
+        params['limit'] = batch_size
+        
+        if self.phone_dedup_policy == 'none':
+            query = f"""
+                SELECT partner.id, partner.zns_phone_normalized
+                FROM res_partner partner
+                WHERE {where}
+                  AND (partner.zns_phone_normalized, partner.id) > (%(after_phone)s, %(after_id)s)
+                ORDER BY partner.zns_phone_normalized, partner.id
+                LIMIT %(limit)s
+            """
+        else:
+            query = f"""
+                SELECT DISTINCT ON (partner.zns_phone_normalized) partner.id, partner.zns_phone_normalized
+                FROM res_partner partner
+                WHERE {where}
+                  AND partner.zns_phone_normalized > %(after_phone)s
+                ORDER BY partner.zns_phone_normalized, {PHONE_DEDUP_ORDER[self.phone_dedup_policy]}
+                LIMIT %(limit)s
+            """
+        
+        while True:
+            params.update(after_id=after_id, after_phone=after_phone)
+            self.env.cr.execute(query, params)
+            rows = self.env.cr.fetchall()
+            if not rows:
+                return
+            yield from (contact_id for contact_id, _phone in rows)
+            after_id, after_phone = rows[-1]
+    
+    def _count_duplicate_phones(self):
+        """Count eligible recipients skipped because another one has the same phone"""
+        self.ensure_one()
+        if self.phone_dedup_policy == 'none' or not self.contact_list_ids:
+            return 0
+        where, params = self._get_recipient_where()
+        self.env.cr.execute(f"""
+            SELECT COUNT(*) - COUNT(DISTINCT partner.zns_phone_normalized)
+            FROM res_partner partner
+            WHERE {where}
+        """, params)
+        return self.env.cr.fetchone()[0]
     
     def _create_campaign_message(self, contact):
         """Create a campaign message for contact"""
-        phone = contact.mobile or contact.phone
-        if not phone:
+        vals_list = self._prepare_message_vals(contact.ids)
+        if not vals_list:
             return
-        
-        # Clean phone number
-        phone = self._clean_phone_number(phone)
-        
-        # Build parameters
-        params = self._build_message_parameters(contact)
-        
-        # Get connection - try template's connection or use campaign's connection
-        connection_id = False
-        if self.bom_zns_template_id:
-            try:
-                if hasattr(self.bom_zns_template_id, 'connection_id') and self.bom_zns_template_id.connection_id:
-                    connection_id = self.bom_zns_template_id.connection_id.id
-                elif hasattr(self.bom_zns_template_id, 'zns_connection_id') and self.bom_zns_template_id.zns_connection_id:
-                    connection_id = self.bom_zns_template_id.zns_connection_id.id
-                elif hasattr(self.bom_zns_template_id, 'bom_connection_id') and self.bom_zns_template_id.bom_connection_id:
-                    connection_id = self.bom_zns_template_id.bom_connection_id.id
-            except:
-                pass
-        
-        # Fallback to campaign's connection
-        if not connection_id and self.bom_zns_connection_id:
-            connection_id = self.bom_zns_connection_id.id
-        
-        # Create message record
-        message = self.env['zns.bom.marketing.message'].create({
-            'campaign_id': self.id,
-            'contact_id': contact.id,
-            'phone_number': phone,
-            'message_parameters': json.dumps(params) if params else '{}',
-            'status': 'queued'
-        })
-        
-        return message
+        return self.env['zns.bom.marketing.message'].create(vals_list)
     
     def _build_message_parameters(self, contact):
         """Build message parameters for contact"""
+        return self._build_parameters_from_values(contact.read(self._get_parameter_fields())[0])
+    
+    def _get_parameter_fields(self):
+        """Get res.partner fields read to build message parameters"""
+        return ['name', 'mobile', 'phone', 'email', 'company_id', 'zns_phone_normalized', 'birthday']
+    
+    def _build_parameters_from_values(self, values):
+        """Build message parameters from read() values of a contact"""
+        phone = values['mobile'] or values['phone'] or ''
         params = {
-            'customer_name': contact.name or '',
-            'name': contact.name or '',
-            'customer_phone': contact.mobile or contact.phone or '',
-            'phone': contact.mobile or contact.phone or '',
-            'customer_email': contact.email or '',
-            'email': contact.email or '',
-            'company_name': contact.company_id.name if contact.company_id else '',
+            'customer_name': values['name'] or '',
+            'name': values['name'] or '',
+            'customer_phone': phone,
+            'phone': phone,
+            'customer_email': values['email'] or '',
+            'email': values['email'] or '',
+            'company_name': values['company_id'][1] if values['company_id'] else '',
         }
         
         # Add birthday-specific parameters
-        if self.campaign_type == 'birthday' and contact.birthday:
+        if self.campaign_type == 'birthday' and values.get('birthday'):
             try:
-                birth_date = fields.Date.from_string(contact.birthday)
+                birth_date = fields.Date.to_date(values['birthday'])
                 today = fields.Date.today()
                 age = today.year - birth_date.year
                 if today.month < birth_date.month or (today.month == birth_date.month and today.day < birth_date.day):
@@ -432,23 +762,6 @@ class ZnsBomMarketingCampaign(models.Model):
         
         return params
     
-    def _clean_phone_number(self, phone):
-        """Clean phone number format"""
-        if not phone:
-            return phone
-        
-        import re
-        # Remove spaces, dashes, parentheses
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
-        
-        # Handle Vietnamese phone numbers
-        if phone.startswith('0'):
-            phone = '+84' + phone[1:]
-        elif not phone.startswith('+'):
-            phone = '+84' + phone
-        
-        return phone
-    
     def _calculate_next_run_date(self):
         """Calculate next run date for recurring campaign"""
         if not self.recurring_type:
@@ -72,7 +72,10 @@ class ZnsBomMarketingContactList(models.Model):
         for record in self:
             record.contact_count = len(record.contact_ids)
     
+    @api.depends('contact_ids', 'contact_ids.zns_phone_state')
     def _compute_health_stats(self):
+        valid_by_list, opt_out_by_list = self._get_health_counts()
+
         for record in self:
             total_contacts = len(record.contact_ids)
             if total_contacts == 0:
@@ -81,35 +84,16 @@ class ZnsBomMarketingContactList(models.Model):
                 record.opt_out_count = 0
                 record.health_score = 0.0
                 continue
-            
-            valid_phones = 0
-            invalid_phones = 0
-            opt_outs = 0
-            
-            for contact in record.contact_ids:
-                # Check phone validity
-                try:
-                    phone = contact.mobile or contact.phone
-                    if phone and len(phone.strip()) >= 10:
-                        valid_phones += 1
-                    else:
-                        invalid_phones += 1
-                except:
-                    invalid_phones += 1
-                
-                # Check opt-out status
-                try:
-                    opt_out = self.env['zns.bom.marketing.opt.out'].search([
-                        ('contact_id', '=', contact.id),
-                        ('global_opt_out', '=', True),
-                        ('active', '=', True)
-                    ], limit=1)
-                    if opt_out:
-                        opt_outs += 1
-                except:
-                    # Skip if opt-out model doesn't exist yet
-                    pass
-            
+
+            if isinstance(record.id, int):
+                valid_phones = valid_by_list.get(record.id, 0)
+                opt_outs = opt_out_by_list.get(record.id, 0)
+            else:
+                # Unsaved list (onchange) - use the stored state of the selected contacts
+                valid_phones = len(record.contact_ids.filtered(lambda c: c.zns_phone_state == 'valid'))
+                opt_outs = 0
+            invalid_phones = total_contacts - valid_phones
+
             record.valid_phone_count = valid_phones
             record.invalid_phone_count = invalid_phones
             record.opt_out_count = opt_outs
@@ -120,7 +104,37 @@ class ZnsBomMarketingContactList(models.Model):
                 record.health_score = max(0, health_score)
             else:
                 record.health_score = 0.0
-    
+
+    def _get_health_counts(self):
+        """Get valid phone and global opt-out counts per list in two grouped queries"""
+        list_ids = [rid for rid in self.ids if isinstance(rid, int)]
+        if not list_ids:
+            return {}, {}
+
+        self.env['res.partner'].flush(['zns_phone_state'])
+        self.env['zns.bom.marketing.opt.out'].flush(['contact_id', 'global_opt_out', 'active'])
+        self.flush(['contact_ids'])
+
+        self.env.cr.execute("""
+            SELECT rel.list_id, COUNT(*)
+            FROM zns_bom_marketing_list_contact_rel rel
+            JOIN res_partner p ON p.id = rel.contact_id
+            WHERE rel.list_id IN %s AND p.zns_phone_state = 'valid'
+            GROUP BY rel.list_id
+        """, (tuple(list_ids),))
+        valid_by_list = dict(self.env.cr.fetchall())
+
+        self.env.cr.execute("""
+            SELECT rel.list_id, COUNT(DISTINCT rel.contact_id)
+            FROM zns_bom_marketing_list_contact_rel rel
+            JOIN zns_bom_marketing_opt_out o ON o.contact_id = rel.contact_id
+            WHERE rel.list_id IN %s AND o.global_opt_out AND o.active
+            GROUP BY rel.list_id
+        """, (tuple(list_ids),))
+        opt_out_by_list = dict(self.env.cr.fetchall())
+
+        return valid_by_list, opt_out_by_list
+
     @api.model
     def create(self, vals):
         result = super().create(vals)
@@ -159,23 +173,14 @@ class ZnsBomMarketingContactList(models.Model):
         target_date = fields.Date.today() + timedelta(days=self.birthday_days_before)
         
         # Build domain for birthday search
-        month_day = target_date.strftime('%m-%d')
-        month_day_alt = target_date.strftime('%-m-%-d')
-        
-        domain = [
-            ('birthday', '!=', False),
-            '|', 
-            ('birthday', 'like', f'%-{month_day}'),
-            ('birthday', 'like', f'%-{month_day_alt}')
-        ]
+        Partner = self.env['res.partner']
+        domain = Partner._get_birthday_domain(target_date)
         
         # Filter by months if specified
         if self.birthday_months == 'current':
-            current_month = fields.Date.today().month
-            domain.append(('birthday', 'like', f'%-{current_month:02d}-%'))
+            domain += Partner._get_birthday_month_domain(fields.Date.today().month)
         elif self.birthday_months == 'next':
-            next_month = (fields.Date.today().month % 12) + 1
-            domain.append(('birthday', 'like', f'%-{next_month:02d}-%'))
+            domain += Partner._get_birthday_month_domain((fields.Date.today().month % 12) + 1)
         
         contacts = self.env['res.partner'].search(domain)
         self.contact_ids = [(6, 0, contacts.ids)]
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 
 import json
+import calendar
 import logging
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
+from .zns_bom_marketing_live import LIVE_CHANNEL
 
 _logger = logging.getLogger(__name__)
 
@@ -26,6 +28,7 @@ class ZnsBomMarketingDashboard(models.Model):
             'top_performing_campaigns': self._get_top_performing_campaigns(),
             'monthly_trends': self._get_monthly_trends(),
             'birthday_upcoming': self._get_upcoming_birthdays(),
+            'lane_report': self.env['zns.bom.marketing.message'].get_lane_report(),
         }
     
     def _get_campaign_statistics(self):
@@ -224,25 +227,32 @@ class ZnsBomMarketingDashboard(models.Model):
     
     def _get_upcoming_birthdays(self, days_ahead=7):
         """Get upcoming birthdays in next N days"""
-        upcoming = []
+        Partner = self.env['res.partner']
+        today = fields.Date.today()
         
+        # One indexed range query for the whole window, grouped per day below
+        partners = Partner.search_read(Partner._get_birthday_domain(today, days_ahead),
+                                       ['name', 'zns_birthday_key'], order='name')
+        by_key = {}
+        for partner in partners:
+            by_key.setdefault(partner['zns_birthday_key'], []).append(partner['name'])
+        
+        upcoming = []
         for i in range(days_ahead):
-            target_date = fields.Date.today() + timedelta(days=i)
-            month_day = target_date.strftime('%m-%d')
+            target_date = today + timedelta(days=i)
+            key = target_date.month * 100 + target_date.day
+            names = by_key.get(key, [])
+            # Feb 29 birthdays show on Feb 28 in non-leap years
+            if key == 228 and not calendar.isleap(target_date.year):
+                names = names + by_key.get(229, [])
             
-            # Find contacts with birthday on this date
-            contacts = self.env['res.partner'].search([
-                ('birthday', '!=', False),
-                ('birthday', 'like', f'%-{month_day}')
-            ])
-            
-            if contacts:
+            if names:
                 upcoming.append({
                     'date': target_date.strftime('%Y-%m-%d'),
                     'date_display': target_date.strftime('%B %d'),
                     'days_from_now': i,
-                    'contacts': len(contacts),
-                    'contact_names': contacts[:3].mapped('name')  # Show first 3 names
+                    'contacts': len(names),
+                    'contact_names': names[:3]  # Show first 3 names
                 })
         
         return upcoming
@@ -286,22 +296,8 @@ class ZnsBomMarketingDashboard(models.Model):
     
     @api.model
     def get_real_time_stats(self):
-        """Get real-time dashboard stats"""
-        # Messages in last hour
-        one_hour_ago = fields.Datetime.now() - timedelta(hours=1)
-        recent_messages = self.env['zns.bom.marketing.message'].search_count([
-            ('create_date', '>=', one_hour_ago)
-        ])
-        
-        # Currently queued
-        queued_count = self.env['zns.bom.marketing.message'].search_count([
-            ('status', '=', 'queued')
-        ])
-        
-        # Active campaigns
-        active_campaigns = self.env['zns.bom.marketing.campaign'].search_count([
-            ('status', '=', 'running')
-        ])
+        """Get real-time dashboard stats from the live counters"""
+        counters = self.env['zns.bom.marketing.live.counter'].get_counters()
         
         # Next scheduled campaign
         next_campaign = self.env['zns.bom.marketing.campaign'].search([
@@ -317,10 +313,8 @@ class ZnsBomMarketingDashboard(models.Model):
                 'recipients': next_campaign.total_recipients
             }
         
-        return {
-            'recent_messages': recent_messages,
-            'queued_messages': queued_count,
-            'active_campaigns': active_campaigns,
+        return dict(counters, **{
             'next_campaign': next_campaign_info,
+            'live_channel': LIVE_CHANNEL,
             'timestamp': fields.Datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
\ No newline at end of file
+        })
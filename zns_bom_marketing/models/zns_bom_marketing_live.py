@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import Counter
+from datetime import datetime, timedelta
+from odoo import models, fields, api, _
+
+_logger = logging.getLogger(__name__)
+
+# Bus channel dashboards subscribe to for live counters
+LIVE_CHANNEL = 'zns_bom_marketing_live'
+
+# Gauges are stored on a fixed bucket, windowed counters per minute
+GAUGE_BUCKET = datetime(1970, 1, 1)
+GAUGE_KEYS = ('queued', 'active_campaigns')
+WINDOW_KEYS = ('created', 'sent', 'failed')
+
+
+class ZnsBomMarketingLiveCounter(models.Model):
+    _name = 'zns.bom.marketing.live.counter'
+    _description = 'ZNS BOM Marketing Live Counter'
+    _log_access = False
+
+    key = fields.Char('Key', required=True, readonly=True)
+    bucket = fields.Datetime('Minute', required=True, index=True, readonly=True)
+    value = fields.Integer('Value', readonly=True)
+
+    _sql_constraints = [
+        ('key_bucket_unique', 'unique(key, bucket)', 'Only one counter per key and minute is allowed'),
+    ]
+
+    def init(self):
+        # Start gauges from the real counts on install
+        self.env.cr.execute("SELECT 1 FROM zns_bom_marketing_live_counter LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._reconcile_gauges()
+
+    @api.model
+    def add_deltas(self, deltas):
+        """Queue counter deltas, applied and pushed once when the transaction commits"""
+        deltas = {key: value for key, value in deltas.items() if value}
+        if not deltas:
+            return
+
+        data = self.env.cr.precommit.data
+        pending = data.get('zns_bom_marketing.live_deltas')
+        if pending is None:
+            pending = data['zns_bom_marketing.live_deltas'] = Counter()
+            self.env.cr.precommit.add(self._flush_deltas)
+        pending.update(deltas)
+
+    def _flush_deltas(self):
+        """Apply queued deltas in one statement and push the new counters"""
+        pending = self.env.cr.precommit.data.pop('zns_bom_marketing.live_deltas', None)
+        if not pending:
+            return
+
+        minute = fields.Datetime.now().replace(second=0, microsecond=0)
+        rows = []
+        for key, value in pending.items():
+            if not value:
+                continue
+            rows.append((key, GAUGE_BUCKET if key in GAUGE_KEYS else minute, value))
+        if rows:
+            values_sql = ", ".join(["(%s, %s, %s)"] * len(rows))
+            self.env.cr.execute(f"""
+                INSERT INTO zns_bom_marketing_live_counter (key, bucket, value)
+                VALUES {values_sql}
+                ON CONFLICT (key, bucket) DO UPDATE
+                SET value = zns_bom_marketing_live_counter.value + EXCLUDED.value
+            """, [item for row in rows for item in row])
+        self._push_counters()
+
+    @api.model
+    def get_counters(self):
+        """Get gauges and last-hour counters from the counter table"""
+        one_hour_ago = fields.Datetime.now() - timedelta(hours=1)
+        self.env.cr.execute("""
+            SELECT key, SUM(value)
+            FROM zns_bom_marketing_live_counter
+            WHERE bucket = %s OR bucket > %s
+            GROUP BY key
+        """, (GAUGE_BUCKET, one_hour_ago))
+        values = dict(self.env.cr.fetchall())
+        return {
+            'queued_messages': max(values.get('queued', 0), 0),
+            'active_campaigns': max(values.get('active_campaigns', 0), 0),
+            'recent_messages': values.get('created', 0),
+            'sent_last_hour': values.get('sent', 0),
+            'failed_last_hour': values.get('failed', 0),
+        }
+
+    def _push_counters(self):
+        """Send current counters to subscribed dashboards"""
+        payload = self.get_counters()
+        payload['timestamp'] = fields.Datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        self.env['bus.bus']._sendone(LIVE_CHANNEL, 'zns_bom_marketing/live_counters', payload)
+
+    @api.model
+    def _reconcile_gauges(self):
+        """Reset gauges from real counts and drop minute buckets older than a day"""
+        self.env['zns.bom.marketing.message'].flush(['status'])
+        self.env['zns.bom.marketing.campaign'].flush(['status'])
+        self.env.cr.execute("SELECT COUNT(*) FROM zns_bom_marketing_message WHERE status = 'queued'")
+        queued = self.env.cr.fetchone()[0]
+        self.env.cr.execute("SELECT COUNT(*) FROM zns_bom_marketing_campaign WHERE status = 'running'")
+        active_campaigns = self.env.cr.fetchone()[0]
+
+        self.env.cr.execute("""
+            INSERT INTO zns_bom_marketing_live_counter (key, bucket, value)
+            VALUES ('queued', %s, %s), ('active_campaigns', %s, %s)
+            ON CONFLICT (key, bucket) DO UPDATE SET value = EXCLUDED.value
+        """, (GAUGE_BUCKET, queued, GAUGE_BUCKET, active_campaigns))
+        self.env.cr.execute("""
+            DELETE FROM zns_bom_marketing_live_counter
+            WHERE bucket <> %s AND bucket < %s
+        """, (GAUGE_BUCKET, fields.Datetime.now() - timedelta(days=1)))
+        self.invalidate_cache()
+        _logger.info(f"Reconciled live counters: {queued} queued, {active_campaigns} active campaigns")
@@ -2,11 +2,22 @@
 
 import json
 import logging
+from collections import Counter, defaultdict
 from datetime import datetime, timedelta
 from odoo import models, fields, api, _
 
 _logger = logging.getLogger(__name__)
 
+# Fields that move a message between campaign counters
+COUNTER_TRIGGER_FIELDS = {'campaign_id', 'status', 'message_cost'}
+
+# Dispatch lanes: default weight and queue-to-sent SLO (seconds), overridable by system parameters
+QUEUE_LANES = [('priority', 'Priority'), ('bulk', 'Bulk')]
+LANE_DEFAULTS = {
+    'priority': {'weight': 3, 'slo': 900},
+    'bulk': {'weight': 1, 'slo': 14400},
+}
+
 
 class ZnsBomMarketingMessage(models.Model):
     _name = 'zns.bom.marketing.message'
@@ -15,10 +26,10 @@ class ZnsBomMarketingMessage(models.Model):
     _rec_name = 'display_name'
 
     # Relations
-    campaign_id = fields.Many2one('zns.bom.marketing.campaign', required=True, ondelete='cascade')
+    campaign_id = fields.Many2one('zns.bom.marketing.campaign', required=True, ondelete='cascade', index=True)
     bom_zns_message_id = fields.Many2one('bom.zns.message', string='BOM ZNS Message',
                                         help='Reference to BOM ZNS Simple message record')
-    contact_id = fields.Many2one('res.partner', required=True)
+    contact_id = fields.Many2one('res.partner', required=True, index=True)
     
     # Message Info
     phone_number = fields.Char('Phone Number', required=True)
@@ -40,7 +51,8 @@ class ZnsBomMarketingMessage(models.Model):
     
     # Timing
     queued_date = fields.Datetime('Queued', default=fields.Datetime.now)
-    sent_date = fields.Datetime('Sent')
+    scheduled_at = fields.Datetime('Scheduled At', index=True, help='Not dispatched before this time')
+    sent_date = fields.Datetime('Sent', index=True)
     delivered_date = fields.Datetime('Delivered')
     
     # Error Handling
@@ -48,6 +60,13 @@ class ZnsBomMarketingMessage(models.Model):
     retry_count = fields.Integer('Retry Count', default=0)
     next_retry_date = fields.Datetime('Next Retry')
     
+    # Dispatch lane (copied from the campaign at creation)
+    lane = fields.Selection(QUEUE_LANES, string='Lane', default='bulk', required=True, index=True)
+    
+    # Queue Lease (set when a worker claims the message)
+    lease_owner = fields.Char('Lease Owner', readonly=True, copy=False)
+    lease_expires_at = fields.Datetime('Lease Expires', readonly=True, copy=False)
+    
     # Analytics
     message_cost = fields.Float('Message Cost', default=0.0)
     send_duration = fields.Float('Send Duration (seconds)')
@@ -57,6 +76,228 @@ class ZnsBomMarketingMessage(models.Model):
     campaign_name = fields.Char('Campaign', compute='_compute_related_fields', readonly=True)
     contact_name = fields.Char('Contact', compute='_compute_related_fields', readonly=True)
     
+    def init(self):
+        # Queue consumers scan queued messages in id order
+        self.env.cr.execute("""
+            CREATE INDEX IF NOT EXISTS zns_bom_marketing_message_queue_index
+            ON zns_bom_marketing_message (id) WHERE status = 'queued'
+        """)
+    
+    @api.model
+    def _claim_queued(self, owner, limit, lease_seconds, lane=None, connection_id=None, filter_connection=False):
+        """Lease up to limit queued messages to owner, skipping rows other workers hold
+        
+        lane and connection_id (with filter_connection) restrict the claim to one dispatch queue.
+        """
+        self.flush(['status', 'lease_owner', 'lease_expires_at', 'lane', 'campaign_id', 'scheduled_at'])
+        conditions = ""
+        if lane:
+            conditions += " AND m.lane = %(lane)s"
+        if filter_connection:
+            conditions += " AND c.bom_zns_connection_id IS NOT DISTINCT FROM %(connection_id)s"
+        self.env.cr.execute(f"""
+            UPDATE zns_bom_marketing_message
+            SET lease_owner = %(owner)s,
+                lease_expires_at = (now() AT TIME ZONE 'UTC') + %(lease)s * interval '1 second'
+            WHERE id IN (
+                SELECT m.id FROM zns_bom_marketing_message m
+                JOIN zns_bom_marketing_campaign c ON c.id = m.campaign_id
+                WHERE m.status = 'queued'
+                  AND (m.lease_expires_at IS NULL OR m.lease_expires_at < (now() AT TIME ZONE 'UTC'))
+                  AND (m.scheduled_at IS NULL OR m.scheduled_at <= (now() AT TIME ZONE 'UTC'))
+                  {conditions}
+                ORDER BY m.id
+                LIMIT %(limit)s
+                FOR UPDATE OF m SKIP LOCKED
+            )
+            RETURNING id
+        """, {'owner': owner, 'lease': lease_seconds, 'limit': limit, 'lane': lane, 'connection_id': connection_id})
+        message_ids = sorted(row[0] for row in self.env.cr.fetchall())
+        self.invalidate_cache(['lease_owner', 'lease_expires_at'], message_ids)
+        return self.browse(message_ids)
+    
+    @api.model
+    def _get_lane_settings(self):
+        """Get weight and SLO seconds per lane"""
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        settings = {}
+        for lane, defaults in LANE_DEFAULTS.items():
+            try:
+                weight = max(int(get_param(f'zns_bom_marketing.lane_{lane}_weight', defaults['weight'])), 1)
+                slo = max(int(get_param(f'zns_bom_marketing.lane_{lane}_slo_seconds', defaults['slo'])), 1)
+            except ValueError:
+                weight, slo = defaults['weight'], defaults['slo']
+            settings[lane] = {'weight': weight, 'slo': slo}
+        return settings
+    
+    @api.model
+    def _get_lane_backlog(self):
+        """Get claimable message count and oldest queued date per (connection, lane)"""
+        self.flush(['status', 'lease_expires_at', 'lane', 'campaign_id', 'queued_date', 'scheduled_at'])
+        self.env.cr.execute("""
+            SELECT c.bom_zns_connection_id, m.lane, COUNT(*), MIN(m.queued_date)
+            FROM zns_bom_marketing_message m
+            JOIN zns_bom_marketing_campaign c ON c.id = m.campaign_id
+            WHERE m.status = 'queued'
+              AND (m.lease_expires_at IS NULL OR m.lease_expires_at < (now() AT TIME ZONE 'UTC'))
+              AND (m.scheduled_at IS NULL OR m.scheduled_at <= (now() AT TIME ZONE 'UTC'))
+            GROUP BY c.bom_zns_connection_id, m.lane
+        """)
+        return {(connection_id, lane): (count, oldest) for connection_id, lane, count, oldest in self.env.cr.fetchall()}
+    
+    @api.model
+    def get_lane_report(self, hours=1):
+        """Get backlog, p95 queue latency and SLO attainment per lane over the last hours"""
+        settings = self._get_lane_settings()
+        since = fields.Datetime.now() - timedelta(hours=hours)
+        self.flush(['status', 'lane', 'queued_date', 'sent_date'])
+        slo_values = ", ".join(["(%s, %s)"] * len(settings))
+        slo_params = [item for lane, values in settings.items() for item in (lane, values['slo'])]
+        self.env.cr.execute(f"""
+            SELECT m.lane,
+                   COUNT(*) FILTER (WHERE m.status = 'queued'),
+                   MIN(m.queued_date) FILTER (WHERE m.status = 'queued'),
+                   COUNT(*) FILTER (WHERE m.sent_date >= %s),
+                   COUNT(*) FILTER (WHERE m.sent_date >= %s
+                                    AND m.sent_date - m.queued_date <= slo.seconds * interval '1 second'),
+                   percentile_cont(0.95) WITHIN GROUP (ORDER BY EXTRACT(EPOCH FROM m.sent_date - m.queued_date))
+                       FILTER (WHERE m.sent_date >= %s)
+            FROM zns_bom_marketing_message m
+            JOIN (VALUES {slo_values}) AS slo(lane, seconds) ON slo.lane = m.lane
+            WHERE m.status = 'queued' OR m.sent_date >= %s
+            GROUP BY m.lane
+        """, [since, since, since] + slo_params + [since])
+        rows = {row[0]: row[1:] for row in self.env.cr.fetchall()}
+        
+        now = fields.Datetime.now()
+        report = []
+        for lane, label in QUEUE_LANES:
+            queued, oldest, sent, within_slo, p95 = rows.get(lane, (0, None, 0, 0, None))
+            report.append({
+                'lane': lane,
+                'name': label,
+                'queued': queued,
+                'oldest_age_seconds': max(int((now - oldest).total_seconds()), 0) if oldest else 0,
+                'sent': sent,
+                'slo_seconds': settings[lane]['slo'],
+                'slo_attainment': round(within_slo / sent * 100, 1) if sent else 100.0,
+                'p95_seconds': round(p95, 1) if p95 is not None else None,
+            })
+        return report
+    
+    def _renew_lease(self, owner, lease_seconds):
+        """Extend the lease if owner still holds it, return False if it was lost"""
+        self.ensure_one()
+        self.env.cr.execute("""
+            UPDATE zns_bom_marketing_message
+            SET lease_expires_at = (now() AT TIME ZONE 'UTC') + %s * interval '1 second'
+            WHERE id = %s AND lease_owner = %s AND status = 'queued'
+            RETURNING id
+        """, (lease_seconds, self.id, owner))
+        self.invalidate_cache(['lease_expires_at'], self.ids)
+        return bool(self.env.cr.fetchone())
+    
+    @api.model
+    def _release_leases(self, owner):
+        """Release owner's leases on messages it did not get to send"""
+        self.flush(['status', 'lease_owner'])
+        self.env.cr.execute("""
+            UPDATE zns_bom_marketing_message
+            SET lease_owner = NULL, lease_expires_at = NULL
+            WHERE lease_owner = %s AND status = 'queued'
+        """, (owner,))
+        self.invalidate_cache(['lease_owner', 'lease_expires_at'])
+        return self.env.cr.rowcount
+    
+    @api.model
+    def _reclaim_expired_leases(self):
+        """Clear leases a dead worker left on queued messages, return how many"""
+        self.flush(['status', 'lease_owner', 'lease_expires_at'])
+        self.env.cr.execute("""
+            UPDATE zns_bom_marketing_message
+            SET lease_owner = NULL, lease_expires_at = NULL
+            WHERE status = 'queued'
+              AND lease_owner IS NOT NULL
+              AND lease_expires_at < (now() AT TIME ZONE 'UTC')
+        """)
+        reclaimed = self.env.cr.rowcount
+        self.invalidate_cache(['lease_owner', 'lease_expires_at'])
+        if reclaimed:
+            _logger.warning(f"Reclaimed {reclaimed} messages with expired leases")
+        return reclaimed
+    
+    @api.model_create_multi
+    def create(self, vals_list):
+        # Messages inherit their campaign's dispatch lane
+        campaign_ids = {vals['campaign_id'] for vals in vals_list if 'lane' not in vals and vals.get('campaign_id')}
+        if campaign_ids:
+            lanes = {campaign.id: campaign.queue_lane for campaign in self.env['zns.bom.marketing.campaign'].browse(campaign_ids)}
+            for vals in vals_list:
+                if 'lane' not in vals and vals.get('campaign_id'):
+                    vals['lane'] = lanes[vals['campaign_id']]
+        messages = super().create(vals_list)
+        statuses = Counter(messages.mapped('status'))
+        self.env['zns.bom.marketing.live.counter'].add_deltas({
+            'created': len(messages),
+            'queued': statuses['queued'],
+            'sent': statuses['sent'],
+            'failed': statuses['failed'],
+        })
+        self.env['zns.bom.marketing.campaign']._add_counter_deltas(messages._get_campaign_counters())
+        return messages
+    
+    def write(self, vals):
+        if not COUNTER_TRIGGER_FIELDS & set(vals):
+            return super().write(vals)
+        
+        # Campaign counters follow the difference before/after the write
+        counters_before = self._get_campaign_counters()
+        old_statuses = Counter(self.mapped('status'))
+        result = super().write(vals)
+        counters_after = self._get_campaign_counters()
+        
+        deltas = defaultdict(dict)
+        for campaign_id in set(counters_before) | set(counters_after):
+            before, after = counters_before.get(campaign_id, {}), counters_after.get(campaign_id, {})
+            for field in set(before) | set(after):
+                deltas[campaign_id][field] = after.get(field, 0) - before.get(field, 0)
+        self.env['zns.bom.marketing.campaign']._add_counter_deltas(deltas)
+        
+        # Live counters follow status transitions
+        if 'status' in vals:
+            new_status = vals['status']
+            changed = len(self) - old_statuses[new_status]
+            self.env['zns.bom.marketing.live.counter'].add_deltas({
+                'queued': (len(self) if new_status == 'queued' else 0) - old_statuses['queued'],
+                'sent': changed if new_status == 'sent' else 0,
+                'failed': changed if new_status == 'failed' else 0,
+            })
+        return result
+    
+    def unlink(self):
+        queued = len(self.filtered(lambda message: message.status == 'queued'))
+        counters = self._get_campaign_counters()
+        result = super().unlink()
+        self.env['zns.bom.marketing.live.counter'].add_deltas({'queued': -queued})
+        self.env['zns.bom.marketing.campaign']._add_counter_deltas({
+            campaign_id: {field: -value for field, value in values.items()}
+            for campaign_id, values in counters.items()
+        })
+        return result
+    
+    def _get_campaign_counters(self):
+        """Get the contribution of these messages to their campaigns' counters"""
+        counters = defaultdict(lambda: defaultdict(float))
+        for message in self:
+            values = counters[message.campaign_id.id]
+            values['messages_total'] += 1
+            values['messages_queued'] += message.status == 'queued'
+            values['messages_sent'] += message.status in ('sent', 'delivered')
+            values['messages_delivered'] += message.status == 'delivered'
+            values['messages_failed'] += message.status == 'failed'
+            values['total_cost'] += message.message_cost or 0.0
+        return counters
+    
     @api.depends('campaign_id', 'campaign_id.bom_zns_template_id', 'campaign_id.name', 'contact_id', 'contact_id.name')
     def _compute_related_fields(self):
         for record in self:
@@ -2,11 +2,14 @@
 
 import logging
 from datetime import datetime, timedelta
-from odoo import models, fields, api, _
+from odoo import models, fields, api, tools, _
 from odoo.exceptions import ValidationError
 
 _logger = logging.getLogger(__name__)
 
+# Bumped after every committed opt-out change, part of the opted-out set cache key
+CACHE_VERSION_SEQUENCE = 'zns_bom_marketing_opt_out_cache_version'
+
 
 class ZnsBomMarketingOptOut(models.Model):
     _name = 'zns.bom.marketing.opt.out'
@@ -83,11 +86,28 @@ class ZnsBomMarketingOptOut(models.Model):
             except:
                 record.display_name = 'Opt-out Record'
     
-    @api.model
-    def create(self, vals):
+    def init(self):
+        self.env.cr.execute(f"CREATE SEQUENCE IF NOT EXISTS {CACHE_VERSION_SEQUENCE}")
+    
+    @api.model_create_multi
+    def create(self, vals_list):
         """Override create to log opt-out"""
-        result = super().create(vals)
-        _logger.info(f"Contact {result.contact_id.name} opted out: {result.opt_out_reason}")
+        result = super().create(vals_list)
+        self._invalidate_opted_out_sets()
+        for opt_out in result:
+            _logger.info(f"Contact {opt_out.contact_id.name} opted out: {opt_out.opt_out_reason}")
+        return result
+    
+    def write(self, vals):
+        result = super().write(vals)
+        # Re-subscribing (active) or changing scope alters the opted-out sets
+        if {'contact_id', 'active', 'global_opt_out', 'campaign_types'} & set(vals):
+            self._invalidate_opted_out_sets()
+        return result
+    
+    def unlink(self):
+        result = super().unlink()
+        self._invalidate_opted_out_sets()
         return result
     
     def action_resubscribe(self):
@@ -127,47 +147,67 @@ class ZnsBomMarketingOptOut(models.Model):
     @api.model
     def check_opt_out_status(self, contact_id, campaign_type=None):
         """Check if contact is opted out for specific campaign type"""
-        domain = [
-            ('contact_id', '=', contact_id),
-            ('active', '=', True)
-        ]
-        
-        opt_outs = self.search(domain)
-        
-        for opt_out in opt_outs:
-            # Check global opt-out
-            if opt_out.global_opt_out:
-                return True
-            
-            # Check specific campaign type opt-out
-            if campaign_type and opt_out.campaign_types == campaign_type:
-                return True
-        
-        return False
+        return bool(self.opted_out_ids([contact_id], campaign_type))
+    
+    @api.model
+    def opted_out_ids(self, contact_ids, campaign_type=None):
+        """Get the ids among contact_ids opted out globally or from campaign_type"""
+        opted_out = self._get_opted_out_set(campaign_type or False)
+        return {contact_id for contact_id in contact_ids if contact_id in opted_out}
+    
+    @api.model
+    def _get_opted_out_set(self, campaign_type):
+        """Get ids of contacts with an active global or campaign_type opt-out"""
+        # The cache only knows committed changes, read directly after changing opt-outs
+        if self.env.cr.postcommit.data.get('zns_bom_marketing.opt_out_changed'):
+            return self._read_opted_out_set(campaign_type)
+        self.env.cr.execute(f"SELECT last_value FROM {CACHE_VERSION_SEQUENCE}")
+        return self._get_cached_opted_out_set(campaign_type, self.env.cr.fetchone()[0])
+    
+    @api.model
+    @tools.ormcache('campaign_type', 'version')
+    def _get_cached_opted_out_set(self, campaign_type, version):
+        """Get the opted-out set for a cache version, shared by all workers seeing that version"""
+        return self._read_opted_out_set(campaign_type)
+    
+    @api.model
+    def _read_opted_out_set(self, campaign_type):
+        """Read ids of contacts with an active global or campaign_type opt-out in one query"""
+        self.flush(['contact_id', 'active', 'global_opt_out', 'campaign_types'])
+        self.env.cr.execute("""
+            SELECT DISTINCT contact_id
+            FROM zns_bom_marketing_opt_out
+            WHERE active AND (global_opt_out OR campaign_types = %s)
+        """, (campaign_type or None,))
+        return frozenset(row[0] for row in self.env.cr.fetchall())
+    
+    def _invalidate_opted_out_sets(self):
+        """Bump the cache version once this transaction commits"""
+        # Only this method's entries go stale, clear_caches() would empty every registry cache
+        data = self.env.cr.postcommit.data
+        if not data.get('zns_bom_marketing.opt_out_changed'):
+            data['zns_bom_marketing.opt_out_changed'] = True
+            self.env.cr.postcommit.add(self._bump_cache_version)
+    
+    def _bump_cache_version(self):
+        """Move every worker to a new cache version (sequences ignore transactions)"""
+        self.env.cr.execute(f"SELECT nextval('{CACHE_VERSION_SEQUENCE}')")
     
     @api.model
     def bulk_opt_out(self, contact_ids, reason, notes=None):
-        """Bulk opt-out contacts"""
-        created_count = 0
+        """Bulk opt-out contacts not already globally opted out, in one create"""
+        already_opted_out = self._get_opted_out_set(False)
+        missing_ids = [contact_id for contact_id in dict.fromkeys(contact_ids) if contact_id not in already_opted_out]
+        if not missing_ids:
+            return 0
         
-        for contact_id in contact_ids:
-            # Check if already opted out
-            existing = self.search([
-                ('contact_id', '=', contact_id),
-                ('global_opt_out', '=', True),
-                ('active', '=', True)
-            ], limit=1)
-            
-            if not existing:
-                self.create({
-                    'contact_id': contact_id,
-                    'opt_out_reason': reason,
-                    'global_opt_out': True,
-                    'notes': notes or '',
-                })
-                created_count += 1
-        
-        return created_count
+        self.create([{
+            'contact_id': contact_id,
+            'opt_out_reason': reason,
+            'global_opt_out': True,
+            'notes': notes or '',
+        } for contact_id in missing_ids])
+        return len(missing_ids)
     
     @api.model
     def process_bounced_messages(self):
@@ -235,21 +275,19 @@ class ZnsBomMarketingOptOut(models.Model):
     
     @api.constrains('contact_id', 'global_opt_out', 'campaign_types')
     def _check_duplicate_opt_out(self):
-        for record in self:
-            domain = [
-                ('contact_id', '=', record.contact_id.id),
-                ('active', '=', True),
-                ('id', '!=', record.id)
-            ]
-            
-            if record.global_opt_out:
-                domain.append(('global_opt_out', '=', True))
-            else:
-                domain.extend([
-                    ('global_opt_out', '=', False),
-                    ('campaign_types', '=', record.campaign_types)
-                ])
-            
-            existing = self.search(domain, limit=1)
-            if existing:
-                raise ValidationError(_('This contact already has an active opt-out record for this scope'))
\ No newline at end of file
+        # One query for the whole batch instead of a search per record
+        self.flush(['contact_id', 'active', 'global_opt_out', 'campaign_types'])
+        self.env.cr.execute("""
+            SELECT 1
+            FROM zns_bom_marketing_opt_out opt_out
+            JOIN zns_bom_marketing_opt_out other
+              ON other.contact_id = opt_out.contact_id
+             AND other.id <> opt_out.id
+             AND other.active
+             AND other.global_opt_out = opt_out.global_opt_out
+             AND (opt_out.global_opt_out OR other.campaign_types = opt_out.campaign_types)
+            WHERE opt_out.id IN %s
+            LIMIT 1
+        """, (tuple(self.ids),))
+        if self.env.cr.fetchone():
+            raise ValidationError(_('This contact already has an active opt-out record for this scope'))
@@ -1,13 +1,28 @@
 # -*- coding: utf-8 -*-
 
+import os
 import json
-import re
+import math
+import pytz
+import uuid
+import socket
 import logging
+import threading
+from time import perf_counter
 from datetime import datetime, timedelta, time
 from odoo import models, fields, api, _
 
 _logger = logging.getLogger(__name__)
 
+# Weight multiplier for a lane whose oldest queued message is past its SLO
+SLO_BREACH_BOOST = 4
+
+# Adaptive queue batches: bounds, target duration and failure rate that halves the batch
+BATCH_SIZE_MIN = 10
+BATCH_SIZE_MAX = 1000
+BATCH_TARGET_SECONDS = 30
+BATCH_ERROR_RATE_LIMIT = 0.2
+
 
 class ZnsBomMarketingScheduler(models.Model):
     _name = 'zns.bom.marketing.scheduler'
@@ -43,82 +58,82 @@ class ZnsBomMarketingScheduler(models.Model):
         days_before = campaign.birthday_days_before
         target_date = fields.Date.today() + timedelta(days=days_before)
         
-        # Find contacts with birthdays on target date
-        birthday_contacts = self._find_birthday_contacts(target_date)
-        
-        # Filter contacts based on campaign lists (if specified)
-        if campaign.contact_list_ids:
-            campaign_contacts = set()
-            for contact_list in campaign.contact_list_ids:
-                campaign_contacts.update(contact_list.contact_ids.ids)
-            birthday_contacts = birthday_contacts.filtered(
-                lambda c: c.id in campaign_contacts
-            )
+        # Eligible contacts with birthdays on target date, in one query
+        birthday_contacts = self._get_birthday_recipients(campaign, target_date)
         
         # Send birthday messages
         messages_queued = 0
         for contact in birthday_contacts:
-            if self._should_send_birthday_message(contact, campaign):
-                self._queue_birthday_message(campaign, contact)
-                messages_queued += 1
+            self._queue_birthday_message(campaign, contact)
+            messages_queued += 1
         
         _logger.info(f"Birthday campaign '{campaign.name}': {messages_queued} messages queued")
         return messages_queued
     
-    def _find_birthday_contacts(self, target_date):
-        """Find all contacts with birthday on target date"""
-        # Handle different date formats
-        month_day = target_date.strftime('%m-%d')  # MM-DD
-        month_day_alt = target_date.strftime('%-m-%-d')  # M-D (no leading zeros)
-        
-        domain = [
-            ('birthday', '!=', False),
-            '|', 
-            ('birthday', 'like', f'%-{month_day}'),
-            ('birthday', 'like', f'%-{month_day_alt}')
-        ]
-        
-        contacts = self.env['res.partner'].search(domain)
-        _logger.info(f"Found {len(contacts)} contacts with birthday on {target_date}")
-        return contacts
-    
-    def _should_send_birthday_message(self, contact, campaign):
-        """Check if we should send birthday message to contact"""
-        # Check opt-out status
-        if self.env['zns.bom.marketing.opt.out'].check_opt_out_status(contact.id, 'birthday'):
-            _logger.debug(f"Contact {contact.name} is opted out from birthday messages")
-            return False
-        
-        # Check if valid phone number
-        phone = contact.mobile or contact.phone
-        if not phone:
-            _logger.debug(f"Contact {contact.name} has no phone number")
-            return False
-        
-        # Check if already sent birthday message this year
-        this_year = fields.Date.today().year
-        existing_message = self.env['zns.bom.marketing.message'].search([
-            ('campaign_id', '=', campaign.id),
-            ('contact_id', '=', contact.id),
-            ('create_date', '>=', f'{this_year}-01-01'),
-            ('status', 'in', ['sent', 'delivered'])
-        ], limit=1)
-        
-        if existing_message:
-            _logger.debug(f"Birthday message already sent to {contact.name} this year")
-            return False
+    def _get_birthday_recipients(self, campaign, target_date):
+        """Get contacts with a birthday on target_date who can get this campaign's message
         
-        return True
+        Sendable phone not rejected by BOM, on the campaign lists if any, not excluded, not opted
+        out of birthday messages and not already messaged by this campaign this year (failed/skipped
+        excepted).
+        """
+        Partner = self.env['res.partner']
+        Partner.flush(['zns_phone_state', 'zns_phone_normalized', 'zns_birthday_key'])
+        self.env['zns.negative.cache'].flush(['phone', 'expires_at'])
+        self.env['zns.bom.marketing.opt.out'].flush(['contact_id', 'active', 'global_opt_out', 'campaign_types'])
+        self.env['zns.bom.marketing.message'].flush(['campaign_id', 'contact_id', 'status'])
+        campaign.flush(['contact_list_ids', 'excluded_contact_ids'])
+        
+        birthday_sql, birthday_params = Partner._search(Partner._get_birthday_domain(target_date)).subselect()
+        conditions = [f"partner.id IN ({birthday_sql})", "partner.zns_phone_state = 'valid'"]
+        params = list(birthday_params)
+        if campaign.contact_list_ids:
+            campaign.contact_list_ids.flush(['contact_ids'])
+            conditions.append("""EXISTS (
+                SELECT 1 FROM zns_bom_marketing_list_contact_rel rel
+                WHERE rel.contact_id = partner.id AND rel.list_id IN %s
+            )""")
+            params.append(tuple(campaign.contact_list_ids.ids))
+        
+        self.env.cr.execute(f"""
+            SELECT partner.id
+            FROM res_partner partner
+            WHERE {' AND '.join(conditions)}
+              AND NOT EXISTS (
+                  SELECT 1 FROM zns_bom_marketing_campaign_excluded_rel excluded
+                  WHERE excluded.campaign_id = %s AND excluded.contact_id = partner.id
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM zns_bom_marketing_opt_out opt_out
+                  WHERE opt_out.contact_id = partner.id
+                    AND opt_out.active
+                    AND (opt_out.global_opt_out OR opt_out.campaign_types = 'birthday')
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM zns_bom_marketing_message m
+                  WHERE m.contact_id = partner.id
+                    AND m.campaign_id = %s
+                    AND m.create_date >= %s
+                    AND m.status NOT IN ('failed', 'skipped')
+              )
+              AND NOT EXISTS (
+                  SELECT 1 FROM zns_negative_cache cache
+                  WHERE cache.phone = partner.zns_phone_normalized
+                    AND cache.expires_at > %s
+              )
+            ORDER BY partner.id
+        """, params + [campaign.id, campaign.id, fields.Date.today().replace(month=1, day=1),
+                      fields.Datetime.now()])
+        contacts = Partner.browse([row[0] for row in self.env.cr.fetchall()])
+        _logger.info(f"Found {len(contacts)} eligible contacts with birthday on {target_date} for '{campaign.name}'")
+        return contacts
     
     def _queue_birthday_message(self, campaign, contact):
         """Queue birthday message for contact using BOM ZNS Simple"""
-        # Format phone number
-        phone = contact.mobile or contact.phone
+        # Use stored normalized phone
+        phone = contact.zns_phone_normalized
         if not phone:
             return
-            
-        # Clean phone number
-        phone = self._clean_phone_number(phone)
         
         # Build parameters for BOM ZNS template
         params = self._build_birthday_parameters(contact, campaign.bom_zns_template_id)
@@ -142,42 +157,42 @@ class ZnsBomMarketingScheduler(models.Model):
             
             bom_zns_message = self.env['bom.zns.message'].create(bom_zns_message_data)
             
-            # Create campaign tracking record
-            campaign_message = self.env['zns.bom.marketing.message'].create({
+            # Schedule sending at specified time
+            send_datetime = self._get_birthday_send_datetime(campaign)
+            send_now = fields.Datetime.now() >= send_datetime
+            
+            # Create campaign tracking record, deferred ones wait in the queue until due
+            campaign_message_data = {
                 'campaign_id': campaign.id,
                 'bom_zns_message_id': bom_zns_message.id,
                 'contact_id': contact.id,
                 'phone_number': phone,
                 'message_parameters': json.dumps(params) if params else '{}',
                 'status': 'queued'
-            })
-            
-            # Schedule sending at specified time
-            send_time = campaign.birthday_send_time or 9.0
-            send_datetime = datetime.combine(
-                fields.Date.today(), 
-                time(hour=int(send_time), minute=int((send_time % 1) * 60))
-            )
+            }
+            if not send_now:
+                campaign_message_data.update(scheduled_at=send_datetime, queued_date=send_datetime)
+            campaign_message = self.env['zns.bom.marketing.message'].create(campaign_message_data)
             
             # If send time has passed today, send now
-            if datetime.now().time() >= send_datetime.time():
+            if send_now:
                 self._send_birthday_message(bom_zns_message, campaign_message)
-            else:
-                # Schedule for later today
-                self.env['ir.cron'].create({
-                    'name': f'Send Birthday ZNS - {contact.name}',
-                    'model_id': self.env.ref('zns_bom_marketing.model_zns_bom_marketing_scheduler').id,
-                    'state': 'code',
-                    'code': f'model._send_scheduled_message({bom_zns_message.id}, {campaign_message.id})',
-                    'nextcall': send_datetime,
-                    'numbercall': 1,
-                })
                 
             _logger.info(f"Birthday message queued for {contact.name} - Phone: {phone}")
             
         except Exception as e:
             _logger.error(f"Failed to queue birthday message for {contact.name}: {e}")
     
+    def _get_birthday_send_datetime(self, campaign):
+        """Get today's birthday send time in the campaign's timezone (else the user's) as naive UTC"""
+        tz = pytz.timezone(self.env['zns.timeseries']._get_tz_name(campaign.timezone))
+        send_time = campaign.birthday_send_time or 9.0
+        local_send = tz.localize(datetime.combine(
+            datetime.now(tz).date(),
+            time(hour=int(send_time), minute=int((send_time % 1) * 60))
+        ))
+        return local_send.astimezone(pytz.utc).replace(tzinfo=None)
+    
     def _get_connection_id(self, campaign):
         """Get connection ID for the campaign"""
         connection_id = False
@@ -199,8 +214,26 @@ class ZnsBomMarketingScheduler(models.Model):
         
         return connection_id
     
+    def _skip_rejected_phone(self, campaign_message):
+        """Skip message if BOM already rejected its phone (negative cache in bom_zns_simple)"""
+        if 'zns.negative.cache' not in self.env:
+            return False
+        
+        cached = self.env['zns.negative.cache'].check_phone(campaign_message.phone_number)
+        if not cached:
+            return False
+        
+        campaign_message.write({
+            'status': 'skipped',
+            'error_message': f"Phone previously rejected by BOM ({cached.error_code}: {cached.error_message})"
+        })
+        if cached.error_class == 'not_on_zalo':
+            campaign_message.contact_id._mark_zns_not_on_zalo()
+        return True
+    
     def _send_birthday_message(self, bom_zns_message, campaign_message):
         """Send birthday message using BOM ZNS Simple system"""
+        started = perf_counter()
         try:
             # Update status to sending
             campaign_message.write({'status': 'sending'})
@@ -222,10 +255,13 @@ class ZnsBomMarketingScheduler(models.Model):
                     raise Exception("No send method found in bom_zns_simple")
             
             # Update campaign message status based on result
+            sent_date = fields.Datetime.now()
             campaign_message.write({
                 'status': 'sent',
-                'sent_date': fields.Datetime.now()
+                'sent_date': sent_date,
+                'send_duration': perf_counter() - started,
             })
+            self._record_send_latency(bom_zns_message, campaign_message, sent_date)
             
             _logger.info(f"Birthday message sent successfully via BOM ZNS Simple")
             
@@ -233,8 +269,25 @@ class ZnsBomMarketingScheduler(models.Model):
             _logger.error(f"Failed to send birthday message via BOM ZNS Simple: {e}")
             campaign_message.write({
                 'status': 'failed',
-                'error_message': str(e)
+                'error_message': str(e),
+                'send_duration': perf_counter() - started,
             })
+            
+            # Flag contact if BOM says the phone is not on Zalo
+            if 'zns.negative.cache' in self.env:
+                error_class = self.env['zns.negative.cache'].classify_error(None, str(e))
+                if error_class == 'not_on_zalo':
+                    campaign_message.contact_id._mark_zns_not_on_zalo()
+    
+    def _record_send_latency(self, bom_zns_message, campaign_message, sent_date):
+        """Add the queued-to-sent latency to the BOM ZNS latency histogram"""
+        if 'zns.latency.histogram' not in self.env or not campaign_message.queued_date:
+            return
+        connection_id = bom_zns_message.connection_id.id if 'connection_id' in bom_zns_message._fields else None
+        template_id = bom_zns_message.template_id.id if 'template_id' in bom_zns_message._fields else None
+        queue_latency_ms = (sent_date - campaign_message.queued_date).total_seconds() * 1000
+        self.env['zns.latency.histogram'].sudo().record_samples(
+            [('campaign_queue', connection_id, template_id, queue_latency_ms)])
     
     def _build_birthday_parameters(self, contact, bom_template):
         """Build birthday-specific parameters for BOM ZNS template"""
@@ -267,24 +320,8 @@ class ZnsBomMarketingScheduler(models.Model):
         
         return birthday_params
     
-    def _clean_phone_number(self, phone):
-        """Clean phone number format"""
-        if not phone:
-            return phone
-            
-        # Remove spaces, dashes, parentheses
-        phone = re.sub(r'[\s\-\(\)]', '', phone)
-        
-        # Handle Vietnamese phone numbers
-        if phone.startswith('0'):
-            phone = '+84' + phone[1:]
-        elif not phone.startswith('+'):
-            phone = '+84' + phone
-            
-        return phone
-    
     def _send_scheduled_message(self, zns_message_id, campaign_message_id):
-        """Send scheduled message (called by cron job)"""
+        """Send scheduled message (called by per-message cron jobs created before scheduled_at existed)"""
         bom_zns_message = self.env['bom.zns.message'].browse(zns_message_id)
         campaign_message = self.env['zns.bom.marketing.message'].browse(campaign_message_id)
         
@@ -308,7 +345,7 @@ class ZnsBomMarketingScheduler(models.Model):
         for campaign in scheduled_campaigns:
             try:
                 campaign.status = 'running'
-                campaign._execute_campaign()
+                campaign._execute_campaign(auto_commit=True)
                 processed += 1
                 _logger.info(f"Executed scheduled campaign: {campaign.name}")
             except Exception as e:
@@ -318,33 +355,218 @@ class ZnsBomMarketingScheduler(models.Model):
         _logger.info(f"=== Processed {processed} scheduled campaigns ===")
         return processed
     
+    @api.model
+    def resume_interrupted_campaigns(self):
+        """Cron job: Resume campaign fan-outs whose worker stopped before finishing"""
+        stale_minutes = int(self.env['ir.config_parameter'].sudo().get_param(
+            'zns_bom_marketing.fanout_stale_minutes', '10'))
+        # A live fan-out checkpoints every chunk, so a stale checkpoint means the worker died
+        stale_before = fields.Datetime.now() - timedelta(minutes=stale_minutes)
+        interrupted = self.env['zns.bom.marketing.campaign'].search([
+            ('status', '=', 'running'),
+            ('fanout_state', '=', 'running'),
+            ('fanout_checkpoint_date', '<', stale_before)
+        ])
+        
+        resumed = 0
+        for campaign in interrupted:
+            # Skip campaigns a slow chunk still holds, or checkpointed since the search
+            if campaign._lock_fanout_checkpoint(stale_before=stale_before) is None:
+                continue
+            try:
+                campaign._execute_campaign(auto_commit=True)
+                resumed += 1
+            except Exception as e:
+                _logger.error(f"Failed to resume campaign {campaign.name}: {e}")
+        
+        _logger.info(f"=== Resumed {resumed} interrupted campaigns ===")
+        return resumed
+    
     @api.model
     def process_message_queue(self):
-        """Process queued messages"""
+        """Drain the queue in leased batches until empty or out of time, safe to run on several workers"""
         _logger.info("=== Processing Message Queue ===")
+        Message = self.env['zns.bom.marketing.message']
+        auto_commit = not getattr(threading.current_thread(), 'testing', False)
+        get_param = self.env['ir.config_parameter'].sudo().get_param
+        try:
+            lease_seconds = max(int(get_param('zns_bom_marketing.queue_lease_seconds', '300')), 1)
+            time_budget = max(int(get_param('zns_bom_marketing.queue_time_budget_seconds', '240')), 1)
+            batch_size = max(int(get_param('zns_bom_marketing.queue_batch_size', '100')), 1)
+        except ValueError:
+            lease_seconds, time_budget, batch_size = 300, 240, 100
+        owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:8]}"
         
-        # Find queued messages
-        queued_messages = self.env['zns.bom.marketing.message'].search([
-            ('status', '=', 'queued')
-        ], limit=100)  # Process in batches
+        Message._reclaim_expired_leases()
         
+        started = perf_counter()
+        deadline = started + time_budget
         processed = 0
-        for message in queued_messages:
+        out_of_time = False
+        while True:
+            # Claim a fair batch across connections and lanes, commit so other workers skip it
+            queued_messages = self._claim_fair_batch(owner, batch_size, lease_seconds)
+            if auto_commit:
+                self.env.cr.commit()
+            if not queued_messages:
+                break
+            
+            sent, failed, skipped, elapsed, out_of_time = self._dispatch_batch(queued_messages, owner, lease_seconds,
+                                                                              deadline, auto_commit)
+            processed += sent
+            if out_of_time:
+                break
+            batch_size = self._adapt_batch_size(batch_size, sent + failed + skipped, failed, elapsed, deadline)
+        
+        # Hand unsent claims back and run again right away while backlog remains
+        cron = self.env.ref('zns_bom_marketing.cron_message_processor')
+        if out_of_time:
+            Message._release_leases(owner)
+            if auto_commit:
+                self.env.cr.commit()
+            cron._trigger()
+        elif Message._get_lane_backlog():
+            # Budgets held back the remaining backlog, look again once some quota has freed up
+            try:
+                retry_seconds = max(int(get_param('zns_bom_marketing.queue_blocked_retry_seconds', '300')), 1)
+            except ValueError:
+                retry_seconds = 300
+            cron._trigger(at=fields.Datetime.now() + timedelta(seconds=retry_seconds))
+            _logger.info(f"⏳ Queue backlog blocked by hourly budgets, retrying in {retry_seconds}s")
+        
+        _logger.info(f"=== Processed {processed} queued messages in {perf_counter() - started:.1f}s ({owner}) ===")
+        return processed
+    
+    def _dispatch_batch(self, messages, owner, lease_seconds, deadline, auto_commit):
+        """Send claimed messages until done or past deadline, return (sent, failed, skipped, elapsed, out_of_time)"""
+        started = perf_counter()
+        sent = failed = skipped = 0
+        for message in messages:
+            if perf_counter() >= deadline:
+                return sent, failed, skipped, perf_counter() - started, True
+            # Another worker took over after our lease expired
+            if not message._renew_lease(owner, lease_seconds):
+                continue
             try:
                 self._send_campaign_message(message)
-                processed += 1
+                # Only BOM-accepted sends count, skipped phones are neither sent nor failed
+                if message.status == 'sent':
+                    sent += 1
+                elif message.status == 'failed':
+                    failed += 1
+                else:
+                    skipped += 1
             except Exception as e:
                 _logger.error(f"Failed to send message {message.id}: {e}")
                 message.write({
                     'status': 'failed',
                     'error_message': str(e)
                 })
+                failed += 1
+            # Commit each send so a later crash cannot roll back a message BOM already delivered
+            if auto_commit:
+                self.env.cr.commit()
+        return sent, failed, skipped, perf_counter() - started, False
+    
+    @api.model
+    def _adapt_batch_size(self, batch_size, attempted, failed, elapsed, deadline):
+        """Size the next batch to take about BATCH_TARGET_SECONDS at the observed send rate"""
+        if not attempted:
+            return batch_size
+        seconds_per_message = elapsed / attempted
+        target = BATCH_TARGET_SECONDS / seconds_per_message if seconds_per_message > 0 else BATCH_SIZE_MAX
+        # Back off while BOM is failing, and never claim more than the remaining time can send
+        if failed / attempted > BATCH_ERROR_RATE_LIMIT:
+            target = min(target, batch_size / 2)
+        if seconds_per_message > 0:
+            target = min(target, max(deadline - perf_counter(), 0) / seconds_per_message)
+        return int(min(max(target, BATCH_SIZE_MIN), BATCH_SIZE_MAX))
+    
+    def _claim_fair_batch(self, owner, batch_size, lease_seconds):
+        """Claim up to batch_size messages, split by weight across lanes of each connection
         
-        _logger.info(f"=== Processed {processed} queued messages ===")
-        return processed
+        A lane whose oldest message is past its SLO gets its weight boosted, and a connection
+        only gets what its hourly budget leaves after transactional traffic.
+        """
+        Message = self.env['zns.bom.marketing.message']
+        settings = Message._get_lane_settings()
+        backlog = Message._get_lane_backlog()
+        if not backlog:
+            return Message
+        
+        connection_ids = {connection_id for connection_id, _lane in backlog}
+        budgets = self._get_connection_budgets(connection_ids)
+        per_connection = math.ceil(batch_size / len(connection_ids))
+        now = fields.Datetime.now()
+        
+        claimed = Message
+        for connection_id in connection_ids:
+            budget = budgets.get(connection_id)
+            limit = per_connection if budget is None else min(per_connection, budget)
+            if limit <= 0:
+                continue
+            
+            weights = {}
+            for lane, lane_settings in settings.items():
+                if (connection_id, lane) not in backlog:
+                    continue
+                oldest = backlog[(connection_id, lane)][1]
+                behind = oldest and (now - oldest).total_seconds() > lane_settings['slo']
+                weights[lane] = lane_settings['weight'] * (SLO_BREACH_BOOST if behind else 1)
+            total_weight = sum(weights.values())
+            
+            # Each lane takes its weighted share, unused share spills to the next lane
+            remaining = limit
+            for lane in sorted(weights, key=weights.get, reverse=True):
+                share = max(math.ceil(limit * weights[lane] / total_weight), 1)
+                messages = Message._claim_queued(owner, min(share, remaining), lease_seconds, lane=lane,
+                                                 connection_id=connection_id, filter_connection=True)
+                claimed |= messages
+                remaining -= len(messages)
+                if remaining <= 0:
+                    break
+            if remaining > 0:
+                claimed |= Message._claim_queued(owner, remaining, lease_seconds,
+                                                 connection_id=connection_id, filter_connection=True)
+        
+        # Send priority lane first within the batch
+        return claimed.sorted(lambda message: (message.lane != 'priority', message.id))
+    
+    def _get_connection_budgets(self, connection_ids):
+        """Get messages marketing may still send this hour per connection (None = unlimited)
+        
+        Transactional order/invoice traffic always gets at least its reserved share of the quota.
+        """
+        connection_ids = [connection_id for connection_id in connection_ids if connection_id]
+        if 'zns.connection' not in self.env or not connection_ids:
+            return {}
+        connections = self.env['zns.connection'].browse(connection_ids).exists().filtered('hourly_quota')
+        if not connections:
+            return {}
+        
+        transactional_used = self.env['zns.connection'].get_hourly_usage(connections.ids)
+        self.env['zns.bom.marketing.message'].flush(['sent_date', 'campaign_id'])
+        self.env.cr.execute("""
+            SELECT c.bom_zns_connection_id, COUNT(*)
+            FROM zns_bom_marketing_message m
+            JOIN zns_bom_marketing_campaign c ON c.id = m.campaign_id
+            WHERE m.sent_date >= %s AND c.bom_zns_connection_id IN %s
+            GROUP BY c.bom_zns_connection_id
+        """, (fields.Datetime.now() - timedelta(hours=1), tuple(connections.ids)))
+        marketing_used = dict(self.env.cr.fetchall())
+        
+        budgets = {}
+        for connection in connections:
+            reserve = connection.hourly_quota * connection.transactional_reserve // 100
+            transactional = max(transactional_used.get(connection.id, 0), reserve)
+            budgets[connection.id] = max(connection.hourly_quota - transactional - marketing_used.get(connection.id, 0), 0)
+        return budgets
     
     def _send_campaign_message(self, campaign_message):
         """Send a campaign message"""
+        if self._skip_rejected_phone(campaign_message):
+            return
+        
         if not campaign_message.bom_zns_message_id:
             # Create BOM ZNS message if not exists
             params = json.loads(campaign_message.message_parameters) if campaign_message.message_parameters else {}
@@ -424,7 +646,7 @@ class ZnsBomMarketingScheduler(models.Model):
             return
         
         # Execute campaign
-        campaign._execute_campaign()
+        campaign._execute_campaign(auto_commit=True)
         
         # Update run dates
         campaign.write({
@@ -499,14 +721,10 @@ class ZnsBomMarketingScheduler(models.Model):
     
     @api.model
     def update_campaign_statistics(self):
-        """Update campaign statistics"""
-        campaigns = self.env['zns.bom.marketing.campaign'].search([
-            ('status', 'in', ['running', 'completed'])
-        ])
+        """Cron job: Verify delta-maintained campaign counters against the messages"""
+        corrected = self.env['zns.bom.marketing.campaign']._reconcile_counters()
         
-        for campaign in campaigns:
-            # Trigger computation of statistics
-            campaign._compute_progress()
-            campaign._compute_analytics()
+        # Correct any drift of the live dashboard gauges
+        self.env['zns.bom.marketing.live.counter']._reconcile_gauges()
         
-        return len(campaigns)
\ No newline at end of file
+        return corrected
\ No newline at end of file
@@ -0,0 +1,40 @@
+/** @odoo-module **/
+
+import AbstractService from "web.AbstractService";
+import core from "web.core";
+
+// Must match LIVE_CHANNEL in models/zns_bom_marketing_live.py
+const LIVE_CHANNEL = "zns_bom_marketing_live";
+const REFRESH_INTERVAL = 2000;
+
+/**
+ * Listens for the live counters pushed when campaign messages change and re-broadcasts
+ * them on core.bus as "zns_bom_marketing_live_counters", at most once per interval.
+ */
+const ZnsBomMarketingLiveService = AbstractService.extend({
+    dependencies: ["bus_service"],
+
+    start() {
+        this._super(...arguments);
+        this._publish = _.throttle(this._publish.bind(this), REFRESH_INTERVAL);
+        this.call("bus_service", "addChannel", LIVE_CHANNEL);
+        this.call("bus_service", "onNotification", this, this._onNotification);
+        this.call("bus_service", "startPolling");
+    },
+
+    _onNotification(notifications) {
+        for (const { type, payload } of notifications) {
+            if (type === "zns_bom_marketing/live_counters") {
+                this._publish(payload);
+            }
+        }
+    },
+
+    _publish(counters) {
+        core.bus.trigger("zns_bom_marketing_live_counters", counters);
+    },
+});
+
+core.serviceRegistry.add("zns_bom_marketing_live", ZnsBomMarketingLiveService);
+
+export default ZnsBomMarketingLiveService;
@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+from . import test_queue_dispatch
+from . import test_campaign_fanout
+from . import test_opt_out
+from . import test_live_counters
+from . import test_recipient_selection
+from . import test_birthday
+from . import test_partner_phone
+from . import test_queue_lease
+from . import test_campaign_counters
@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class ZnsMarketingTestCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Partner = cls.env['res.partner']
+        cls.partner_a = Partner.create({'name': 'Contact A', 'mobile': '0912000001'})
+        cls.partner_b = Partner.create({'name': 'Contact B', 'mobile': '0912000002'})
+        cls.partner_c = Partner.create({'name': 'Contact C', 'mobile': '0912000003'})
+        cls.contact_list = cls.env['zns.bom.marketing.contact.list'].create({
+            'name': 'Test List',
+            'contact_ids': [(6, 0, (cls.partner_a | cls.partner_b | cls.partner_c).ids)],
+        })
+
+    def _create_campaign(self, **vals):
+        return self.env['zns.bom.marketing.campaign'].create(dict({
+            'name': 'Test Campaign',
+            'campaign_type': 'promotion',
+            'contact_list_ids': [(6, 0, self.contact_list.ids)],
+        }, **vals))
+
+    def _create_message(self, campaign, partner, **vals):
+        return self.env['zns.bom.marketing.message'].create(dict({
+            'campaign_id': campaign.id,
+            'contact_id': partner.id,
+            'phone_number': partner.zns_phone_normalized,
+        }, **vals))
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date, datetime, time
+
+import pytz
+
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestBirthday(ZnsMarketingTestCommon):
+
+    def test_birthday_key_follows_birthday(self):
+        self.partner_a.birthday = date(1990, 12, 31)
+        self.assertEqual(self.partner_a.zns_birthday_key, 1231)
+        self.partner_a.birthday = False
+        self.assertEqual(self.partner_a.zns_birthday_key, 0)
+
+    def test_birthday_domain_wraps_over_year_end(self):
+        Partner = self.env['res.partner']
+        self.partner_a.birthday = date(1990, 12, 31)
+        self.partner_b.birthday = date(1985, 1, 1)
+        self.partner_c.birthday = date(1980, 6, 15)
+        partners = self.partner_a | self.partner_b | self.partner_c
+
+        found = Partner.search([('id', 'in', partners.ids)] + Partner._get_birthday_domain(date(2026, 12, 31), days=2))
+        self.assertEqual(found, self.partner_a | self.partner_b)
+
+    def test_feb_29_celebrated_on_feb_28(self):
+        Partner = self.env['res.partner']
+        self.partner_a.birthday = date(2000, 2, 29)
+        found = Partner.search([('id', '=', self.partner_a.id)] + Partner._get_birthday_domain(date(2027, 2, 28)))
+        self.assertEqual(found, self.partner_a)
+
+    def test_birthday_recipients_exclude_opted_out_and_messaged(self):
+        target_date = date(2026, 7, 14)
+        for partner in (self.partner_a, self.partner_b, self.partner_c):
+            partner.birthday = date(1990, 7, 14)
+        campaign = self._create_campaign(campaign_type='birthday')
+        self.env['zns.bom.marketing.opt.out'].create({
+            'contact_id': self.partner_b.id, 'opt_out_reason': 'manual',
+            'global_opt_out': False, 'campaign_types': 'birthday',
+        })
+        self._create_message(campaign, self.partner_c, status='sent')
+        # A failed attempt does not count as this year's message
+        self._create_message(campaign, self.partner_a, status='failed')
+
+        Scheduler = self.env['zns.bom.marketing.scheduler']
+        self.assertEqual(Scheduler._get_birthday_recipients(campaign, target_date), self.partner_a)
+
+        campaign.excluded_contact_ids = self.partner_a
+        self.assertFalse(Scheduler._get_birthday_recipients(campaign, target_date))
+
+    def test_birthday_recipients_exclude_rejected_phones(self):
+        target_date = date(2026, 7, 14)
+        for partner in (self.partner_a, self.partner_b):
+            partner.birthday = date(1990, 7, 14)
+        campaign = self._create_campaign(campaign_type='birthday')
+        self.env['zns.negative.cache'].record_rejection(self.partner_b.mobile, '-118', 'Not a Zalo user')
+
+        Scheduler = self.env['zns.bom.marketing.scheduler']
+        self.assertEqual(Scheduler._get_birthday_recipients(campaign, target_date), self.partner_a)
+
+    def test_birthday_send_time_in_campaign_timezone(self):
+        campaign = self._create_campaign(campaign_type='birthday', timezone='Asia/Ho_Chi_Minh', birthday_send_time=9.5)
+        local_today = datetime.now(pytz.timezone('Asia/Ho_Chi_Minh')).date()
+
+        send_datetime = self.env['zns.bom.marketing.scheduler']._get_birthday_send_datetime(campaign)
+        # 09:30 in UTC+7 is 02:30 UTC
+        self.assertEqual(send_datetime, datetime.combine(local_today, time(2, 30)))
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCampaignCounters(ZnsMarketingTestCommon):
+
+    def _counters(self, campaign):
+        # Deltas are applied when the transaction commits
+        self.env.cr.precommit.run()
+        return (campaign.messages_total, campaign.messages_queued, campaign.messages_sent,
+                campaign.messages_delivered, campaign.messages_failed)
+
+    def test_counters_follow_message_changes(self):
+        campaign = self._create_campaign()
+        first = self._create_message(campaign, self.partner_a, message_cost=1.5)
+        second = self._create_message(campaign, self.partner_b, message_cost=1.5)
+        third = self._create_message(campaign, self.partner_c)
+        self.assertEqual(self._counters(campaign), (3, 3, 0, 0, 0))
+        self.assertEqual(campaign.total_cost, 3.0)
+
+        first.status = 'delivered'
+        second.status = 'failed'
+        self.assertEqual(self._counters(campaign), (3, 1, 1, 1, 1))
+        self.assertAlmostEqual(campaign.progress_percentage, 200 / 3)
+        self.assertAlmostEqual(campaign.failure_rate, 100 / 3)
+
+        third.unlink()
+        self.assertEqual(self._counters(campaign), (2, 0, 1, 1, 1))
+        self.assertEqual(campaign.progress_percentage, 100)
+
+        # Moving a message to another campaign moves its contribution
+        other = self._create_campaign(name='Other Campaign')
+        first.campaign_id = other
+        self.assertEqual(self._counters(campaign), (1, 0, 0, 0, 1))
+        self.assertEqual(self._counters(other), (1, 0, 1, 1, 0))
+        self.assertEqual(self.env['zns.bom.marketing.campaign']._reconcile_counters(), 0)
+
+    def test_deltas_wait_for_commit(self):
+        """Message writes do not touch the campaign row before the transaction commits"""
+        campaign = self._create_campaign()
+        self.env.cr.precommit.run()
+        message = self._create_message(campaign, self.partner_a)
+        message.status = 'sent'
+        self.env.cr.execute("SELECT messages_total FROM zns_bom_marketing_campaign WHERE id = %s", (campaign.id,))
+        self.assertEqual(self.env.cr.fetchone()[0], 0)
+        self.assertEqual(self._counters(campaign), (1, 0, 1, 0, 0))
+
+    def test_reconcile_corrects_drift(self):
+        campaign = self._create_campaign()
+        self._create_message(campaign, self.partner_a)
+        self.env.cr.execute("UPDATE zns_bom_marketing_campaign SET messages_total = 5 WHERE id = %s", (campaign.id,))
+        campaign.invalidate_cache()
+
+        self.assertEqual(self.env['zns.bom.marketing.campaign']._reconcile_counters(), 1)
+        self.assertEqual(campaign.messages_total, 1)
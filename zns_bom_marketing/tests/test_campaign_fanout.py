@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+import threading
+from datetime import timedelta
+from unittest.mock import patch
+
+from odoo import fields, sql_db
+from odoo.tests import tagged
+
+from odoo.addons.zns_bom_marketing.models.zns_bom_marketing_campaign import FANOUT_LOCK_NAMESPACE
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestCampaignFanout(ZnsMarketingTestCommon):
+
+    def _message_counts(self, campaign):
+        counts = {}
+        for message in campaign.message_ids:
+            counts[message.contact_id] = counts.get(message.contact_id, 0) + 1
+        return counts
+
+    def test_fanout_creates_one_message_per_recipient(self):
+        campaign = self._create_campaign(status='running')
+        campaign._execute_campaign()
+
+        self.assertEqual(campaign.fanout_state, 'done')
+        self.assertEqual(self._message_counts(campaign),
+                         {self.partner_a: 1, self.partner_b: 1, self.partner_c: 1})
+
+    def test_fanout_commits_chunks_only_from_cron(self):
+        """Chunks are committed for cron runs, an interactive start keeps one transaction"""
+        self.env['ir.config_parameter'].sudo().set_param('zns_bom_marketing.fanout_chunk_size', '2')
+        self.partner_c.active = False
+        campaign = self._create_campaign(status='running')
+        with patch.object(threading.current_thread(), 'testing', False), \
+                patch.object(self.env.cr, 'commit') as commit:
+            campaign._execute_campaign()
+            self.assertFalse(commit.called)
+
+            campaign.fanout_state = 'done'
+            campaign.message_ids.unlink()
+            campaign._execute_campaign(auto_commit=True)
+            self.assertTrue(commit.called)
+
+        # Archived contacts are not messaged
+        self.assertEqual(self._message_counts(campaign), {self.partner_a: 1, self.partner_b: 1})
+
+    def test_fresh_checkpoint_is_not_resumed(self):
+        """The resume lock only takes campaigns whose checkpoint is stale"""
+        campaign = self._create_campaign(status='running')
+        campaign.write({'fanout_state': 'running', 'fanout_checkpoint_date': fields.Datetime.now()})
+
+        stale_before = fields.Datetime.now() - timedelta(minutes=10)
+        self.assertIsNone(campaign._lock_fanout_checkpoint(stale_before=stale_before))
+        self.assertEqual(self.env['zns.bom.marketing.scheduler'].resume_interrupted_campaigns(), 0)
+        self.assertFalse(campaign.message_ids)
+
+    def test_fanout_skipped_while_another_worker_holds_the_lock(self):
+        """A worker holding the campaign's fan-out lock keeps others from fanning it out"""
+        campaign = self._create_campaign(status='running')
+        self._create_message(campaign, self.partner_a)
+
+        with sql_db.db_connect(self.env.cr.dbname).cursor() as other_cr:
+            other_cr.execute("SELECT pg_advisory_xact_lock(%s, %s)", (FANOUT_LOCK_NAMESPACE, campaign.id))
+            self.assertIsNone(campaign._lock_fanout_checkpoint())
+            campaign._execute_campaign()
+            self.assertEqual(len(campaign.message_ids), 1)
+            other_cr.rollback()
+        self.assertIsNotNone(campaign._lock_fanout_checkpoint())
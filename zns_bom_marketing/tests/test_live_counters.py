@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.addons.zns_bom_marketing.models.zns_bom_marketing_live import LIVE_CHANNEL
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestLiveCounters(ZnsMarketingTestCommon):
+
+    def test_deltas_applied_once_on_precommit(self):
+        Counter = self.env['zns.bom.marketing.live.counter']
+        Counter._reconcile_gauges()
+        before = Counter.get_counters()
+
+        Counter.add_deltas({'created': 2, 'sent': 1})
+        Counter.add_deltas({'created': 1, 'failed': 1, 'queued': 0})
+        # Nothing is written until the transaction commits
+        self.assertEqual(Counter.get_counters(), before)
+
+        with patch.object(type(self.env['bus.bus']), '_sendone') as sendone:
+            self.env.cr.precommit.run()
+        sendone.assert_called_once()
+        self.assertEqual(sendone.call_args[0][0], LIVE_CHANNEL)
+        after = Counter.get_counters()
+        self.assertEqual(after['recent_messages'], before['recent_messages'] + 3)
+        self.assertEqual(after['sent_last_hour'], before['sent_last_hour'] + 1)
+        self.assertEqual(after['failed_last_hour'], before['failed_last_hour'] + 1)
+        self.assertEqual(after['queued_messages'], before['queued_messages'])
+
+    def test_dashboard_reads_counters(self):
+        stats = self.env['zns.bom.marketing.dashboard'].get_real_time_stats()
+        self.assertEqual(stats['live_channel'], LIVE_CHANNEL)
+        self.assertIn('sent_last_hour', stats)
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+from odoo.exceptions import ValidationError
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestOptOut(ZnsMarketingTestCommon):
+
+    def test_opted_out_ids_by_scope(self):
+        OptOut = self.env['zns.bom.marketing.opt.out']
+        OptOut.create({'contact_id': self.partner_a.id, 'opt_out_reason': 'manual'})
+        OptOut.create({'contact_id': self.partner_b.id, 'opt_out_reason': 'manual',
+                       'global_opt_out': False, 'campaign_types': 'promotion'})
+        contact_ids = (self.partner_a | self.partner_b | self.partner_c).ids
+
+        self.assertEqual(OptOut.opted_out_ids(contact_ids), {self.partner_a.id})
+        self.assertEqual(OptOut.opted_out_ids(contact_ids, 'promotion'), {self.partner_a.id, self.partner_b.id})
+        self.assertTrue(OptOut.check_opt_out_status(self.partner_b.id, 'promotion'))
+        self.assertFalse(OptOut.check_opt_out_status(self.partner_b.id, 'birthday'))
+
+    def test_cache_follows_committed_changes(self):
+        """After commit the cached set is read under a new version and sees the change"""
+        OptOut = self.env['zns.bom.marketing.opt.out']
+        self.assertFalse(OptOut.opted_out_ids([self.partner_c.id]))
+        opt_out = OptOut.create({'contact_id': self.partner_c.id, 'opt_out_reason': 'manual'})
+        self.env.cr.postcommit.run()
+        self.assertEqual(OptOut.opted_out_ids([self.partner_c.id]), {self.partner_c.id})
+
+        opt_out.action_resubscribe()
+        self.env.cr.postcommit.run()
+        self.assertFalse(OptOut.opted_out_ids([self.partner_c.id]))
+
+    def test_bulk_opt_out_skips_existing(self):
+        OptOut = self.env['zns.bom.marketing.opt.out']
+        OptOut.create({'contact_id': self.partner_a.id, 'opt_out_reason': 'manual'})
+
+        created = OptOut.bulk_opt_out([self.partner_a.id, self.partner_b.id, self.partner_b.id], 'bounced')
+        self.assertEqual(created, 1)
+        self.assertEqual(OptOut.search_count([('contact_id', '=', self.partner_b.id)]), 1)
+
+    def test_duplicate_scope_is_rejected(self):
+        OptOut = self.env['zns.bom.marketing.opt.out']
+        OptOut.create({'contact_id': self.partner_a.id, 'opt_out_reason': 'manual'})
+        with self.assertRaises(ValidationError):
+            OptOut.create({'contact_id': self.partner_a.id, 'opt_out_reason': 'complaint'})
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPartnerPhone(ZnsMarketingTestCommon):
+
+    def test_normalize_zns_phone(self):
+        Partner = self.env['res.partner']
+        self.assertEqual(Partner._normalize_zns_phone('0912 000 001'), '+84912000001')
+        self.assertEqual(Partner._normalize_zns_phone('+84 912-000-001'), '+84912000001')
+        self.assertEqual(Partner._normalize_zns_phone('84912000001'), '+84912000001')
+        self.assertFalse(Partner._normalize_zns_phone('12345'))
+        self.assertFalse(Partner._normalize_zns_phone(False))
+
+    def test_phone_state_follows_numbers(self):
+        partner = self.env['res.partner'].create({'name': 'No Mobile', 'mobile': 'n/a', 'phone': '0243 123 4567'})
+        self.assertEqual(partner.zns_phone_normalized, '+842431234567')
+        self.assertEqual(partner.zns_phone_state, 'valid')
+        partner.phone = False
+        self.assertEqual(partner.zns_phone_state, 'invalid')
+
+    def test_not_on_zalo_kept_until_number_changes(self):
+        self.partner_a._mark_zns_not_on_zalo()
+        self.assertEqual(self.partner_a.zns_phone_state, 'not_on_zalo')
+
+        # Recomputing for an unrelated reason keeps the flag
+        self.partner_a.phone = '0243 123 4567'
+        self.assertEqual(self.partner_a.zns_phone_state, 'not_on_zalo')
+
+        self.partner_a.mobile = '0912000009'
+        self.assertEqual(self.partner_a.zns_phone_state, 'valid')
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+
+from time import perf_counter
+from unittest.mock import patch
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestQueueDispatch(ZnsMarketingTestCommon):
+
+    def test_dispatch_counts_only_successful_sends(self):
+        """Skipped messages are neither counted as sent nor as failed"""
+        campaign = self._create_campaign()
+        skipped = self._create_message(campaign, self.partner_a)
+        delivered = self._create_message(campaign, self.partner_b)
+        Message = self.env['zns.bom.marketing.message']
+        claimed = Message._claim_queued('test-owner', 10, 300)
+        self.assertEqual(claimed, skipped | delivered)
+
+        def fake_send(scheduler, message):
+            message.write({'status': 'skipped' if message == skipped else 'sent'})
+
+        Scheduler = self.env['zns.bom.marketing.scheduler']
+        with patch.object(type(Scheduler), '_send_campaign_message', fake_send):
+            sent, failed, skipped_count, _elapsed, out_of_time = Scheduler._dispatch_batch(
+                claimed, 'test-owner', 300, perf_counter() + 60, False)
+        self.assertEqual((sent, failed, skipped_count, out_of_time), (1, 0, 1, False))
+
+    def test_connection_budget_uses_campaign_connection(self):
+        """The hourly budget is read from the zns.connection the campaign sends through"""
+        if 'zns.connection' not in self.env:
+            self.skipTest("bom_zns_simple is not installed")
+        connection = self.env['zns.connection'].create({
+            'name': 'Budget Connection',
+            'api_key': 'test-key',
+            'hourly_quota': 10,
+            'transactional_reserve': 20,
+        })
+        campaign = self._create_campaign(bom_zns_connection_id=connection.id)
+        self._create_message(campaign, self.partner_a, status='sent', sent_date=fields.Datetime.now())
+
+        budgets = self.env['zns.bom.marketing.scheduler']._get_connection_budgets({connection.id})
+        # 10 per hour, 2 reserved for transactional traffic, 1 already sent by marketing
+        self.assertEqual(budgets, {connection.id: 7})
+
+    def test_blocked_backlog_retriggers_later(self):
+        """When budgets leave nothing to claim the cron is retriggered with a delay"""
+        campaign = self._create_campaign()
+        self._create_message(campaign, self.partner_a)
+        Scheduler = self.env['zns.bom.marketing.scheduler']
+        Message = self.env['zns.bom.marketing.message']
+        Cron = type(self.env['ir.cron'])
+
+        with patch.object(type(Scheduler), '_claim_fair_batch', lambda *args: Message), \
+                patch.object(Cron, '_trigger', autospec=True) as trigger:
+            self.assertEqual(Scheduler.process_message_queue(), 0)
+        trigger.assert_called_once()
+        self.assertGreater(trigger.call_args.kwargs['at'], fields.Datetime.now())
+
+        # Nothing left to send, no retrigger
+        campaign.message_ids.write({'status': 'sent'})
+        with patch.object(Cron, '_trigger', autospec=True) as trigger:
+            Scheduler.process_message_queue()
+        trigger.assert_not_called()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+from datetime import timedelta
+
+from odoo import fields
+from odoo.tests import tagged
+
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestQueueLease(ZnsMarketingTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        campaign = cls.env['zns.bom.marketing.campaign'].create({
+            'name': 'Lease Campaign',
+            'campaign_type': 'promotion',
+            'contact_list_ids': [(6, 0, cls.contact_list.ids)],
+        })
+        Message = cls.env['zns.bom.marketing.message']
+        cls.messages = Message.browse()
+        for partner in (cls.partner_a, cls.partner_b, cls.partner_c):
+            cls.messages |= Message.create({
+                'campaign_id': campaign.id,
+                'contact_id': partner.id,
+                'phone_number': partner.zns_phone_normalized,
+            })
+
+    def test_workers_claim_disjoint_batches(self):
+        Message = self.env['zns.bom.marketing.message']
+        first = Message._claim_queued('worker-1', 2, 300)
+        second = Message._claim_queued('worker-2', 2, 300)
+
+        self.assertEqual(len(first), 2)
+        self.assertEqual(first | second, self.messages)
+        self.assertFalse(first & second)
+        self.assertEqual(set(first.mapped('lease_owner')), {'worker-1'})
+        self.assertFalse(Message._claim_queued('worker-3', 2, 300))
+
+    def test_released_and_expired_leases_are_claimable(self):
+        Message = self.env['zns.bom.marketing.message']
+        claimed = Message._claim_queued('worker-1', 3, 300)
+        self.assertEqual(Message._release_leases('worker-1'), 3)
+        self.assertEqual(Message._claim_queued('worker-2', 3, 300), claimed)
+
+        # A worker died holding a lease: once expired it is cleared
+        stuck = claimed[0]
+        stuck.write({'lease_expires_at': fields.Datetime.now() - timedelta(minutes=1)})
+        self.assertEqual(Message._reclaim_expired_leases(), 1)
+        self.assertEqual(stuck.status, 'queued')
+        self.assertFalse(stuck.lease_owner)
+        self.assertEqual(Message._claim_queued('worker-3', 3, 300), stuck)
+
+    def test_future_scheduled_messages_are_not_claimed(self):
+        Message = self.env['zns.bom.marketing.message']
+        later = self.messages[0]
+        later.scheduled_at = fields.Datetime.now() + timedelta(hours=1)
+        self.assertEqual(Message._claim_queued('worker-1', 10, 300), self.messages - later)
+
+    def test_deferred_messages_wait_in_queue_until_due(self):
+        """Deferred sends need no cron of their own, the backlog picks them up once due"""
+        Message = self.env['zns.bom.marketing.message']
+        due_at = fields.Datetime.now() + timedelta(hours=2)
+        self.messages.write({'scheduled_at': due_at, 'queued_date': due_at})
+        self.assertFalse(Message._get_lane_backlog())
+
+        self.messages[0].scheduled_at = fields.Datetime.now() - timedelta(minutes=1)
+        backlog = Message._get_lane_backlog()
+        self.assertEqual(sum(count for count, _oldest in backlog.values()), 1)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+from .common import ZnsMarketingTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRecipientSelection(ZnsMarketingTestCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Same number as contact A, spelled with the country code
+        cls.partner_a_company = cls.env['res.partner'].create({
+            'name': 'Contact A Company',
+            'mobile': '+84912000001',
+            'is_company': True,
+        })
+        cls.contact_list.write({'contact_ids': [(4, cls.partner_a_company.id)]})
+
+    def _targets(self, campaign):
+        return set(campaign._get_target_contacts(batch_size=2))
+
+    def test_default_keeps_every_partner(self):
+        campaign = self._create_campaign()
+        self.assertEqual(campaign.phone_dedup_policy, 'none')
+        self.assertEqual(
+            self._targets(campaign),
+            set((self.partner_a | self.partner_b | self.partner_c | self.partner_a_company).ids),
+        )
+        self.assertEqual(campaign._count_duplicate_phones(), 0)
+
+    def test_dedup_policies_pick_one_contact_per_phone(self):
+        campaign = self._create_campaign(phone_dedup_policy='oldest')
+        self.assertEqual(self._targets(campaign), set((self.partner_a | self.partner_b | self.partner_c).ids))
+        self.assertEqual(campaign._count_duplicate_phones(), 1)
+
+        self.partner_a.is_company = True
+        self.partner_a_company.is_company = False
+        campaign.phone_dedup_policy = 'person'
+        self.assertEqual(
+            self._targets(campaign),
+            set((self.partner_a_company | self.partner_b | self.partner_c).ids),
+        )
+
+    def test_excluded_contacts_are_skipped(self):
+        campaign = self._create_campaign(excluded_contact_ids=[(6, 0, self.partner_b.ids)])
+        self.assertNotIn(self.partner_b.id, self._targets(campaign))
+
+    def test_opted_out_contacts_are_skipped(self):
+        OptOut = self.env['zns.bom.marketing.opt.out']
+        OptOut.create({'contact_id': self.partner_a.id, 'opt_out_reason': 'manual'})
+        OptOut.create({'contact_id': self.partner_b.id, 'opt_out_reason': 'manual',
+                       'global_opt_out': False, 'campaign_types': 'birthday'})
+        campaign = self._create_campaign()
+        self.assertEqual(self._targets(campaign), set((self.partner_b | self.partner_c | self.partner_a_company).ids))
+
+        campaign.respect_opt_out = False
+        self.assertIn(self.partner_a.id, self._targets(campaign))
+
+    def test_recipient_counts(self):
+        """Overlapping lists count each contact once, exclusions are subtracted"""
+        other_list = self.env['zns.bom.marketing.contact.list'].create({
+            'name': 'Overlapping List',
+            'contact_ids': [(6, 0, (self.partner_a | self.partner_b).ids)],
+        })
+        campaign = self._create_campaign(contact_list_ids=[(6, 0, (self.contact_list | other_list).ids)])
+        self.assertEqual(campaign.total_recipients, 4)
+        campaign.excluded_contact_ids = self.partner_b
+        self.assertEqual(campaign.total_recipients, 3)
+
+        self.partner_a.birthday = '1990-07-14'
+        self.partner_b.birthday = '1991-08-15'
+        birthday_campaign = self._create_campaign(campaign_type='birthday',
+                                                  excluded_contact_ids=[(6, 0, self.partner_b.ids)])
+        expected = self.env['res.partner'].search_count([('birthday', '!=', False)]) - 1
+        self.assertEqual(birthday_campaign.total_recipients, expected)